@@ -1,9 +1,6 @@
 '''Software Written by Nicholas Guilbeault 2018'''
 
 # import python modules
-import os
-import cv2
-import numpy as np
 import utilities as ut
 import time
 from timer_thread import TimerThread
@@ -38,6 +35,8 @@ class CalculateBackgroundProgressWindow(QMainWindow):
         self.background_calculation_frame_chunk_width = None
         self.background_calculation_frame_chunk_height = None
         self.background_calculation_frames_to_skip = None
+        self.background_calculation_n_sample_frames = None
+        self.background_calculation_sample_method = None
         self.save_path = None
         self.save_background = None
         self.calculate_background_thread = None
@@ -121,6 +120,8 @@ class CalculateBackgroundProgressWindow(QMainWindow):
         self.calculate_background_thread.background_calculation_frame_chunk_width = self.background_calculation_frame_chunk_width
         self.calculate_background_thread.background_calculation_frame_chunk_height = self.background_calculation_frame_chunk_height
         self.calculate_background_thread.background_calculation_frames_to_skip = self.background_calculation_frames_to_skip
+        self.calculate_background_thread.background_calculation_n_sample_frames = self.background_calculation_n_sample_frames
+        self.calculate_background_thread.background_calculation_sample_method = self.background_calculation_sample_method
         self.calculate_background_thread.save_path = self.save_path
         self.calculate_background_thread.save_background = self.save_background
         self.calculate_background_thread.start()
@@ -157,6 +158,8 @@ class CalculateBackgroundThread(QThread):
         self.background_calculation_frame_chunk_width = None
         self.background_calculation_frame_chunk_height = None
         self.background_calculation_frames_to_skip = None
+        self.background_calculation_n_sample_frames = None
+        self.background_calculation_sample_method = None
         self.timer_thread = None
         self.periods = None
         self.current_status = None
@@ -183,128 +186,12 @@ class CalculateBackgroundThread(QThread):
         self.timer_thread = TimerThread()
         self.timer_thread.start()
         self.timer_thread.time_signal.connect(self.update_current_status)
-        self.background = self.calculate_background(self.video_path, self.background_calculation_method, [self.background_calculation_frame_chunk_width, self.background_calculation_frame_chunk_height], self.background_calculation_frames_to_skip, self.save_path, self.save_background)
+        self.background = self.calculate_background(self.video_path, self.background_calculation_method, [self.background_calculation_frame_chunk_width, self.background_calculation_frame_chunk_height], self.background_calculation_frames_to_skip, self.save_path, self.save_background, self.background_calculation_n_sample_frames, self.background_calculation_sample_method)
         self.background_calculation_finished_signal.emit(True)
 
-    def calculate_background(self, video_path, method, chunk_size, frames_to_skip, save_path, save_background):
-        # Check arguments.
-        if not isinstance(video_path, str):
-            print('Error: video_path must be formatted as a string.')
-            return
-        if not isinstance(method, str) or method not in ['brightest', 'darkest', 'mode']:
-            print('Error: method must be formatted as a string and must be one of the following: brightest, darkest, or mode.')
-            return
-        if not isinstance(save_background, bool):
-            print('Error: save_background must be formatted as a boolean (True/False).')
-            return
-        if not isinstance(chunk_size, list):
-            print('Error: chunk_size must be formatted as a list containing 2 integer values.')
-            return
-        if len(chunk_size) != 2:
-            print('Error: chunk_size must be formatted as a list containing 2 integer values.')
-            return
-        if not isinstance(chunk_size[0], int) or not isinstance(chunk_size[1], int):
-            print('Error: chunk_size must be formatted as a list containing 2 integer values.')
-            return
-        if not isinstance(frames_to_skip, int):
-            print('Error: frames_to_skip must be formatted as an integer.')
-            return
-
+    def calculate_background(self, video_path, method, chunk_size, frames_to_skip, save_path, save_background, n_sample_frames = None, sample_method = None):
         self.current_status = 'Calculating Background'
-
-        frame_size = ut.get_frame_size_from_video(video_path)
-        video_n_frames = ut.get_total_frame_number_from_video(video_path)
-
-        try:
-            # Load the video.
-            capture = cv2.VideoCapture(video_path)
-            # Retrieve total number of frames in video.
-            frames_to_skip += 1
-
-            if method == 'mode':
-                background = np.zeros(frame_size)
-                pix = []
-                width_iterations = int(frame_size[0]/chunk_size[0])
-                if frame_size[0] % chunk_size[0] != 0:
-                    width_iterations += 1
-                height_iterations = int(frame_size[1] / chunk_size[1])
-                if frame_size[1] % chunk_size[1] != 0:
-                    height_iterations += 1
-                for i in range(height_iterations):
-                    for j in range(width_iterations):
-                        for frame_num in range(video_n_frames):
-                            self.progress_signal.emit((frame_num + 1 + (j * video_n_frames) + (video_n_frames * width_iterations * i)) / (width_iterations * height_iterations * video_n_frames) * video_n_frames)
-                            success, frame = capture.read()
-                            if success:
-                                if frame_num % frames_to_skip == 0:
-                                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                                    if i == height_iterations - 1 and j == width_iterations - 1:
-                                        pix.append(frame[i * chunk_size[1] : , j * chunk_size[0] : ])
-                                    elif i == height_iterations - 1:
-                                        pix.append(frame[i * chunk_size[1] : , j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]])
-                                    elif j == width_iterations - 1:
-                                        pix.append(frame[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : ])
-                                    else:
-                                        pix.append(frame[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]])
-                        bg_pix = stats.mode(pix)[0]
-                        if i == height_iterations - 1 and j == width_iterations - 1:
-                            background[i * chunk_size[1] : , j * chunk_size[0] : ] = bg_pix
-                        elif i == height_iterations - 1:
-                            background[i * chunk_size[1] : , j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]] = bg_pix
-                        elif j == width_iterations - 1:
-                            background[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : ] = bg_pix
-                        else:
-                            background[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]] = bg_pix
-                        pix = []
-                        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                background = background.astype(np.uint8)
-                if save_background:
-                    if save_path != None:
-                        background_path = '{0}\\{1}_background.tif'.format(save_path, os.path.basename(video_path)[:-4])
-                    else:
-                        background_path = '{0}_background.tif'.format(video_path[:-4])
-                    cv2.imwrite(background_path, background)
-            else:
-                # Iterate through each frame in the video.
-                for frame_num in range(video_n_frames):
-                    self.progress_signal.emit(frame_num + 1)
-                    # Load frame into memory.
-                    success, frame = capture.read()
-                    # Check if frame was loaded successfully.
-                    if success:
-                        if frame_num % frames_to_skip == 0:
-                            # Convert frame to grayscale.
-                            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                            # Copy frame into background if this is the first frame.
-                            if frame_num == 0:
-                                background = frame.copy().astype(np.float32)
-                            elif method == 'brightest':
-                                # Create a mask where the background is compared to the frame in the loop and used to update the background where the frame is.
-                                mask = np.less(background, frame)
-                                # Update the background image where all of the pixels in the new frame are brighter than the background image.
-                                background[mask] = frame[mask]
-                            elif method == 'darkest':
-                                # Create a mask where the background is compared to the frame in the loop and used to update the background where the frame is.
-                                mask = np.greater(background, frame)
-                                # Update the background image where all of the pixels in the new frame are darker than the background image.
-                                background[mask] = frame[mask]
-                background = background.astype(np.uint8)
-                # Save the background into an external file if requested.
-                if save_background:
-                    if save_path != None:
-                        background_path = '{0}\\{1}_background.tif'.format(save_path, os.path.basename(video_path)[:-4])
-                    else:
-                        background_path = '{0}_background.tif'.format(video_path[:-4])
-                    cv2.imwrite(background_path, background)
-        except:
-            # Errors that may occur during the background calculation are handled.
-            print('Error calculating background')
-            if capture.isOpened():
-                capture.release()
-            return None
-        if capture.isOpened():
-            # Unload video from memory.
-            capture.release()
-        # Return the calculated background.
+        # Calculate the background in a single pass through the video and update the progress after each frame. When the number of sampled frames is 0 or None, frames_to_skip is used to select the frames.
+        background = ut.calculate_background(video_path, method = method, save_path = save_path, save_background = save_background, chunk_size = chunk_size, frames_to_skip = frames_to_skip, n_sample_frames = n_sample_frames or None, sample_method = sample_method or 'evenly_spaced', print_progress = False, progress_callback = self.progress_signal.emit)
         time.sleep(0.5)
         return background
@@ -0,0 +1,392 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# Import libraries.
+import os
+import time
+import queue
+import multiprocessing as mp
+import numpy as np
+import cv2
+import utilities as ut
+try:
+    # psutil is optional and is only used to find the total memory of the computer for the default memory budget.
+    import psutil
+except ImportError:
+    psutil = None
+
+# Approximate memory used by a worker process before it starts tracking a video, in bytes.
+WORKER_BASE_MEMORY = 200 * 1024 ** 2
+# Number of frames held by the prefetching frame reader while tracking.
+PREFETCH_QUEUE_SIZE = 32
+# Fraction of the total memory of the computer used as the default memory budget.
+DEFAULT_MEMORY_FRACTION = 0.5
+# Minimum number of seconds between progress updates sent by a worker.
+PROGRESS_INTERVAL = 0.1
+# Default tracking parameters of the GUI, using the names of the saved tracking parameters.
+DEFAULT_TRACKING_PARAMETERS = {'tracking_method' : 'free_swimming', 'n_tail_points' : 7, 'dist_tail_points' : 5, 'dist_eyes' : 4, 'dist_swim_bladder' : 12,
+                                'median_blur' : 3, 'starting_frame' : 0, 'n_frames' : 'All', 'line_length' : 5, 'pixel_threshold' : 40, 'frame_change_threshold' : 10,
+                                'eyes_threshold' : 100, 'eyes_line_length' : 5, 'save_video' : False, 'extended_eyes_calculation' : False,
+                                'background_calculation_method' : 'brightest', 'background_calculation_frame_chunk_width' : 250, 'background_calculation_frame_chunk_height' : 250,
+                                'background_calculation_frames_to_skip' : 10, 'background_calculation_n_sample_frames' : 0, 'background_calculation_sample_method' : 'evenly_spaced',
+                                'initial_pixel_search' : 'brightest', 'invert_threshold' : False, 'recalculate_eye_coords_every_frame' : True, 'save_background' : True, 'range_angles' : 120}
+
+def get_total_memory():
+    '''
+    Function that returns the total memory of the computer.
+
+    Returns:
+        total_memory (int) - Total memory of the computer in bytes.
+            ** Returns None if the total memory could not be determined.
+    '''
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    try:
+        # Use the number of physical pages on POSIX systems.
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def get_default_n_workers():
+    '''
+    Function that returns the default number of videos that are tracked at the same time.
+
+    Returns:
+        n_workers (int) - Number of CPUs minus one, so that the computer remains responsive. At least 1.
+    '''
+    return max(1, mp.cpu_count() - 1)
+
+def get_default_memory_budget():
+    '''
+    Function that returns the default memory budget for tracking videos in parallel.
+
+    Returns:
+        memory_budget (int) - Half of the total memory of the computer in bytes.
+            ** Returns None if the total memory could not be determined, in which case only the number of workers limits the number of videos tracked at the same time.
+    '''
+    total_memory = get_total_memory()
+    if total_memory is None:
+        return None
+    return int(total_memory * DEFAULT_MEMORY_FRACTION)
+
+def estimate_tracking_memory(frame_size, n_frames, n_tail_points, background_calculation_method = None):
+    '''
+    Function that estimates the peak memory used by a worker process to track a video.
+
+    Steps:
+        1. Add the memory of the worker process itself.
+        2. Add the frames held by the prefetching frame reader and the frames used to track and annotate each frame.
+        3. Add the running statistics used to calculate the background, if the background needs to be calculated.
+        4. Add the arrays of tracking results.
+
+    Required Arguments:
+        frame_size (frame height, frame width) - Size of the frames in the video.
+        n_frames (int) - Number of frames that will be tracked.
+        n_tail_points (int) - Number of points tracked along the tail.
+
+    Optional Arguments:
+        background_calculation_method (str) - Method used to calculate the background. Default = None.
+            ** When background_calculation_method is None, the background has already been calculated.
+
+    Returns:
+        memory (int) - Estimated peak memory in bytes.
+    '''
+    # Number of pixels in each frame.
+    frame_pixels = frame_size[0] * frame_size[1]
+    # Memory of the worker process.
+    memory = WORKER_BASE_MEMORY
+    # Colour and preprocessed frames held by the prefetching frame reader.
+    memory += PREFETCH_QUEUE_SIZE * frame_pixels * 4
+    # Background, previous frame, colour frame being annotated and frame being written to the tracked video.
+    memory += frame_pixels * 8
+    if background_calculation_method in ['mode', 'median']:
+        # Histogram of 256 uint16 bins and the offset of each pixel in the histogram.
+        memory += frame_pixels * (256 * 2 + 8)
+    elif background_calculation_method is not None:
+        # Running brightest or darkest frame.
+        memory += frame_pixels * 2
+    # Tracking results are stored as float32 except for the int64 frame numbers.
+    memory += n_frames * ((n_tail_points + 1) * 2 + 10) * 4 + n_frames * 8
+    return int(memory)
+
+def create_tracking_job(video_path, tracking_parameters, background = None, background_parameters = None, n_frames = None):
+    '''
+    Function that creates a job for tracking a video with track_videos_in_parallel.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+        tracking_parameters (dict) - Keyword arguments passed to utilities.track_video.
+            ** Must contain colours, n_tail_points, dist_tail_points, dist_eyes, and dist_swim_bladder.
+            ** Must not contain video_path, background, print_progress, or progress_callback.
+
+    Optional Arguments:
+        background (frame height, frame width) - Background of the video. Default = None.
+            ** When background is None, the background is calculated in the worker process before tracking.
+        background_parameters (dict) - Keyword arguments passed to utilities.calculate_background. Default = None.
+            ** Only used when background is None.
+        n_frames (int) - Number of frames that will be tracked. Default = None.
+            ** When n_frames is None, n_frames is found from tracking_parameters or the video.
+
+    Returns:
+        job (dict) - Dictionary containing the video path, the background, the parameters, and the estimated number of frames processed and memory used.
+    '''
+    if background_parameters is None:
+        background_parameters = {}
+    video_n_frames = ut.get_total_frame_number_from_video(video_path)
+    frame_size = ut.get_frame_size_from_video(video_path)
+    if n_frames is None:
+        n_frames = tracking_parameters.get('n_frames', None)
+        if n_frames is None:
+            n_frames = video_n_frames - tracking_parameters.get('starting_frame', 0)
+    # Number of frames that the worker processes, used to order the jobs from largest to smallest. Only the sampled frames are decoded when calculating the background from sampled frames.
+    background_n_frames = 0
+    if background is None:
+        background_n_frames = video_n_frames if background_parameters.get('n_sample_frames') is None else min(background_parameters['n_sample_frames'], video_n_frames)
+    background_calculation_method = background_parameters.get('method', 'brightest') if background is None else None
+    job = {'video_path' : video_path, 'background' : background, 'background_parameters' : background_parameters, 'tracking_parameters' : tracking_parameters,
+            'n_frames' : n_frames, 'background_n_frames' : background_n_frames,
+            'work' : (n_frames + background_n_frames) * frame_size[0] * frame_size[1],
+            'memory' : estimate_tracking_memory(frame_size, n_frames, tracking_parameters['n_tail_points'], background_calculation_method = background_calculation_method)}
+    return job
+
+def load_tracking_parameters(tracking_parameters_path):
+    '''
+    Function that loads tracking parameters saved by the GUI.
+
+    Required Arguments:
+        tracking_parameters_path (str) - Path to the saved tracking parameters (tracking_parameters.npy).
+
+    Returns:
+        tracking_parameters (dict) - Tracking parameters using the names of the tracking parameters of the loaded videos in the GUI.
+            ** Parameters that are missing from the file are set to the default tracking parameters of the GUI.
+            ** Returns None if the tracking parameters could not be loaded.
+    '''
+    try:
+        saved_tracking_parameters = np.load(tracking_parameters_path, allow_pickle = True).item()
+    except (IOError, ValueError, AttributeError):
+        print('Error: tracking parameters not found.')
+        return
+    tracking_parameters = DEFAULT_TRACKING_PARAMETERS.copy()
+    for key in DEFAULT_TRACKING_PARAMETERS:
+        if key in saved_tracking_parameters:
+            tracking_parameters[key] = saved_tracking_parameters[key]
+        else:
+            print('Warning! {0} not found in the tracking parameters. Setting {0} to {1}.'.format(key, DEFAULT_TRACKING_PARAMETERS[key]))
+    # The GUI refers to the line length as the heading line length.
+    tracking_parameters['heading_line_length'] = tracking_parameters.pop('line_length')
+    tracking_parameters['save_path'] = None
+    tracking_parameters['video_fps'] = None
+    return tracking_parameters
+
+def load_colours(colour_parameters_path, n_tail_points):
+    '''
+    Function that loads the colours saved by the GUI.
+
+    Required Arguments:
+        colour_parameters_path (str) - Path to the saved colours (colour_parameters.npy).
+        n_tail_points (int) - Number of points tracked along the tail.
+
+    Returns:
+        colours (list((B, G, R))) - Colours used to annotate the tracked videos.
+            ** If the colours could not be loaded, or if there are not enough colours for the number of tail points, the default colours of the GUI are returned.
+    '''
+    try:
+        colours = np.load(colour_parameters_path, allow_pickle = True).item()['colours']
+    except (IOError, ValueError, AttributeError, KeyError):
+        print('Warning! Colour parameters not found. Using the default colours.')
+        return ut.get_default_colours(n_tail_points)
+    if len(colours) < n_tail_points + 3:
+        print('Warning! The number of saved colours is less than the number of tail points + 3. Using the default colours.')
+        return ut.get_default_colours(n_tail_points)
+    return colours
+
+def create_tracking_job_from_parameters(video_path, tracking_parameters, colours, background = None, mask = None, video_n_frames = None, video_backend = 'opencv'):
+    '''
+    Function that creates a job for tracking a video from the tracking parameters of a loaded video in the GUI.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+        tracking_parameters (dict) - Tracking parameters of the loaded video, as stored by the GUI or returned by load_tracking_parameters.
+        colours (list) - Colours used to annotate the tracked video, as saved by the GUI.
+
+    Optional Arguments:
+        background (frame height, frame width) - Background of the video. Default = None.
+            ** When background is None, the background is calculated before tracking using the background calculation parameters.
+            ** When background_calculation_n_sample_frames is 0 or missing, the frames used to calculate the background are selected using background_calculation_frames_to_skip.
+        mask (list) - Same as in utilities.track_video. Default = None.
+        video_n_frames (int) - Total number of frames in the video. Default = None.
+            ** Used as the number of frames to track when n_frames is All.
+        video_backend (str) - Same as in utilities.track_video. Default = opencv.
+
+    Returns:
+        job (dict) - Job created by create_tracking_job.
+    '''
+    n_frames = tracking_parameters['n_frames']
+    if n_frames == 'All':
+        n_frames = None
+    background_parameters = {'method' : tracking_parameters['background_calculation_method'], 'chunk_size' : [tracking_parameters['background_calculation_frame_chunk_width'], tracking_parameters['background_calculation_frame_chunk_height']],
+                            'frames_to_skip' : tracking_parameters['background_calculation_frames_to_skip'], 'n_sample_frames' : tracking_parameters.get('background_calculation_n_sample_frames') or None,
+                            'sample_method' : tracking_parameters.get('background_calculation_sample_method') or 'evenly_spaced', 'save_path' : tracking_parameters['save_path'], 'save_background' : tracking_parameters['save_background'],
+                            'video_backend' : video_backend}
+    track_video_parameters = {'colours' : colours, 'n_tail_points' : tracking_parameters['n_tail_points'], 'dist_tail_points' : tracking_parameters['dist_tail_points'], 'dist_eyes' : tracking_parameters['dist_eyes'],
+                            'dist_swim_bladder' : tracking_parameters['dist_swim_bladder'], 'tracking_method' : tracking_parameters['tracking_method'], 'save_video' : tracking_parameters['save_video'], 'n_frames' : n_frames,
+                            'starting_frame' : tracking_parameters['starting_frame'], 'save_path' : tracking_parameters['save_path'], 'extended_eyes_calculation' : tracking_parameters['extended_eyes_calculation'],
+                            'eyes_threshold' : tracking_parameters['eyes_threshold'], 'line_length' : tracking_parameters['heading_line_length'], 'video_fps' : tracking_parameters['video_fps'], 'pixel_threshold' : tracking_parameters['pixel_threshold'],
+                            'frame_change_threshold' : tracking_parameters['frame_change_threshold'], 'convert_colours_from_RGB_to_BGR' : True, 'range_angles' : tracking_parameters['range_angles'], 'median_blur' : tracking_parameters['median_blur'],
+                            'initial_pixel_search' : tracking_parameters['initial_pixel_search'], 'invert_threshold' : tracking_parameters['invert_threshold'], 'eyes_line_length' : tracking_parameters['eyes_line_length'], 'mask' : mask,
+                            'recalculate_eye_coords_every_frame' : tracking_parameters['recalculate_eye_coords_every_frame'], 'video_backend' : video_backend}
+    if n_frames is None and video_n_frames is not None:
+        n_frames = video_n_frames
+    return create_tracking_job(video_path, track_video_parameters, background = background, background_parameters = background_parameters, n_frames = n_frames)
+
+def initialize_worker():
+    '''
+    Function that initializes each worker process.
+
+    Steps:
+        1. Limit OpenCV to a single thread, since the videos are already processed in parallel.
+    '''
+    cv2.setNumThreads(1)
+
+def create_progress_reporter(progress_queue, job_index, status):
+    '''
+    Function that creates a progress callback which puts the progress of a job into a queue.
+
+    Required Arguments:
+        progress_queue (multiprocessing.Queue) - Queue shared with the scheduler.
+        job_index (int) - Index of the job.
+        status (str) - Status of the job. Either Calculating Background or Tracking Video.
+
+    Returns:
+        report_progress (function) - Progress callback.
+            ** Puts (job_index, status, value) into the queue at most once every PROGRESS_INTERVAL seconds.
+    '''
+    last_report_time = [0]
+    def report_progress(value):
+        current_time = time.time()
+        if current_time - last_report_time[0] >= PROGRESS_INTERVAL:
+            last_report_time[0] = current_time
+            progress_queue.put((job_index, status, value))
+    return report_progress
+
+def run_tracking_job(job_index, job, progress_queue):
+    '''
+    Function that calculates the background of a video, if needed, and tracks the video in a worker process.
+
+    Required Arguments:
+        job_index (int) - Index of the job.
+        job (dict) - Job created by create_tracking_job.
+        progress_queue (multiprocessing.Queue) - Queue shared with the scheduler.
+
+    Returns:
+        job_index (int) - Index of the job.
+        error (str) - Error message if the video could not be tracked, otherwise None.
+    '''
+    try:
+        background = job['background']
+        if background is None:
+            progress_queue.put((job_index, 'Calculating Background', 0))
+            background = ut.calculate_background(job['video_path'], print_progress = False, progress_callback = create_progress_reporter(progress_queue, job_index, 'Calculating Background'), **job['background_parameters'])
+            if background is None:
+                return job_index, 'Could not calculate the background of {0}.'.format(job['video_path'])
+        progress_queue.put((job_index, 'Tracking Video', 0))
+        ut.track_video(job['video_path'], background = background, print_progress = False, progress_callback = create_progress_reporter(progress_queue, job_index, 'Tracking Video'), **job['tracking_parameters'])
+    except Exception as error:
+        return job_index, '{0}: {1}'.format(type(error).__name__, error)
+    return job_index, None
+
+def track_videos_in_parallel(jobs, n_workers = None, memory_budget = None, progress_callback = None, finished_callback = None, stop_event = None, print_progress = True):
+    '''
+    Function that tracks several videos at the same time in a pool of worker processes.
+
+    Steps:
+        1. Order the jobs from largest to smallest.
+        2. Start the largest waiting job that fits within the number of workers and the memory budget, until no more jobs can be started.
+        3. Forward the progress of the running jobs from the queue to progress_callback.
+        4. When a job finishes, free its memory and start the next jobs.
+        5. Repeat steps 2 - 4 until all of the jobs have finished.
+
+    Required Arguments:
+        jobs (list(dict)) - Jobs created by create_tracking_job.
+
+    Optional Arguments:
+        n_workers (int) - Maximum number of videos tracked at the same time. Default = None.
+            ** When n_workers is None, n_workers = get_default_n_workers().
+        memory_budget (int) - Maximum estimated memory used by the videos tracked at the same time, in bytes. Default = None.
+            ** When memory_budget is None, memory_budget = get_default_memory_budget().
+            ** A job that is larger than the memory budget is only started once no other jobs are running.
+        progress_callback (function) - Function that is called with the job index, the status, and the number of frames that have been processed. Default = None.
+        finished_callback (function) - Function that is called with the job index and the error message, or None, when a job finishes. Default = None.
+        stop_event (threading.Event) - Event that stops tracking and terminates the worker processes when set. Default = None.
+        print_progress (bool) - Boolean to determine whether or not to print the progress. Default = True.
+
+    Returns:
+        errors (dict) - Dictionary containing the error message of each job that could not be tracked, with the job index as the key.
+            ** Each video is tracked with checkpoints, so tracking a video again after it has been stopped resumes from the last checkpoint.
+    '''
+    if n_workers is None:
+        n_workers = get_default_n_workers()
+    if memory_budget is None:
+        memory_budget = get_default_memory_budget()
+
+    if print_progress:
+        t0 = time.time()
+        print('Tracking {0} videos using {1} processes.'.format(len(jobs), n_workers))
+
+    # Order the jobs from largest to smallest, so that the largest videos do not finish last.
+    waiting_jobs = sorted(range(len(jobs)), key = lambda job_index: jobs[job_index]['work'], reverse = True)
+    running_jobs = {}
+    used_memory = 0
+    errors = {}
+
+    # Each worker process tracks a single video, so that the memory of each video is released once the video is tracked.
+    manager = mp.Manager()
+    progress_queue = manager.Queue()
+    pool = mp.Pool(n_workers, initializer = initialize_worker, maxtasksperchild = 1)
+
+    try:
+        while len(waiting_jobs) > 0 or len(running_jobs) > 0:
+            # Start the largest waiting jobs that fit within the number of workers and the memory budget.
+            for job_index in list(waiting_jobs):
+                if len(running_jobs) >= n_workers:
+                    break
+                if len(running_jobs) > 0 and memory_budget is not None and used_memory + jobs[job_index]['memory'] > memory_budget:
+                    continue
+                waiting_jobs.remove(job_index)
+                running_jobs[job_index] = pool.apply_async(run_tracking_job, (job_index, jobs[job_index], progress_queue))
+                used_memory += jobs[job_index]['memory']
+
+            # Forward the progress of the running jobs.
+            try:
+                progress = progress_queue.get(timeout = PROGRESS_INTERVAL)
+                while True:
+                    if progress_callback is not None and progress[0] in running_jobs:
+                        progress_callback(*progress)
+                    progress = progress_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            # Collect the jobs that have finished.
+            for job_index in [job_index for job_index in running_jobs if running_jobs[job_index].ready()]:
+                error = running_jobs.pop(job_index).get()[1]
+                used_memory -= jobs[job_index]['memory']
+                if error is not None:
+                    errors[job_index] = error
+                    print('Error: Could not track {0}. {1}'.format(jobs[job_index]['video_path'], error))
+                elif print_progress:
+                    print('Tracked {0}. {1} / {2} videos remaining.'.format(jobs[job_index]['video_path'], len(waiting_jobs) + len(running_jobs), len(jobs)))
+                if finished_callback is not None:
+                    finished_callback(job_index, error)
+
+            if stop_event is not None and stop_event.is_set():
+                if print_progress:
+                    print('Tracking stopped. {0} videos were not tracked.'.format(len(waiting_jobs) + len(running_jobs)))
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+        manager.shutdown()
+
+    if print_progress:
+        print('Total time taken to track videos: {0} s.'.format(round(time.time() - t0, 2)))
+
+    return errors
@@ -0,0 +1,723 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# Import libraries.
+import os
+import json
+import threading
+import queue
+import subprocess
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+import cv2
+# PyAV is only needed for the pyav backend, so it is imported the first time the pyav backend is used to keep importing frame_sources fast.
+av = None
+
+# Backends that can be used to decode the frames of a video.
+VIDEO_BACKENDS = ['opencv', 'ffmpeg', 'pyav']
+# Extensions of the raw 8-bit frame stacks that are memory-mapped instead of decoded.
+RAW_VIDEO_EXTENSIONS = ['.raw', '.npy']
+# Maximum number of open videos kept for reuse by borrow_video.
+MAX_IDLE_VIDEOS = 4
+# Frame rate used for videos that do not give a frame rate, such as raw frame stacks without a sidecar file.
+DEFAULT_FPS = 30.0
+
+# Metadata of each video that has been probed, keyed by the path to the video.
+video_metadata_registry = {}
+# Open videos that can be reused, keyed by the path to the video, the modification time of the video, the backend, and whether the frames are grayscale.
+idle_videos = OrderedDict()
+# Lock that protects the registry and the idle videos, which are shared by the GUI and the tracking threads.
+registry_lock = threading.Lock()
+
+def import_pyav():
+    '''
+    Function that imports PyAV the first time the pyav backend is used. Returns None if PyAV is not installed.
+    '''
+    global av
+    if av is None:
+        try:
+            import av as pyav
+        except ImportError:
+            return
+        av = pyav
+    return av
+
+def get_modification_time(video_path):
+    '''
+    Function that returns the modification time of a video, or None if the video does not exist.
+    '''
+    try:
+        return os.path.getmtime(video_path)
+    except (OSError, TypeError):
+        return None
+
+def is_raw_video(video_path):
+    '''
+    Function that checks whether a video is a raw 8-bit frame stack that is memory-mapped instead of decoded.
+    '''
+    return os.path.splitext(video_path)[1].lower() in RAW_VIDEO_EXTENSIONS
+
+def get_raw_video_sidecar_path(video_path):
+    '''
+    Function that returns the path to the sidecar file that describes a raw frame stack. The sidecar is a JSON file with the same name as the frame stack.
+    '''
+    return '{0}.json'.format(os.path.splitext(video_path)[0])
+
+def load_raw_video_sidecar(video_path):
+    '''
+    Function that loads the sidecar file of a raw frame stack.
+
+    Steps:
+        The sidecar file contains a JSON dictionary with the following keys.
+            ** width (int) - Width of the frames. Required for .raw files.
+            ** height (int) - Height of the frames. Required for .raw files.
+            ** n_frames (int) - Number of frames. Optional. When not given, the number of frames is calculated from the size of the file.
+            ** fps (float) - Frame rate of the recording. Optional. When not given, the fps is DEFAULT_FPS and a warning is printed.
+            ** header_bytes (int) - Number of bytes before the first frame in .raw files. Optional. Default = 0.
+        The shape of .npy files is read from the .npy header, so the sidecar file is optional and only used for the fps.
+
+    Required Arguments:
+        video_path (str) - Path to the raw frame stack.
+
+    Returns:
+        sidecar (dict) - Contents of the sidecar file. Empty if the sidecar file does not exist.
+    '''
+    sidecar_path = get_raw_video_sidecar_path(video_path)
+    if not os.path.exists(sidecar_path):
+        return {}
+    with open(sidecar_path, 'r') as f:
+        return json.load(f)
+
+def load_raw_video(video_path):
+    '''
+    Function that memory-maps a raw 8-bit frame stack.
+
+    Steps:
+        .npy files are memory-mapped using the shape stored in the .npy header.
+        .raw files are memory-mapped using the width, height, and number of frames given by the sidecar file.
+        The memory-mapped stacks are cached by path and modification time, so that opening the same video again does not read the sidecar file or map the file again unless the file has changed.
+
+    Required Arguments:
+        video_path (str) - Path to the raw frame stack.
+
+    Returns:
+        frames (n frames, frame height, frame width) - Read-only memory-mapped frame stack.
+        fps (float) - Frame rate given by the sidecar file, or DEFAULT_FPS if the sidecar file does not give a frame rate.
+    '''
+    return map_raw_video(video_path, get_modification_time(video_path))
+
+@lru_cache(maxsize = 8)
+def map_raw_video(video_path, modification_time):
+    # The modification time is only used as part of the key of the cache.
+    sidecar = load_raw_video_sidecar(video_path)
+    if os.path.splitext(video_path)[1].lower() == '.npy':
+        frames = np.load(video_path, mmap_mode = 'r')
+    else:
+        if 'width' not in sidecar or 'height' not in sidecar:
+            raise ValueError('The sidecar file {0} must contain the width and height of the frames.'.format(get_raw_video_sidecar_path(video_path)))
+        frame_size = int(sidecar['width']) * int(sidecar['height'])
+        header_bytes = int(sidecar.get('header_bytes', 0))
+        n_frames = int(sidecar.get('n_frames', (os.path.getsize(video_path) - header_bytes) // frame_size))
+        frames = np.memmap(video_path, dtype = np.uint8, mode = 'r', offset = header_bytes, shape = (n_frames, int(sidecar['height']), int(sidecar['width'])))
+    if frames.ndim != 3 or frames.dtype != np.uint8:
+        raise ValueError('Raw videos must contain 8-bit frames with shape (n frames, frame height, frame width).')
+    fps = float(sidecar.get('fps', 0))
+    if not fps > 0:
+        print('Warning! The sidecar file {0} does not give the fps of the raw video. Using {1} fps.'.format(get_raw_video_sidecar_path(video_path), DEFAULT_FPS))
+        fps = DEFAULT_FPS
+    return frames, fps
+
+def probe_video_metadata(video_path):
+    '''
+    Function that opens a video once and reads all of the properties of the video.
+    '''
+    if is_raw_video(video_path):
+        frames, fps = load_raw_video(video_path)
+        return {'n_frames' : frames.shape[0], 'fps' : fps, 'frame_width' : frames.shape[2], 'frame_height' : frames.shape[1], 'format' : float(cv2.CV_8UC1)}
+    capture = cv2.VideoCapture(video_path)
+    metadata = {'n_frames' : int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), 'fps' : capture.get(cv2.CAP_PROP_FPS), 'frame_width' : int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), 'frame_height' : int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), 'format' : capture.get(cv2.CAP_PROP_FORMAT)}
+    capture.release()
+    return metadata
+
+def get_video_metadata(video_path):
+    '''
+    Function that returns the properties of a video from the video metadata registry.
+
+    Steps:
+        The registry contains the properties of each video that has been probed, along with the modification time of the video when it was probed.
+        If the video has not been probed or the video has been modified since it was probed, the video is opened once, all of the properties are read, and the properties are added to the registry.
+        Otherwise, the properties in the registry are returned without opening the video.
+        Videos that do not exist are probed every time and are not added to the registry.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Returns:
+        metadata (dict) - Dictionary containing the number of frames (n_frames), fps, frame width (frame_width), frame height (frame_height), and OpenCV format (format) of the video.
+            ** The properties are read using OpenCV, so that every backend reports the same number of frames.
+    '''
+    modification_time = get_modification_time(video_path)
+    with registry_lock:
+        entry = video_metadata_registry.get(video_path)
+        if entry is not None and entry['modification_time'] == modification_time:
+            return entry['metadata']
+    metadata = probe_video_metadata(video_path)
+    if modification_time is not None:
+        with registry_lock:
+            video_metadata_registry[video_path] = {'modification_time' : modification_time, 'metadata' : metadata}
+    return metadata
+
+def get_video_properties(video_path):
+    '''
+    Function that returns the number of frames, fps, frame width, and frame height of a video from the video metadata registry.
+    '''
+    metadata = get_video_metadata(video_path)
+    return metadata['n_frames'], metadata['fps'], metadata['frame_width'], metadata['frame_height']
+
+def borrow_video(video_path, backend = 'opencv', grayscale = False, n_threads = 0):
+    '''
+    Function that returns an open video that can be reused, or opens the video if there are no open videos that can be reused.
+
+    Steps:
+        Videos that are returned using return_video are kept open, up to MAX_IDLE_VIDEOS videos.
+        An open video is reused if it was opened with the same path, backend, grayscale, and n_threads, and the video has not been modified since it was opened.
+        The position of a reused video is the position at which it was returned, so the frame position must be set before reading a frame.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        backend, grayscale, n_threads - Same as in open_video.
+
+    Returns:
+        capture (FrameSource) - Opened video. Must be given back using return_video once it is no longer used.
+    '''
+    key = (video_path, get_modification_time(video_path), backend, grayscale, n_threads)
+    with registry_lock:
+        captures = idle_videos.get(key)
+        if captures:
+            capture = captures.pop()
+            if len(captures) == 0:
+                del idle_videos[key]
+            return capture
+    capture = open_video(video_path, backend, grayscale, n_threads)
+    capture.registry_key = key
+    return capture
+
+def return_video(capture):
+    '''
+    Function that gives back a video opened by borrow_video so that it can be reused. The least recently returned videos are released once there are more than MAX_IDLE_VIDEOS open videos.
+    '''
+    captures_to_release = []
+    with registry_lock:
+        idle_videos.setdefault(capture.registry_key, []).append(capture)
+        idle_videos.move_to_end(capture.registry_key)
+        while sum(len(captures) for captures in idle_videos.values()) > MAX_IDLE_VIDEOS:
+            key, captures = next(iter(idle_videos.items()))
+            captures_to_release.append(captures.pop(0))
+            if len(captures) == 0:
+                del idle_videos[key]
+    for idle_capture in captures_to_release:
+        idle_capture.release()
+
+def release_idle_videos():
+    '''
+    Function that releases all of the open videos kept for reuse by borrow_video.
+    '''
+    with registry_lock:
+        captures = [capture for key in idle_videos for capture in idle_videos[key]]
+        idle_videos.clear()
+    for capture in captures:
+        capture.release()
+
+def open_video(video_path, backend = 'opencv', grayscale = False, n_threads = 0):
+    '''
+    Function that opens a video using one of the frame source backends.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        backend (str) - Backend used to decode the frames. Default = opencv.
+            ** opencv - Decodes the frames using cv2.VideoCapture.
+            ** ffmpeg - Decodes the frames in an ffmpeg subprocess and reads the raw frames through a pipe. Requires ffmpeg to be installed.
+            ** pyav - Decodes the frames using PyAV. Requires PyAV to be installed.
+            ** Raw frame stacks (.raw or .npy) are always memory-mapped, regardless of the backend.
+        grayscale (bool) - Whether the frames are returned as grayscale frames. Default = False.
+            ** The ffmpeg and pyav backends decode the frames directly to grayscale, which skips the conversion into colour frames. The opencv backend converts the decoded frames to grayscale.
+        n_threads (int) - Number of threads used to decode the frames. Default = 0.
+            ** When n_threads is 0, the number of threads is chosen by the decoder.
+
+    Returns:
+        frame_source (FrameSource) - Opened video. Supports the read, grab, get, set, and release methods of cv2.VideoCapture.
+    '''
+    if is_raw_video(video_path):
+        return MemoryMappedFrameSource(video_path, grayscale = grayscale, n_threads = n_threads)
+    if backend == 'ffmpeg':
+        return FFmpegFrameSource(video_path, grayscale = grayscale, n_threads = n_threads)
+    if backend == 'pyav':
+        return PyAVFrameSource(video_path, grayscale = grayscale, n_threads = n_threads)
+    if backend != 'opencv':
+        raise ValueError('backend must be one of the following: {0}.'.format(', '.join(VIDEO_BACKENDS)))
+    return OpenCVFrameSource(video_path, grayscale = grayscale, n_threads = n_threads)
+
+def decodes_to_grayscale(video_path, backend = 'opencv'):
+    '''
+    Function that checks whether the frames of a video are read directly as grayscale frames by a backend, without converting colour frames.
+    '''
+    return backend != 'opencv' or is_raw_video(video_path)
+
+class FrameSource(object):
+    '''
+    Base class of the frame source backends. Implements the parts of the cv2.VideoCapture interface used to read videos.
+
+    Steps:
+        The number of frames, fps, and frame size of the video are read when the video is opened.
+        Reading a frame returns whether the frame was read successfully and the frame, and moves to the next frame.
+        Setting cv2.CAP_PROP_POS_FRAMES seeks to a frame number.
+        Getting cv2.CAP_PROP_POS_FRAMES, cv2.CAP_PROP_FRAME_COUNT, cv2.CAP_PROP_FPS, cv2.CAP_PROP_FRAME_WIDTH, or cv2.CAP_PROP_FRAME_HEIGHT returns the frame number of the next frame or the property of the video. All other properties return 0.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        grayscale (bool) - Same as in open_video. Default = False.
+        n_threads (int) - Same as in open_video. Default = 0.
+    '''
+    def __init__(self, video_path, grayscale = False, n_threads = 0):
+        self.video_path = video_path
+        self.grayscale = grayscale
+        self.n_threads = n_threads
+        self.n_frames, self.fps, self.frame_width, self.frame_height = get_video_properties(video_path)
+        self.frame_number = 0
+
+    def get(self, property_id):
+        if property_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frame_number)
+        properties = {cv2.CAP_PROP_FRAME_COUNT : self.n_frames, cv2.CAP_PROP_FPS : self.fps, cv2.CAP_PROP_FRAME_WIDTH : self.frame_width, cv2.CAP_PROP_FRAME_HEIGHT : self.frame_height}
+        return float(properties.get(property_id, 0))
+
+    def set(self, property_id, value):
+        if property_id != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.seek(int(value))
+        return True
+
+    def grab(self):
+        return self.read()[0]
+
+    def read(self):
+        raise NotImplementedError
+
+    def seek(self, frame_number):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+class OpenCVFrameSource(FrameSource):
+    '''
+    Frame source that decodes the frames using cv2.VideoCapture.
+    '''
+    def __init__(self, video_path, grayscale = False, n_threads = 0):
+        self.video_path = video_path
+        self.grayscale = grayscale
+        self.n_threads = n_threads
+        self.capture = cv2.VideoCapture(video_path)
+        if n_threads > 0:
+            # Ignored by the video backends of OpenCV that do not support threading.
+            self.capture.set(cv2.CAP_PROP_N_THREADS, n_threads)
+
+    def get(self, property_id):
+        return self.capture.get(property_id)
+
+    def set(self, property_id, value):
+        return self.capture.set(property_id, value)
+
+    def grab(self):
+        return self.capture.grab()
+
+    def read(self):
+        success, frame = self.capture.read()
+        if success and self.grayscale:
+            # Convert the frame to grayscale.
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return success, frame
+
+    def seek(self, frame_number):
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+
+    def release(self):
+        self.capture.release()
+
+class FFmpegFrameSource(FrameSource):
+    '''
+    Frame source that decodes the frames in an ffmpeg subprocess and reads the raw frames through a pipe.
+
+    Steps:
+        The ffmpeg subprocess is started at the first frame that is read after opening the video or seeking.
+        When seeking, ffmpeg seeks to the time of the frame, so that only the frames from the closest keyframe onwards are decoded.
+        The frames are decoded into raw gray8 or bgr24 frames and read from the pipe into new arrays.
+
+    Optional Arguments:
+        ffmpeg_path (str) - Path to the ffmpeg executable. Default = ffmpeg.
+        All other arguments are the same as in FrameSource.
+    '''
+    def __init__(self, video_path, grayscale = False, n_threads = 0, ffmpeg_path = 'ffmpeg'):
+        FrameSource.__init__(self, video_path, grayscale = grayscale, n_threads = n_threads)
+        self.ffmpeg_path = ffmpeg_path
+        self.process = None
+        self.frame_shape = (self.frame_height, self.frame_width) if grayscale else (self.frame_height, self.frame_width, 3)
+
+    def start(self):
+        command = [self.ffmpeg_path, '-v', 'error', '-nostdin', '-threads', str(self.n_threads)]
+        filters = []
+        if self.frame_number > 0 and self.fps > 0:
+            # Seek to the frame before the frame, keeping the timestamps of the video, and only keep the frames that start at or after the frame.
+            command += ['-ss', '{0:.6f}'.format((self.frame_number - 1) / self.fps), '-copyts', '-start_at_zero']
+            filters = ['-vf', 'select=gte(t\\,{0:.6f})'.format((self.frame_number - 0.5) / self.fps)]
+        command += ['-i', self.video_path, '-map', '0:v:0'] + filters + ['-f', 'rawvideo', '-pix_fmt', 'gray' if self.grayscale else 'bgr24', '-']
+        self.process = subprocess.Popen(command, stdout = subprocess.PIPE, stderr = subprocess.DEVNULL, bufsize = int(np.prod(self.frame_shape)) * 4)
+
+    def read(self):
+        if self.process is None:
+            self.start()
+        frame = np.empty(self.frame_shape, dtype = np.uint8)
+        buffer = memoryview(frame).cast('B')
+        n_bytes = 0
+        # Read the raw frame from the pipe.
+        while n_bytes < len(buffer):
+            n_bytes_read = self.process.stdout.readinto(buffer[n_bytes:])
+            if not n_bytes_read:
+                return False, None
+            n_bytes += n_bytes_read
+        self.frame_number += 1
+        return True, frame
+
+    def seek(self, frame_number):
+        # Restart the subprocess at the frame.
+        self.release()
+        self.frame_number = frame_number
+
+    def release(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.stdout.close()
+            self.process.wait()
+            self.process = None
+
+class PyAVFrameSource(FrameSource):
+    '''
+    Frame source that decodes the frames using PyAV.
+
+    Steps:
+        The video stream is opened with frame and slice threading enabled.
+        When seeking, PyAV seeks to the keyframe before the frame and the frames before the frame are decoded and skipped.
+        Each decoded frame is converted into a gray8 or bgr24 array.
+    '''
+    def __init__(self, video_path, grayscale = False, n_threads = 0):
+        if import_pyav() is None:
+            raise ImportError('PyAV must be installed to use the pyav backend.')
+        FrameSource.__init__(self, video_path, grayscale = grayscale, n_threads = n_threads)
+        self.container = av.open(video_path)
+        self.stream = self.container.streams.video[0]
+        # Enable multi-threaded decoding.
+        self.stream.thread_type = 'AUTO'
+        if n_threads > 0:
+            self.stream.thread_count = n_threads
+        self.frames = self.container.decode(self.stream)
+        self.seek_frame_number = None
+
+    def get_frame_number_of_frame(self, frame):
+        # Calculate the frame number from the presentation time of the frame.
+        start_time = self.stream.start_time or 0
+        return int(round(float((frame.pts - start_time) * self.stream.time_base) * self.fps))
+
+    def decode_next_frame(self):
+        if self.seek_frame_number is None:
+            return next(self.frames, None)
+        frame_number = self.seek_frame_number
+        self.seek_frame_number = None
+        # Seek to the keyframe before the frame.
+        start_time = self.stream.start_time or 0
+        self.container.seek(start_time + int(frame_number / self.fps / self.stream.time_base), stream = self.stream, backward = True)
+        self.frames = self.container.decode(self.stream)
+        # Skip the frames before the frame.
+        for frame in self.frames:
+            if frame.pts is None or self.get_frame_number_of_frame(frame) >= frame_number:
+                return frame
+        return None
+
+    def grab(self):
+        # Decode the frame without converting it into an array.
+        if self.decode_next_frame() is None:
+            return False
+        self.frame_number += 1
+        return True
+
+    def read(self):
+        frame = self.decode_next_frame()
+        if frame is None:
+            return False, None
+        self.frame_number += 1
+        return True, frame.to_ndarray(format = 'gray' if self.grayscale else 'bgr24')
+
+    def seek(self, frame_number):
+        self.frame_number = frame_number
+        self.seek_frame_number = frame_number
+
+    def release(self):
+        self.container.close()
+
+class MemoryMappedFrameSource(FrameSource):
+    '''
+    Frame source that memory-maps a raw 8-bit frame stack.
+
+    Steps:
+        The frame stack is memory-mapped using load_raw_video.
+        Reading a grayscale frame returns a read-only view of the frame in the memory-mapped stack, without copying or decoding the frame.
+        Seeking only sets the frame number, so every frame can be accessed in constant time.
+        Colour frames are created by converting the grayscale frame.
+    '''
+    def __init__(self, video_path, grayscale = False, n_threads = 0):
+        self.video_path = video_path
+        self.grayscale = grayscale
+        self.n_threads = n_threads
+        self.frames, self.fps = load_raw_video(video_path)
+        self.n_frames, self.frame_height, self.frame_width = self.frames.shape
+        self.frame_number = 0
+
+    def grab(self):
+        if self.frame_number >= self.n_frames:
+            return False
+        self.frame_number += 1
+        return True
+
+    def read(self):
+        if not 0 <= self.frame_number < self.n_frames:
+            return False, None
+        frame = self.frames[self.frame_number]
+        self.frame_number += 1
+        if not self.grayscale:
+            # Convert the frame to a colour frame.
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        return True, frame
+
+    def seek(self, frame_number):
+        self.frame_number = frame_number
+
+class PrefetchingFrameReader(object):
+    '''
+    Reads frames from a video in a background thread and preprocesses them ahead of the tracking.
+
+    Steps:
+        A path to the video is provided.
+        A background thread opens the video, sets the frame position to the starting frame, and reads each frame.
+        Each frame that was read successfully is preprocessed in the background thread.
+        The frames are placed in a bounded queue so that decoding and preprocessing overlap with tracking without holding the whole video in memory.
+        Iterating through the reader returns the frames in order.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        starting_frame (int) - Frame number of the first frame to read. Default = 0.
+        n_frames (int) - Number of frames to read. Default = None.
+            ** When n_frames is None, the frames are read until the end of the video.
+        preprocess_function (function) - Function that is called with each frame that was read successfully and returns the preprocessed frame. Default = None.
+            ** When preprocess_function is None, the preprocessed frame is None.
+        queue_size (int) - Maximum number of frames held in the queue. Default = 32.
+        backend (str) - Same as in open_video. Default = opencv.
+        grayscale (bool) - Same as in open_video. Default = False.
+
+    Returns:
+        Iterating through the reader returns, for each frame, a list containing the frame number, whether the frame was read successfully, the frame, and the preprocessed frame.
+    '''
+    def __init__(self, video_path, starting_frame = 0, n_frames = None, preprocess_function = None, queue_size = 32, backend = 'opencv', grayscale = False):
+        self.video_path = video_path
+        self.backend = backend
+        self.grayscale = grayscale
+        self.starting_frame = starting_frame
+        self.n_frames = n_frames
+        self.preprocess_function = preprocess_function
+        self.frame_queue = queue.Queue(maxsize = queue_size)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __iter__(self):
+        if self.thread is None:
+            self.start()
+        while True:
+            item = self.frame_queue.get()
+            # The reader thread puts None into the queue once all of the frames have been read.
+            if item is None:
+                break
+            # Errors that occur in the reader thread are raised in the tracking thread.
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def start(self):
+        self.thread = threading.Thread(target = self.read_frames)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            # Empty the queue so that the reader thread is not blocked while putting a frame into the queue.
+            while self.thread.is_alive():
+                try:
+                    self.frame_queue.get(timeout = 0.1)
+                except queue.Empty:
+                    pass
+            self.thread.join()
+
+    def put(self, item):
+        # Wait for space in the queue unless the reader has been stopped.
+        while not self.stop_event.is_set():
+            try:
+                self.frame_queue.put(item, timeout = 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read_frames(self):
+        capture = None
+        try:
+            # Open the video path.
+            capture = open_video(self.video_path, self.backend, self.grayscale)
+            n_frames = self.n_frames
+            if n_frames is None:
+                n_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) - self.starting_frame
+            # Set the frame position to start.
+            capture.set(cv2.CAP_PROP_POS_FRAMES, self.starting_frame)
+            # Iterate through each frame.
+            for frame_number in range(self.starting_frame, self.starting_frame + n_frames):
+                # Load a frame into memory.
+                success, original_frame = capture.read()
+                frame = None
+                # Preprocess the frame if it was loaded successfully.
+                if success and self.preprocess_function is not None:
+                    frame = self.preprocess_function(original_frame)
+                if not self.put([frame_number, success, original_frame, frame]):
+                    return
+        except Exception as error:
+            self.put(error)
+        finally:
+            # Unload the video from memory.
+            if capture is not None:
+                capture.release()
+        self.put(None)
+
+class CachedFrameReader(object):
+    '''
+    Keeps a video open for random access to its frames, such as previewing the frames of a video while scrubbing or playing back the video.
+
+    Steps:
+        The video is opened once and kept open until the reader is released.
+        Frames that are read are kept in a least recently used cache, so that returning to a recent frame does not decode the frame again.
+        Frames that are not in the cache are read by grabbing the frames in between when the frame is a short distance ahead of the current position of the video, or by seeking otherwise.
+        After each frame is read, the next frames in the direction of playback are read ahead into the cache in a background thread.
+            ** The direction of playback is the difference between the frame numbers of the last two frames that were read. Frames are only read ahead when moving forwards.
+            ** Reading ahead stops whenever another frame is requested, so that the requested frame is read first.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        cache_size (int) - Maximum number of frames held in the cache. Default = 50.
+        read_ahead (int) - Number of frames read ahead in the direction of playback. Default = 8.
+            ** When read_ahead is 0, frames are not read ahead.
+        backend (str) - Same as in open_video. Default = opencv.
+        grayscale (bool) - Same as in open_video. Default = True.
+        max_frames_to_grab (int) - Maximum number of frames to grab instead of seeking. Default = 25.
+
+    Returns:
+        Reading a frame with read_frame returns whether the frame was read successfully and a copy of the frame.
+    '''
+    def __init__(self, video_path, cache_size = 50, read_ahead = 8, backend = 'opencv', grayscale = True, max_frames_to_grab = 25):
+        self.video_path = video_path
+        self.cache_size = cache_size
+        self.read_ahead = read_ahead
+        self.max_frames_to_grab = max_frames_to_grab
+        self.capture = open_video(video_path, backend, grayscale)
+        self.n_frames = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.next_frame_number = 0
+        self.last_frame_number = None
+        self.cache = OrderedDict()
+        self.read_ahead_frame_numbers = []
+        self.n_requests = 0
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target = self.read_ahead_frames)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def decode_frame(self, frame_number):
+        # Must be called while holding the condition, since the video cannot be read by two threads at once.
+        if 0 <= frame_number - self.next_frame_number <= self.max_frames_to_grab:
+            # Grab the frames in between without retrieving them.
+            for i in range(frame_number - self.next_frame_number):
+                self.capture.grab()
+        else:
+            # Seek to the frame.
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        success, frame = self.capture.read()
+        self.next_frame_number = frame_number + 1
+        if success:
+            # Add the frame to the cache and remove the least recently used frames.
+            self.cache[frame_number] = frame
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last = False)
+        return success, frame
+
+    def read_frame(self, frame_number):
+        if not 0 <= frame_number < self.n_frames:
+            return False, None
+        # Stop reading ahead until the frame has been read.
+        self.n_requests += 1
+        with self.condition:
+            self.n_requests -= 1
+            if frame_number in self.cache:
+                success, frame = True, self.cache[frame_number]
+                self.cache.move_to_end(frame_number)
+            else:
+                success, frame = self.decode_frame(frame_number)
+            # Read ahead in the direction of playback.
+            step = 1 if self.last_frame_number is None else frame_number - self.last_frame_number
+            self.last_frame_number = frame_number
+            self.read_ahead_frame_numbers = [frame_number + step * i for i in range(1, self.read_ahead + 1) if step > 0 and frame_number + step * i < self.n_frames]
+            self.condition.notify()
+        if not success:
+            return False, None
+        # Return a copy so that the frame in the cache is not modified.
+        return True, frame.copy()
+
+    def read_ahead_frames(self):
+        with self.condition:
+            while self.running:
+                # Wait until there are frames to read ahead and no frame has been requested.
+                if len(self.read_ahead_frame_numbers) == 0 or self.n_requests > 0:
+                    self.condition.wait(0.1)
+                    continue
+                frame_number = self.read_ahead_frame_numbers.pop(0)
+                if frame_number in self.cache:
+                    self.cache.move_to_end(frame_number)
+                else:
+                    self.decode_frame(frame_number)
+
+    def release(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+        self.capture.release()
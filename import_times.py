@@ -0,0 +1,72 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# Import libraries.
+import sys
+import json
+import subprocess
+
+# Maximum time in seconds to import each module in a new Python process, measured on a desktop computer.
+# Worker processes import utilities, so importing utilities must stay fast for spawning the worker processes to stay fast.
+IMPORT_TIME_BUDGETS = {'utilities' : 0.5, 'batch_tracking' : 0.5, 'track_videos' : 0.5, 'tracking_window' : 1.5, 'main' : 1.5}
+# Modules that must not be imported by each module.
+FORBIDDEN_IMPORTS = {'utilities' : ['PyQt5', 'matplotlib', 'scipy', 'av'], 'batch_tracking' : ['PyQt5', 'matplotlib', 'scipy', 'av'], 'track_videos' : ['PyQt5', 'matplotlib', 'scipy', 'av'],
+                    'tracking_window' : ['matplotlib', 'scipy', 'av'], 'main' : ['matplotlib', 'scipy', 'av']}
+# Code run in a new Python process to measure the time to import a module and find the modules that were imported.
+MEASURE_IMPORT_CODE = 'import sys, time, json; t0 = time.perf_counter(); import {0}; print(json.dumps([time.perf_counter() - t0, sorted(sys.modules)]))'
+
+def measure_import_time(module, n_repeats = 3):
+    '''
+    Function that measures the time to import a module in a new Python process.
+
+    Required Arguments:
+        module (str) - Name of the module.
+
+    Optional Arguments:
+        n_repeats (int) - Number of times the import is measured. Default = 3.
+            ** The shortest time is returned, since the first import may include the time to read the files from disk.
+
+    Returns:
+        import_time (float) - Time to import the module in seconds.
+            ** Returns None if the module could not be imported.
+        imported_modules (list(str)) - Names of the modules that were imported.
+    '''
+    import_times = []
+    for i in range(n_repeats):
+        result = subprocess.run([sys.executable, '-c', MEASURE_IMPORT_CODE.format(module)], stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+        if result.returncode != 0:
+            print('Error: Could not import {0}. {1}'.format(module, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ''))
+            return None, []
+        import_time, imported_modules = json.loads(result.stdout.strip().splitlines()[-1])
+        import_times.append(import_time)
+    return min(import_times), imported_modules
+
+def check_import_times(modules = None):
+    '''
+    Function that checks that each module is imported within its import time budget and does not import forbidden modules.
+
+    Optional Arguments:
+        modules (list(str)) - Names of the modules to check. Default = None.
+            ** When modules is None, every module in IMPORT_TIME_BUDGETS is checked.
+
+    Returns:
+        within_budget (bool) - True if every module that could be imported is within its budget and does not import forbidden modules.
+    '''
+    if modules is None:
+        modules = list(IMPORT_TIME_BUDGETS.keys())
+    within_budget = True
+    for module in modules:
+        import_time, imported_modules = measure_import_time(module)
+        if import_time is None:
+            continue
+        forbidden_modules = [forbidden_module for forbidden_module in FORBIDDEN_IMPORTS.get(module, []) if forbidden_module in imported_modules]
+        status = 'OK'
+        if import_time > IMPORT_TIME_BUDGETS.get(module, float('inf')) or len(forbidden_modules) > 0:
+            status = 'OVER BUDGET'
+            within_budget = False
+        print('{0}: {1} s (budget = {2} s). {3}'.format(module, round(import_time, 3), IMPORT_TIME_BUDGETS.get(module), status))
+        if len(forbidden_modules) > 0:
+            print('    Imports {0}.'.format(', '.join(forbidden_modules)))
+    return within_budget
+
+if __name__ == '__main__':
+    sys.exit(0 if check_import_times(sys.argv[1:] if len(sys.argv) > 1 else None) else 1)
@@ -0,0 +1,190 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# Import libraries.
+import numpy as np
+
+def calculate_rotated_tail_coords(tail_coord_array, body_coord_array):
+    '''
+    Function that rotates the tail coordinates of every frame so that the first tail point lies along the same axis from the body coordinates.
+
+    Steps:
+        1. Calculate the angle between the body coordinates and the first tail point in every frame.
+        2. Subtract the body coordinates from the tail coordinates.
+        3. Rotate the tail coordinates by the angle calculated in step 1.
+
+    Required Arguments:
+        tail_coord_array (n frames, n tail points + 1, 2) - Tail coordinates of every frame.
+        body_coord_array (n frames, 2) - Body coordinates of every frame.
+
+    Returns:
+        body_tail_angles (n frames) - Angle between the body coordinates and the first tail point in every frame.
+        rotated_tail_coords (n frames, n tail points + 1, 2) - Rotated tail coordinates of every frame.
+    '''
+    tail_coord_array = np.asarray(tail_coord_array)
+    body_coord_array = np.asarray(body_coord_array)
+    # Angle between the body and the first tail point.
+    body_tail_angles = np.arctan2(tail_coord_array[:, 0, 0] - body_coord_array[:, 0], tail_coord_array[:, 0, 1] - body_coord_array[:, 1])
+    # Tail coordinates relative to the body coordinates.
+    tail_coords = tail_coord_array - body_coord_array[:, np.newaxis, :]
+    # Broadcast the rotation of each frame across the tail points.
+    cos_angles = np.cos(body_tail_angles)[:, np.newaxis]
+    sin_angles = np.sin(body_tail_angles)[:, np.newaxis]
+    rotated_tail_coords = np.empty_like(tail_coords)
+    rotated_tail_coords[:, :, 0] = tail_coords[:, :, 0] * cos_angles - tail_coords[:, :, 1] * sin_angles
+    rotated_tail_coords[:, :, 1] = tail_coords[:, :, 0] * sin_angles + tail_coords[:, :, 1] * cos_angles
+    return body_tail_angles, rotated_tail_coords
+
+def unwrap_angles_between_rows(angles):
+    '''
+    Function that unwraps each row of angles relative to the previous row.
+
+    Steps:
+        For each row after the first, subtract 2 pi from the angles that are more than pi greater than the angle in the previous row and add 2 pi to the angles that are more than pi less than the angle in the previous row.
+        Each row is compared to the previous row after the previous row has been unwrapped.
+
+    Required Arguments:
+        angles (n rows, n frames) - Angles to unwrap, such as the angle of each tail segment or each eye.
+
+    Returns:
+        unwrapped_angles (n rows, n frames) - Unwrapped angles.
+            ** The angles are corrected by at most 2 pi in each frame, as in the original frame by frame calculation.
+    '''
+    unwrapped_angles = np.array(angles)
+    for i in range(1, len(unwrapped_angles)):
+        differences = unwrapped_angles[i] - unwrapped_angles[i - 1]
+        unwrapped_angles[i][differences > np.pi] -= np.pi * 2
+        unwrapped_angles[i][differences < -np.pi] += np.pi * 2
+    return unwrapped_angles
+
+def calculate_tail_angles(rotated_tail_coords):
+    '''
+    Function that calculates the angle of each tail segment in every frame.
+
+    Required Arguments:
+        rotated_tail_coords (n frames, n tail points + 1, 2) - Rotated tail coordinates returned by calculate_rotated_tail_coords.
+
+    Returns:
+        tail_angles (n tail points, n frames) - Angle of each tail segment in every frame.
+            ** The angle of each tail segment is unwrapped relative to the angle of the previous tail segment.
+    '''
+    # Differences between successive tail points.
+    segments = np.diff(rotated_tail_coords, axis = 1)
+    tail_angles = np.arctan2(segments[:, :, 0], segments[:, :, 1]).T
+    return unwrap_angles_between_rows(tail_angles)
+
+def fill_initial_heading_angle(heading_angle_array):
+    '''
+    Function that replaces a missing heading angle in the first frame with the first heading angle that was tracked.
+
+    Required Arguments:
+        heading_angle_array (n frames) - Heading angle of every frame.
+
+    Returns:
+        heading_angle_array (n frames) - Heading angle of every frame.
+            ** A copy is returned if the first heading angle is replaced, since the loaded arrays are read only.
+    '''
+    heading_angle_array = np.asarray(heading_angle_array)
+    if len(heading_angle_array) > 0 and np.isnan(heading_angle_array[0]):
+        tracked_frames = np.flatnonzero(~np.isnan(heading_angle_array))
+        if len(tracked_frames) > 0:
+            heading_angle_array = np.array(heading_angle_array)
+            heading_angle_array[0] = heading_angle_array[tracked_frames[0]]
+    return heading_angle_array
+
+def calculate_heading_angles(heading_angle_array):
+    '''
+    Function that calculates the heading angle of every frame relative to the first frame.
+
+    Steps:
+        1. Subtract the heading angle of the first frame.
+        2. Find the frames where the heading angle increases or decreases by more than pi from the previous frame.
+        3. Use the cumulative sum of the wraps to add the multiple of 2 pi that unwraps the heading angle of every following frame.
+
+    Required Arguments:
+        heading_angle_array (n frames) - Heading angle of every frame returned by fill_initial_heading_angle.
+
+    Returns:
+        heading_angles (n frames) - Unwrapped heading angle of every frame relative to the first frame.
+            ** The multiple of 2 pi is added once to every frame instead of adding 2 pi to the following frames after every wrap, so the angles can differ from the frame by frame calculation in the last digit.
+            ** For the same reason, a frame whose difference from the previous frame is within that rounding of exactly pi can be unwrapped differently from the frame by frame calculation.
+    '''
+    heading_angle_array = np.asarray(heading_angle_array)
+    heading_angles = heading_angle_array - heading_angle_array[0]
+    differences = np.diff(heading_angles)
+    wraps = np.zeros(len(heading_angles))
+    # Add 2 pi to the following frames when the heading angle decreases by more than pi and subtract 2 pi when it increases by more than pi.
+    wraps[1:] = (differences < -np.pi).astype(float) - (differences > np.pi)
+    return (heading_angles + np.cumsum(wraps) * np.pi * 2).astype(heading_angles.dtype)
+
+def calculate_eye_angles(eye_angle_array, heading_angle_array):
+    '''
+    Function that calculates the angle of each eye relative to the heading angle in every frame.
+
+    Required Arguments:
+        eye_angle_array (n frames, 2) - Angle of each eye in every frame.
+        heading_angle_array (n frames) - Heading angle of every frame returned by fill_initial_heading_angle.
+
+    Returns:
+        eye_angles (2, n frames) - Angle of each eye relative to the heading angle in every frame.
+            ** The angle of the second eye is unwrapped relative to the angle of the first eye.
+    '''
+    eye_angles = (np.asarray(eye_angle_array) - np.asarray(heading_angle_array)[:, np.newaxis]).T
+    return unwrap_angles_between_rows(eye_angles)
+
+def smooth_angles(angles, smoothing_factor = 3):
+    '''
+    Function that smooths angles over time using a moving average.
+
+    Required Arguments:
+        angles (n frames) or (n rows, n frames) - Angles to smooth.
+
+    Optional Arguments:
+        smoothing_factor (int) - Number of frames in the moving average. Default = 3.
+
+    Returns:
+        smoothed_angles (n frames) or list((n frames)) - Smoothed angles, the same length as the angles.
+            ** Uses np.convolve in the same mode as the GUI, which is linear in the number of frames.
+    '''
+    kernel = np.ones(smoothing_factor) / smoothing_factor
+    if np.ndim(angles) == 1:
+        return np.convolve(angles, kernel, mode = 'same')
+    return [np.convolve(row, kernel, mode = 'same') for row in angles]
+
+def calculate_kinematics(tail_coord_array, body_coord_array, heading_angle_array, eye_angle_array, smoothing_factor = 3):
+    '''
+    Function that calculates the tail, heading and eye kinematics of a tracked video.
+
+    Steps:
+        1. Rotate the tail coordinates using calculate_rotated_tail_coords.
+        2. Calculate the angles of each tail segment using calculate_tail_angles.
+        3. Calculate the heading angles relative to the first frame using calculate_heading_angles.
+        4. Calculate the eye angles relative to the heading angles using calculate_eye_angles.
+        5. Smooth the tail, heading, and eye angles using smooth_angles.
+
+    Required Arguments:
+        tail_coord_array (n frames, n tail points + 1, 2) - Tail coordinates of every frame.
+        body_coord_array (n frames, 2) - Body coordinates of every frame.
+        heading_angle_array (n frames) - Heading angle of every frame.
+        eye_angle_array (n frames, 2) - Angle of each eye in every frame.
+
+    Optional Arguments:
+        smoothing_factor (int) - Same as in smooth_angles. Default = 3.
+
+    Returns:
+        kinematics (dict) - Dictionary containing the body tail angles, rotated tail coordinates, tail angles, heading angles, eye angles, the sum of the absolute tail angles, and the smoothed angles.
+            ** Every calculation is vectorized across frames, so the time taken is linear in the number of frames.
+    '''
+    body_tail_angles, rotated_tail_coords = calculate_rotated_tail_coords(tail_coord_array, body_coord_array)
+    tail_angles = calculate_tail_angles(rotated_tail_coords)
+    heading_angle_array = fill_initial_heading_angle(heading_angle_array)
+    heading_angles = calculate_heading_angles(heading_angle_array)
+    eye_angles = calculate_eye_angles(eye_angle_array, heading_angle_array)
+    sum_tail_angles = np.sum(np.abs(tail_angles), axis = 0)
+    kinematics = {'body_tail_angles' : body_tail_angles, 'rotated_tail_coords' : rotated_tail_coords, 'tail_angles' : tail_angles, 'heading_angle_array' : heading_angle_array,
+                    'heading_angles' : heading_angles, 'eye_angles' : eye_angles, 'sum_tail_angles' : sum_tail_angles,
+                    # Frames in which the sum of the absolute tail angles is the same as in the next frame.
+                    'tail_angle_frames' : np.flatnonzero(sum_tail_angles[:-1] == sum_tail_angles[1:]),
+                    'smoothed_tail_angles' : smooth_angles(tail_angles, smoothing_factor = smoothing_factor),
+                    'smoothed_heading_angles' : smooth_angles(heading_angles, smoothing_factor = smoothing_factor),
+                    'smoothed_eye_angles' : smooth_angles(eye_angles, smoothing_factor = smoothing_factor)}
+    return kinematics
@@ -3,9 +3,8 @@
 # import python modules
 import sys
 from tracking_window import TrackingWindow
-from plotting_window import PlottingWindow
 
-from PyQt5.QtWidgets import QMainWindow, QTabWidget, QApplication, QDesktopWidget, QMenuBar, QAction
+from PyQt5.QtWidgets import QMainWindow, QTabWidget, QApplication, QDesktopWidget, QMenuBar, QAction, QWidget
 from PyQt5.QtCore import Qt
 
 class MainWindow(QMainWindow):
@@ -98,13 +97,13 @@ class MainWindow(QMainWindow):
     def trigger_open_video(self):
         self.main_tab.tracking_window.tracking_content.trigger_open_video()
     def trigger_open_tracked_video(self):
-        self.main_tab.plotting_window.plotting_content.trigger_open_video()
+        self.main_tab.load_plotting_window().plotting_content.trigger_open_video()
     def trigger_unload_all_tracking(self):
         self.main_tab.tracking_window.tracking_content.trigger_unload_all_tracking()
     def trigger_load_tracking_results(self):
-        self.main_tab.plotting_window.plotting_content.trigger_load_tracking_results()
+        self.main_tab.load_plotting_window().plotting_content.trigger_load_tracking_results()
     def trigger_unload_all_plotting(self):
-        self.main_tab.plotting_window.plotting_content.trigger_unload_all_plotting()
+        self.main_tab.load_plotting_window().plotting_content.trigger_unload_all_plotting()
 
     # Defining Event Functions
     def closeEvent(self, event):
@@ -127,8 +126,24 @@ class MainTab(QTabWidget):
         self.main_window_height = main_window_height
         self.tracking_window = TrackingWindow(self.main_window_width, self.main_window_height)
         self.addTab(self.tracking_window,"Tracking")
-        self.plotting_window = PlottingWindow()
-        self.addTab(self.plotting_window, "Plotting")
+        # The plotting window is created the first time it is used, since importing matplotlib slows down starting the GUI.
+        self.plotting_window = None
+        self.addTab(QWidget(), "Plotting")
+        self.currentChanged.connect(self.check_plotting_tab)
+
+    def load_plotting_window(self):
+        if self.plotting_window is None:
+            from plotting_window import PlottingWindow
+            self.plotting_window = PlottingWindow()
+            current_index = self.currentIndex()
+            self.removeTab(1)
+            self.insertTab(1, self.plotting_window, "Plotting")
+            self.setCurrentIndex(current_index)
+        return self.plotting_window
+
+    def check_plotting_tab(self, index):
+        if index == 1:
+            self.load_plotting_window()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -0,0 +1,88 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# Import libraries.
+import numpy as np
+
+# Maximum number of points drawn for each line, about twice the width of the plots in pixels.
+DEFAULT_POINT_BUDGET = 4000
+# Number of bins of each level of the pyramid that are combined into one bin of the next level.
+DECIMATION_FACTOR = 4
+
+def calculate_decimation_pyramid(values, factor = DECIMATION_FACTOR):
+    '''
+    Function that calculates a pyramid of the minimum and maximum values in bins of increasing size.
+
+    Steps:
+        1. Split the values into bins of factor samples and find the minimum and maximum of each bin.
+        2. Split the minimum and maximum of the previous level into bins of factor bins and find the minimum and maximum of each bin.
+        3. Repeat step 2 until a single bin remains.
+
+    Required Arguments:
+        values (n frames) - Values of a line, such as the angle of a tail segment in every frame.
+
+    Optional Arguments:
+        factor (int) - Number of bins of each level that are combined into one bin of the next level. Default = 4.
+
+    Returns:
+        pyramid (dict) - Dictionary containing the values and a list of levels.
+            ** Each level contains the number of frames in each bin and the minimum and maximum of each bin.
+            ** Missing values (NaN) are ignored. Bins that only contain missing values are NaN.
+            ** The levels contain less than half as many values as the line in total, and are calculated in linear time.
+    '''
+    values = np.asarray(values)
+    levels = []
+    minimum = values
+    maximum = values
+    bin_size = 1
+    while len(minimum) > 1:
+        n_bins = int(np.ceil(len(minimum) / factor))
+        n_padding = n_bins * factor - len(minimum)
+        if n_padding > 0:
+            # Pad the last bin with missing values, which are ignored.
+            minimum = np.concatenate([minimum, np.full(n_padding, np.nan)])
+            maximum = np.concatenate([maximum, np.full(n_padding, np.nan)])
+        minimum = np.fmin.reduce(minimum.reshape(n_bins, factor), axis = 1)
+        maximum = np.fmax.reduce(maximum.reshape(n_bins, factor), axis = 1)
+        bin_size *= factor
+        levels.append({'bin_size' : bin_size, 'minimum' : minimum, 'maximum' : maximum})
+    return {'values' : values, 'levels' : levels}
+
+def get_decimated_data(pyramid, timepoints, start_time = None, end_time = None, point_budget = DEFAULT_POINT_BUDGET):
+    '''
+    Function that returns the points of a line that are drawn between two times, using the level of the pyramid with the highest resolution within the point budget.
+
+    Required Arguments:
+        pyramid (dict) - Pyramid returned by calculate_decimation_pyramid.
+        timepoints (n frames) - Time of every frame, in increasing order.
+
+    Optional Arguments:
+        start_time (float) - Start of the visible range. Default = None.
+            ** When start_time is None, the line is drawn from the first frame.
+        end_time (float) - End of the visible range. Default = None.
+            ** When end_time is None, the line is drawn to the last frame.
+        point_budget (int) - Maximum number of points returned. Default = 4000.
+
+    Returns:
+        x (n points) - Times of the points.
+        y (n points) - Values of the points.
+            ** When the visible range contains more frames than the point budget, each bin is drawn as its minimum followed by its maximum at the time of the first frame in the bin, so that the envelope of the line is preserved.
+            ** One extra frame or bin is included on either side of the visible range so that the line continues to the edges of the plot.
+    '''
+    values = pyramid['values']
+    n_frames = min(len(values), len(timepoints))
+    start = 0 if start_time is None else max(int(np.searchsorted(timepoints[:n_frames], start_time, side = 'left')) - 1, 0)
+    stop = n_frames if end_time is None else min(int(np.searchsorted(timepoints[:n_frames], end_time, side = 'right')) + 1, n_frames)
+    if stop - start <= point_budget:
+        return timepoints[start:stop], values[start:stop]
+    # Find the level with the smallest bins that keeps the visible range within the point budget.
+    for level in pyramid['levels']:
+        if 2 * ((stop - start) / level['bin_size'] + 2) <= point_budget:
+            break
+    bin_size = level['bin_size']
+    first_bin = start // bin_size
+    last_bin = min(int(np.ceil(stop / bin_size)), len(level['minimum']))
+    x = np.repeat(timepoints[np.arange(first_bin, last_bin) * bin_size], 2)
+    y = np.empty(len(x), dtype = level['minimum'].dtype)
+    y[0::2] = level['minimum'][first_bin:last_bin]
+    y[1::2] = level['maximum'][first_bin:last_bin]
+    return x, y
@@ -2,15 +2,18 @@
 
 # import python modules
 import os
-import cv2
 import numpy as np
 import utilities as ut
+import frame_sources as fs
+import tracking_results as tr
+import kinematics as km
+import plot_decimation as pdec
+import preview_image as pi
 import threading
 from functools import partial
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvas, NavigationToolbar2QT as NavigationToolbar
-import matplotlib.pyplot as plt
-from timer_thread import TimerThread
+from video_playback_thread import VideoPlaybackThread
 
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
@@ -124,6 +127,7 @@ class PlottingContent(QMainWindow):
         self.play_video_max_speed = False
         self.data_plot = None
         self.video_playback_thread = None
+        self.playback_frame_number = None
 
     def get_main_window_attributes(self):
         self.main_window_width = QDesktopWidget().availableGeometry().width()
@@ -351,19 +355,19 @@ class PlottingContent(QMainWindow):
         self.data_plot_window.setFrameShape(QFrame.StyledPanel)
 
     def update_preview_frame(self, frame, frame_width, frame_height, scaled_width = None, grayscale = False):
-        if grayscale:
-            format = QImage.Format_Indexed8
-        else:
-            format = QImage.Format_RGB888
+        self.preview_frame = self.create_preview_image(frame, frame_width, frame_height, scaled_width = scaled_width, grayscale = grayscale)
+    def create_preview_image(self, frame, frame_width, frame_height, scaled_width = None, grayscale = False):
+        # The format of the image is chosen from the number of channels of the frame, and the frames of the video are displayed in BGR order without converting them.
         if scaled_width is None:
             scaled_width = int(self.video_frame_width / 100) * 100
         else:
             scaled_width = int(scaled_width / 100) * 100
-        self.preview_frame = QImage(frame.data, frame_width, frame_height, format)
-        self.preview_frame = self.preview_frame.scaledToWidth(scaled_width)
-        frame = cv2.resize(frame, dsize=(self.preview_frame.width(), self.preview_frame.height()), interpolation=cv2.INTER_CUBIC).copy()
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        self.preview_frame = QImage(frame.data, self.preview_frame.width(), self.preview_frame.height(), format)
+        # Height of the frame scaled to the width, rounded in the same way as QImage.scaledToWidth.
+        scaled_height = int((frame_height / frame_width) * scaled_width + 0.5)
+        return pi.create_preview_image(frame, scaled_width, scaled_height, bgr = True)
+    def create_playback_image(self, frame):
+        # Called by the playback thread. The image keeps the resized frame alive, so it can be displayed after the function returns.
+        return self.create_preview_image(frame, self.video_frame_width, self.video_frame_height, scaled_width = self.preview_frame_window_label_size[0])
     def update_preview_frame_window(self, clear = False):
         if not clear:
             self.preview_frame_window_label.setPixmap(QPixmap.fromImage(self.preview_frame))
@@ -504,7 +508,7 @@ class PlottingContent(QMainWindow):
             self.video_time_textbox.setText('{0}'.format(0))
 
     def trigger_open_video(self):
-        self.video_path, _ = QFileDialog.getOpenFileName(self,"Open Video File", "","Video Files (*.avi; *.mp4)", options=QFileDialog.Options())
+        self.video_path, _ = QFileDialog.getOpenFileName(self,"Open Video File", "","Video Files (*.avi; *.mp4, *.raw, *.npy)", options=QFileDialog.Options())
         if self.video_path:
             self.get_video_attributes()
             success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1, convert_to_grayscale = False)
@@ -519,6 +523,9 @@ class PlottingContent(QMainWindow):
                 self.update_frame_change_buttons(activate = True)
                 self.update_interactive_frame_buttons(activate = True)
     def trigger_update_preview(self, magnify = False, demagnify = False):
+        # Move the cursors of the plots to the current frame without redrawing the plots.
+        if self.data_plot is not None:
+            self.data_plot.update_cursors(self.frame_number)
         if self.video_path is not None:
             success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1, convert_to_grayscale = False)
             if success and self.frame is not None:
@@ -538,18 +545,22 @@ class PlottingContent(QMainWindow):
         else:
             self.update_preview_frame_window(clear = True)
     def trigger_load_tracking_results(self):
-        self.tracking_data_path, _ = QFileDialog.getOpenFileName(self, "Open Tracking Data", "","Tracking Data (*.npy)", options = QFileDialog.Options())
+        self.tracking_data_path, _ = QFileDialog.getOpenFileName(self, "Open Tracking Data", "","Tracking Data (metadata.json *.npy)", options = QFileDialog.Options())
         if self.tracking_data_path:
             # try:
-            data = np.load(self.tracking_data_path).item()
+            # Open the arrays as memory maps so that only the parts of the arrays that are used are read from the files.
+            data = tr.load_tracking_results(self.tracking_data_path, mmap_mode = 'r')
             self.data_plot = DataPlot()
             self.data_plot.initialize_class_variables(data = data)
             self.data_plot.calculate_variables()
             self.data_plot.update_plots()
+            self.data_plot.add_cursors(self.frame_number)
+            self.data_plot.frame_number_selected_signal.connect(self.check_data_plot_clicked)
             self.update_data_plot_window()
             # except:
             #     print('Error! Could not load tracking data.')
     def trigger_unload_all_plotting(self):
+        self.trigger_pause_video()
         self.update_data_plot_window(clear = True)
         self.initialize_class_variables()
         self.update_preview_frame_window(clear = True)
@@ -571,29 +582,46 @@ class PlottingContent(QMainWindow):
         if self.play_video_max_speed:
             self.play_video_max_speed = False
     def trigger_play_video_slow_speed(self):
-        if self.play_video_slow_speed:
-            self.frame_number += 1
-            if self.frame_number <= self.video_n_frames:
-                self.trigger_update_preview()
-            else:
-                self.frame_number = 1
-                self.trigger_update_preview()
+        # Play 10 frames per second.
+        self.trigger_play_video(10)
     def trigger_play_video_medium_speed(self):
-        if self.play_video_medium_speed:
-            self.frame_number += int(self.video_fps / 10)
-            if self.frame_number <= self.video_n_frames:
-                self.trigger_update_preview()
-            else:
-                self.frame_number = 1
-                self.trigger_update_preview()
+        # Play the video in real time.
+        self.trigger_play_video(self.video_fps)
     def trigger_play_video_max_speed(self):
-        if self.play_video_max_speed:
-            self.frame_number += int(self.video_fps)
-            if self.frame_number <= self.video_n_frames:
-                self.trigger_update_preview()
-            else:
-                self.frame_number = 1
-                self.trigger_update_preview()
+        # Play the video 10 times faster than real time.
+        self.trigger_play_video(self.video_fps * 10)
+    def trigger_play_video(self, playback_rate):
+        if self.video_playback_thread is not None:
+            self.video_playback_thread.close()
+            self.video_playback_thread.wait()
+        # Decode and prepare the frames in a background thread, which drops the frames that are no longer due to keep to the playback rate.
+        self.video_playback_thread = VideoPlaybackThread(self.video_path, frame_number = self.frame_number - 1, playback_rate = playback_rate, process_frame = self.create_playback_image)
+        self.video_playback_thread.frame_ready_signal.connect(self.trigger_update_playback_frame)
+        self.playback_frame_number = self.frame_number
+        self.video_playback_thread.start()
+    def trigger_update_playback_frame(self, frame_number):
+        if self.video_playback_thread is None:
+            return
+        if self.video_playback_thread.video_path != self.video_path:
+            # A different video was opened during playback, so play the new video instead.
+            self.trigger_play_video(self.video_playback_thread.playback_rate)
+            return
+        if self.frame_number != self.playback_frame_number:
+            # A different frame was selected during playback, so continue playback from the selected frame.
+            self.video_playback_thread.seek(self.frame_number - 1)
+            self.playback_frame_number = self.frame_number
+            return
+        ready_frame = self.video_playback_thread.get_ready_frame()
+        if ready_frame is None:
+            return
+        self.frame_number = self.playback_frame_number = ready_frame[0] + 1
+        self.preview_frame = ready_frame[1]
+        if self.data_plot is not None:
+            self.data_plot.update_cursors(self.frame_number)
+        self.update_preview_frame_window()
+        self.update_frame_window_slider(activate = True)
+        self.update_preview_frame_number_textbox(activate = True)
+        self.update_video_time_textbox(activate = True)
 
     def check_preview_frame_number_textbox(self):
         if self.preview_frame_number_textbox.text().isdigit():
@@ -682,10 +710,7 @@ class PlottingContent(QMainWindow):
                     self.video_playback_thread.close()
                     self.video_playback_thread.wait()
                     self.video_playback_thread = None
-            if self.video_playback_thread is None:
-                self.video_playback_thread = TimerThread(sleep_time = 0.1)
-                self.video_playback_thread.start()
-            self.video_playback_thread.time_signal.connect(self.trigger_play_video_slow_speed)
+            self.trigger_play_video_slow_speed()
             self.play_video_slow_speed = True
         else:
             self.play_video_slow_speed = False
@@ -709,10 +734,7 @@ class PlottingContent(QMainWindow):
                     self.video_playback_thread.close()
                     self.video_playback_thread.wait()
                     self.video_playback_thread = None
-            if self.video_playback_thread is None:
-                self.video_playback_thread = TimerThread(sleep_time = 0.1)
-                self.video_playback_thread.start()
-            self.video_playback_thread.time_signal.connect(self.trigger_play_video_medium_speed)
+            self.trigger_play_video_medium_speed()
             self.play_video_medium_speed = True
         else:
             self.play_video_medium_speed = False
@@ -736,10 +758,7 @@ class PlottingContent(QMainWindow):
                     self.video_playback_thread.close()
                     self.video_playback_thread.wait()
                     self.video_playback_thread = None
-            if self.video_playback_thread is None:
-                self.video_playback_thread = TimerThread(sleep_time = 0.1)
-                self.video_playback_thread.start()
-            self.video_playback_thread.time_signal.connect(self.trigger_play_video_max_speed)
+            self.trigger_play_video_max_speed()
             self.play_video_max_speed = True
         else:
             self.play_video_max_speed = False
@@ -758,6 +777,11 @@ class PlottingContent(QMainWindow):
         except:
             pass
         self.trigger_update_preview()
+    def check_data_plot_clicked(self, frame_number):
+        self.frame_number = frame_number
+        if self.video_path is not None and self.frame_number > self.video_n_frames:
+            self.frame_number = self.video_n_frames
+        self.trigger_update_preview()
 
     # Defining Event Functions
     def event_preview_frame_window_label_mouse_clicked(self, event):
@@ -790,6 +814,8 @@ class PlottingContent(QMainWindow):
 
 class DataPlot(QMainWindow):
 
+    frame_number_selected_signal = pyqtSignal(int)
+
     def __init__(self):
         super(DataPlot, self).__init__()
         self.initUI()
@@ -811,12 +837,17 @@ class DataPlot(QMainWindow):
         self.eye_angles_plot_toolbar = NavigationToolbar(self.eye_angles_plot, self.eye_angles_plot)
         layout.addWidget(self.eye_angles_plot)
     def initialize_class_variables(self, data):
+        self.cursors = []
         self.heading_angle_array = data['heading_angle_array']
         self.tail_coord_array = data['tail_coord_array']
         self.body_coord_array = data['body_coord_array']
         self.eye_angle_array = data['eye_angle_array']
         self.video_n_frames = data['video_n_frames']
         self.video_fps = data['video_fps']
+        # Results of raw frame stacks tracked without a frame rate were saved with an fps of 0.
+        if not self.video_fps > 0:
+            print('Warning! The tracking results do not give the fps of the video. Using {0} fps.'.format(fs.DEFAULT_FPS))
+            self.video_fps = fs.DEFAULT_FPS
         self.colours = data['colours']
         self.colours = [[self.colours[i][2]/255, self.colours[i][1]/255, self.colours[i][0]/255] for i in range(len(self.colours))]
         self.dist_tail_points = data['dist_tail_points']
@@ -829,102 +860,114 @@ class DataPlot(QMainWindow):
     def calculate_variables(self):
         self.smoothing_factor = 3
 
-        self.body_tail_angles = [np.arctan2(self.tail_coord_array[j][0][0] - self.body_coord_array[j][0], self.tail_coord_array[j][0][1] - self.body_coord_array[j][1]) for j in range(len(self.tail_coord_array))]
-        self.new_tail_coords = [[[self.tail_coord_array[j][i][0] - self.body_coord_array[j][0], self.tail_coord_array[j][i][1] - self.body_coord_array[j][1]] for i in range(len(self.tail_coord_array[0]))] for j in range(len(self.tail_coord_array))]
-        self.new_tail_coords = [[[self.new_tail_coords[j][i][0] * np.cos(self.body_tail_angles[j]) - self.new_tail_coords[j][i][1] * np.sin(self.body_tail_angles[j]), self.new_tail_coords[j][i][0] * np.sin(self.body_tail_angles[j]) + self.new_tail_coords[j][i][1] * np.cos(self.body_tail_angles[j])] for i in range(len(self.new_tail_coords[0]))] for j in range(len(self.new_tail_coords))]
-        self.tail_angles = [[np.arctan2(self.new_tail_coords[j][i + 1][0] - self.new_tail_coords[j][i][0], self.new_tail_coords[j][i + 1][1] - self.new_tail_coords[j][i][1]) for i in range(len(self.new_tail_coords[0]) - 1)] for j in range(len(self.new_tail_coords))]
-        self.tail_angles = [np.array([self.tail_angles[i][j] for i in range(len(self.tail_angles))]) for j in range(len(self.tail_angles[0]))]
-        for i in range(1, len(self.tail_angles)):
-            for j in range(len(self.tail_angles[i])):
-                if self.tail_angles[i][j] - self.tail_angles[i - 1][j] > np.pi:
-                    self.tail_angles[i][j] -= np.pi * 2
-                elif self.tail_angles[i][j] - self.tail_angles[i - 1][j] < -np.pi:
-                    self.tail_angles[i][j] += np.pi * 2
-
-        self.sum_tail_angles = [np.sum([abs(self.tail_angles[i][j]) for i in range(len(self.tail_angles))]) for j in range(len(self.tail_angles[0]))]
-        self.tail_angle_frames = np.where([self.sum_tail_angles[i] == self.sum_tail_angles[i + 1] == self.sum_tail_angles[i + 2] for i in range(len(self.sum_tail_angles) - 2)])[0]
-        self.tail_angle_frames = np.where([self.sum_tail_angles[i] == self.sum_tail_angles[i + 1] for i in range(len(self.sum_tail_angles) - 1)])[0]
-
-        # for i in range(1, len(self.tail_angle_frames)):
-        #     if self.tail_angle_frames[i] - self.tail_angle_frames[i - 1] == 2:
-        #         self.tail_angle_frames = np.append(self.tail_angle_frames, self.tail_angle_frames[i - 1] + 1)
-        #     elif self.tail_angle_frames[i] - self.tail_angle_frames[i - 1] == 3:
-        #         self.tail_angle_frames = np.append(self.tail_angle_frames, self.tail_angle_frames[i - 1] + 1)
-        #         self.tail_angle_frames = np.append(self.tail_angle_frames, self.tail_angle_frames[i - 1] + 2)
-
-        # for i in range(len(self.tail_angles)):
-        #     for j in self.tail_angle_frames:
-        #         self.tail_angles[i][j] = 0.0
-        self.smoothed_tail_angles = [np.convolve(self.tail_angles[i], np.ones(self.smoothing_factor)/self.smoothing_factor, mode = 'same') for i in range(len(self.tail_angles))]
-
-        if np.isnan(self.heading_angle_array[0]):
-            j = 0
-            while np.isnan(self.heading_angle_array[0]):
-                if not np.isnan(self.heading_angle_array[j]):
-                    self.heading_angle_array[0] = self.heading_angle_array[j]
-                j += 1
-
-        self.heading_angles = np.array([self.heading_angle_array[i] - self.heading_angle_array[0] for i in range(len(self.heading_angle_array))])
-
-        # i = 0
-        # for j in range(len(self.heading_angles)):
-        #     if j not in self.tail_angle_frames:
-        #         i = j
-        #     else:
-        #         self.heading_angles[j] = self.heading_angles[i]
-
-        for i in range(1, len(self.heading_angles)):
-            if self.heading_angles[i] - self.heading_angles[i - 1] > np.pi:
-                self.heading_angles[i:] -= np.pi * 2
-            elif self.heading_angles[i] - self.heading_angles[i - 1] < -np.pi:
-                self.heading_angles[i:] += np.pi * 2
-
-        self.smoothed_heading_angles = np.convolve(self.heading_angles, np.ones(self.smoothing_factor)/self.smoothing_factor, mode = 'same')
-
-        self.eye_angles = [[self.eye_angle_array[i][j] - self.heading_angle_array[i] for i in range(len(self.eye_angle_array))] for j in range(len(self.eye_angle_array[0]))]
-
-        # i = 0
-        # for k in range(len(self.eye_angles)):
-        #     for j in range(len(self.eye_angles[k])):
-        #         if j not in self.tail_angle_frames:
-        #             i = j
-        #         else:
-        #             self.eye_angles[k][j] = self.eye_angles[k][i]
-
-        # self.eye_angles = [[self.eye_angles[i][j] - np.pi * 2 if self.eye_angles[i][j] - self.eye_angles[i][j - 1] > np.pi else self.eye_angles[i][j] + np.pi * 2 if self.eye_angles[i][j] - self.eye_angles[i][j - 1] < -np.pi else self.eye_angles[i][j] for j in range(len(self.eye_angles[i]))] for i in range(len(self.eye_angles))]
-        for i in range(1, len(self.eye_angles)):
-            for j in range(len(self.eye_angles[i])):
-                if self.eye_angles[i][j] - self.eye_angles[i - 1][j] > np.pi:
-                    self.eye_angles[i][j] -= np.pi * 2
-                elif self.eye_angles[i][j] - self.eye_angles[i - 1][j] < -np.pi:
-                    self.eye_angles[i][j] += np.pi * 2
-
-        self.smoothed_eye_angles = [np.convolve(self.eye_angles[i], np.ones(self.smoothing_factor)/self.smoothing_factor, mode = 'same') for i in range(len(self.eye_angles))]
+        # Calculate the kinematics of every frame at once, since calculating them frame by frame takes minutes for long recordings.
+        kinematics = km.calculate_kinematics(self.tail_coord_array, self.body_coord_array, self.heading_angle_array, self.eye_angle_array, smoothing_factor = self.smoothing_factor)
+        self.body_tail_angles = kinematics['body_tail_angles']
+        self.new_tail_coords = kinematics['rotated_tail_coords']
+        self.tail_angles = kinematics['tail_angles']
+        self.sum_tail_angles = kinematics['sum_tail_angles']
+        self.tail_angle_frames = kinematics['tail_angle_frames']
+        self.smoothed_tail_angles = kinematics['smoothed_tail_angles']
+        self.heading_angle_array = kinematics['heading_angle_array']
+        self.heading_angles = kinematics['heading_angles']
+        self.smoothed_heading_angles = kinematics['smoothed_heading_angles']
+        self.eye_angles = kinematics['eye_angles']
+        self.smoothed_eye_angles = kinematics['smoothed_eye_angles']
 
         self.timepoints = np.linspace(0, self.video_n_frames / self.video_fps, self.video_n_frames)
 
+        # Calculate the decimation pyramids once, so that the plots only draw as many points as needed for the visible time range.
+        self.tail_angle_pyramids = [pdec.calculate_decimation_pyramid(self.smoothed_tail_angles[i]) for i in range(len(self.smoothed_tail_angles))]
+        self.heading_angle_pyramid = pdec.calculate_decimation_pyramid(self.smoothed_heading_angles)
+        self.eye_angle_pyramids = [pdec.calculate_decimation_pyramid(self.smoothed_eye_angles[i]) for i in range(len(self.smoothed_eye_angles))]
+
     def update_plots(self, clear = False):
 
         if not clear:
+            self.decimated_lines = {}
+
             self.tail_angle_plot_axis = self.tail_angle_plot.figure.subplots()
-            [self.tail_angle_plot_axis.plot(self.timepoints, self.smoothed_tail_angles[i], color = self.colours[i], lw = 1) for i in range(len(self.smoothed_tail_angles))]
+            [self.plot_decimated_line(self.tail_angle_plot_axis, self.tail_angle_pyramids[i], self.colours[i]) for i in range(len(self.tail_angle_pyramids))]
             self.tail_angle_plot_axis.set_xlabel('Time (s)')
             self.tail_angle_plot_axis.set_ylabel('Angle (radians)')
             self.tail_angle_plot_axis.set_title('Tail Kinematics Over Time')
 
             self.heading_angle_plot_axis = self.heading_angle_plot.figure.subplots()
-            self.heading_angle_plot_axis.plot(self.timepoints, self.smoothed_heading_angles, color = self.colours[-1], lw = 1)
+            self.plot_decimated_line(self.heading_angle_plot_axis, self.heading_angle_pyramid, self.colours[-1])
             self.heading_angle_plot_axis.set_xlabel('Time (s)')
             self.heading_angle_plot_axis.set_ylabel('Angle (radians)')
             self.heading_angle_plot_axis.set_title('Heading Angle Over Time')
 
             self.eye_angles_plot_axis = self.eye_angles_plot.figure.subplots()
-            [self.eye_angles_plot_axis.plot(self.timepoints, self.smoothed_eye_angles[i], color = self.colours[i - 3], lw = 1) for i in range(len(self.smoothed_eye_angles))]
+            [self.plot_decimated_line(self.eye_angles_plot_axis, self.eye_angle_pyramids[i], self.colours[i - 3]) for i in range(len(self.eye_angle_pyramids))]
             self.eye_angles_plot_axis.set_xlabel('Time (s)')
             self.eye_angles_plot_axis.set_ylabel('Angle (radians)')
             self.eye_angles_plot_axis.set_title('Eye Angles Over Time')
 
+            # Update the resolution of the lines whenever the plots are zoomed or panned.
+            for axis in [self.tail_angle_plot_axis, self.heading_angle_plot_axis, self.eye_angles_plot_axis]:
+                axis.callbacks.connect('xlim_changed', self.update_decimated_lines)
+
         else:
             self.tail_angle_plot_axis.cla()
             self.heading_angle_plot_axis.cla()
             self.eye_angles_plot_axis.cla()
+            self.decimated_lines = {}
+            [cursor['canvas'].mpl_disconnect(connection_id) for cursor in self.cursors for connection_id in cursor['connection_ids']]
+            self.cursors = []
+
+    def get_point_budget(self, axis):
+        # Draw at most a minimum and a maximum for every pixel across the plot.
+        return max(int(axis.bbox.width * 2), 2)
+
+    def plot_decimated_line(self, axis, pyramid, colour):
+        x, y = pdec.get_decimated_data(pyramid, self.timepoints, point_budget = self.get_point_budget(axis))
+        line, = axis.plot(x, y, color = colour, lw = 1)
+        if axis not in self.decimated_lines:
+            self.decimated_lines[axis] = []
+        self.decimated_lines[axis].append([line, pyramid])
+
+    def update_decimated_lines(self, axis):
+        start_time, end_time = axis.get_xlim()
+        for line, pyramid in self.decimated_lines.get(axis, []):
+            line.set_data(*pdec.get_decimated_data(pyramid, self.timepoints, start_time, end_time, point_budget = self.get_point_budget(axis)))
+
+    def add_cursors(self, frame_number):
+        # Draw a vertical line at the current frame on each plot. The lines are animated so that they are only drawn by blitting and never by a full redraw of the plots.
+        self.cursors = []
+        for canvas, axis, toolbar in [[self.tail_angle_plot, self.tail_angle_plot_axis, self.tail_angle_plot_toolbar], [self.heading_angle_plot, self.heading_angle_plot_axis, self.heading_angle_plot_toolbar], [self.eye_angles_plot, self.eye_angles_plot_axis, self.eye_angles_plot_toolbar]]:
+            line = axis.axvline(self.get_frame_time(frame_number), color = 'k', lw = 1, animated = True)
+            cursor = {'canvas' : canvas, 'axis' : axis, 'toolbar' : toolbar, 'line' : line, 'background' : None}
+            cursor['connection_ids'] = [canvas.mpl_connect('draw_event', partial(self.event_plot_drawn, cursor)), canvas.mpl_connect('button_press_event', partial(self.event_plot_clicked, cursor))]
+            self.cursors.append(cursor)
+            canvas.draw_idle()
+
+    def get_frame_time(self, frame_number):
+        # Frame numbers start at 1 and are clipped to the frames in the tracking data.
+        return self.timepoints[min(max(frame_number, 1), len(self.timepoints)) - 1]
+
+    def update_cursors(self, frame_number):
+        frame_time = self.get_frame_time(frame_number)
+        for cursor in self.cursors:
+            cursor['line'].set_xdata([frame_time, frame_time])
+            # Until the plot has been drawn once there is no background to restore, and the cursor is drawn with the plot.
+            if cursor['background'] is None:
+                continue
+            # Restore the plot without the cursor, draw only the cursor, and copy the region of the axis to the screen.
+            cursor['canvas'].restore_region(cursor['background'])
+            cursor['axis'].draw_artist(cursor['line'])
+            cursor['canvas'].blit(cursor['axis'].bbox)
+
+    def event_plot_drawn(self, cursor, event):
+        # Save the plot without the cursor whenever the plot is redrawn, such as after zooming or resizing, and draw the cursor on top.
+        cursor['background'] = cursor['canvas'].copy_from_bbox(cursor['axis'].bbox)
+        cursor['axis'].draw_artist(cursor['line'])
+
+    def event_plot_clicked(self, cursor, event):
+        # Seek to the frame closest to the time that was clicked, unless the toolbar is being used to zoom or pan.
+        if event.button != 1 or event.inaxes is not cursor['axis'] or event.xdata is None or cursor['toolbar'].mode:
+            return
+        frame_index = min(int(np.searchsorted(self.timepoints, event.xdata)), len(self.timepoints) - 1)
+        if frame_index > 0 and event.xdata - self.timepoints[frame_index - 1] < self.timepoints[frame_index] - event.xdata:
+            frame_index -= 1
+        self.frame_number_selected_signal.emit(frame_index + 1)
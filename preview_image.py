@@ -0,0 +1,110 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# import python modules
+import sys
+import numpy as np
+import cv2
+from PyQt5.QtGui import QImage
+
+# Scale from which frames are resized by repeating the pixels, which is the cheapest interpolation and shows the pixels of the frame when zoomed in.
+NEAREST_INTERPOLATION_MIN_SCALE = 2
+
+def get_preview_interpolation(scale):
+    '''
+    Function that returns the interpolation used to resize a frame for the preview, depending on the zoom level.
+
+    Required Arguments:
+        scale (float) - Width of the resized frame divided by the width of the frame.
+
+    Returns:
+        interpolation (int) - cv2.INTER_NEAREST when the frame is enlarged to twice its size or more, and cv2.INTER_LINEAR otherwise.
+            ** Both are cheaper than cv2.INTER_CUBIC, and cv2.INTER_AREA is several times slower when shrinking frames by a factor that is not a whole number.
+    '''
+    if scale >= NEAREST_INTERPOLATION_MIN_SCALE:
+        return cv2.INTER_NEAREST
+    return cv2.INTER_LINEAR
+
+def convert_frame_to_rgb32(frame, bgr = False):
+    '''
+    Function that converts a frame into the memory layout of QImage.Format_RGB32, which is the format that QPixmap uses to display images.
+
+    Required Arguments:
+        frame (frame height, frame width) or (frame height, frame width, 3) - Grayscale or colour frame of type uint8.
+
+    Optional Arguments:
+        bgr (bool) - Whether the channels of a colour frame are in the order used by OpenCV (blue, green, red) instead of (red, green, blue). Default = False.
+
+    Returns:
+        rgb32_frame (frame height, frame width, 4) - Frame with the channels in the order blue, green, red, alpha, which is the byte order of QImage.Format_RGB32 on little-endian computers.
+            ** Returns the frame unchanged on big-endian computers, where the frame is displayed using the 8-bit formats.
+    '''
+    if sys.byteorder != 'little':
+        return frame
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+    if bgr:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+    return cv2.cvtColor(frame, cv2.COLOR_RGB2BGRA)
+
+def convert_frame_to_qimage(frame, bgr = False):
+    '''
+    Function that creates a QImage that shares the memory of a frame, without copying the frame.
+
+    Required Arguments:
+        frame (frame height, frame width) or (frame height, frame width, 3 or 4) - Grayscale, colour, or converted frame of type uint8.
+            ** Frames with 4 channels are frames returned by convert_frame_to_rgb32.
+
+    Optional Arguments:
+        bgr (bool) - Same as in convert_frame_to_rgb32. Default = False.
+
+    Returns:
+        image (QImage) - Image of the frame.
+            ** The QImage does not own its memory, so the frame is kept alive as image.frame for as long as the image is used.
+    '''
+    if frame.ndim == 2:
+        format = QImage.Format_Grayscale8
+    elif frame.shape[2] == 4:
+        format = QImage.Format_RGB32
+    elif bgr and hasattr(QImage, 'Format_BGR888'):
+        format = QImage.Format_BGR888
+    elif bgr:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        format = QImage.Format_RGB888
+    else:
+        format = QImage.Format_RGB888
+    # Only copies the frame if the rows are not contiguous, such as a cropped frame.
+    frame = np.ascontiguousarray(frame)
+    image = QImage(frame.data, frame.shape[1], frame.shape[0], frame.strides[0], format)
+    image.frame = frame
+    return image
+
+def create_preview_image(frame, width, height, bgr = False):
+    '''
+    Function that creates the image of a frame that is displayed in the preview.
+
+    Steps:
+        1. Resize the frame once, using the interpolation for the zoom level.
+        2. Convert the frame into the format that QPixmap displays without converting the image, before resizing the frame when the frame is enlarged and after resizing the frame when the frame is shrunk, so that the smaller frame is converted.
+        3. Create a QImage that shares the memory of the converted frame.
+
+    Required Arguments:
+        frame (frame height, frame width) or (frame height, frame width, 3) - Grayscale or colour frame of type uint8.
+        width (int) - Width of the image.
+        height (int) - Height of the image.
+
+    Optional Arguments:
+        bgr (bool) - Same as in convert_frame_to_rgb32. Default = False.
+
+    Returns:
+        image (QImage) - Same as in convert_frame_to_qimage.
+    '''
+    width = max(int(width), 1)
+    height = max(int(height), 1)
+    scale = width / frame.shape[1]
+    if scale > 1:
+        frame = convert_frame_to_rgb32(frame, bgr = bgr)
+    if frame.shape[1] != width or frame.shape[0] != height:
+        frame = cv2.resize(frame, dsize = (width, height), interpolation = get_preview_interpolation(scale))
+    if scale <= 1:
+        frame = convert_frame_to_rgb32(frame, bgr = bgr)
+    return convert_frame_to_qimage(frame, bgr = bgr)
@@ -0,0 +1,248 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# Import libraries.
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import cv2
+import utilities as ut
+import frame_sources as fs
+import batch_tracking as bt
+
+# Extensions of the videos that are tracked when a folder is given.
+VIDEO_EXTENSIONS = ['.avi', '.mp4', '.mov'] + fs.RAW_VIDEO_EXTENSIONS
+
+def find_videos(video_inputs):
+    '''
+    Function that finds the videos to track from a list of folders, glob patterns, and video paths.
+
+    Required Arguments:
+        video_inputs (list(str)) - Folders, glob patterns, or paths to videos.
+            ** For folders, every file in the folder with a video extension is tracked, except for tracked videos.
+            ** Raw .npy frame stacks in a folder are only tracked if they have a sidecar file.
+
+    Returns:
+        video_paths (list(str)) - Sorted paths to the videos, without duplicates.
+    '''
+    video_paths = []
+    for video_input in video_inputs:
+        if os.path.isdir(video_input):
+            for filename in sorted(os.listdir(video_input)):
+                video_path = os.path.join(video_input, filename)
+                extension = os.path.splitext(filename)[1].lower()
+                if extension not in VIDEO_EXTENSIONS or filename.endswith('_tracked.avi'):
+                    continue
+                if extension == '.npy' and not os.path.isfile(fs.get_raw_video_sidecar_path(video_path)):
+                    continue
+                video_paths.append(video_path)
+        elif os.path.isfile(video_input):
+            video_paths.append(video_input)
+        else:
+            matching_paths = sorted(path for path in glob.glob(video_input) if os.path.isfile(path))
+            if len(matching_paths) == 0:
+                print('Warning! No videos found matching {0}.'.format(video_input))
+            video_paths += matching_paths
+    # Remove duplicate videos while keeping the order.
+    return list(dict.fromkeys(os.path.abspath(video_path) for video_path in video_paths))
+
+def load_background(video_path, save_path = None, background_folder = None):
+    '''
+    Function that loads the background of a video that was saved when the background was calculated.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        save_path (str) - Path where the tracking results are saved. Default = None.
+        background_folder (str) - Folder containing the backgrounds. Default = None.
+            ** The background is searched for in background_folder, then save_path, then the folder of the video.
+
+    Returns:
+        background (frame height, frame width) - Background of the video.
+            ** Returns None if no background was found, or if the size of the background does not match the video.
+    '''
+    background_filename = '{0}_background.tif'.format(os.path.basename(video_path)[:-4])
+    for folder in [background_folder, save_path, os.path.dirname(video_path)]:
+        if folder is None:
+            continue
+        background_path = os.path.join(folder, background_filename)
+        if os.path.isfile(background_path):
+            background = cv2.imread(background_path, cv2.IMREAD_GRAYSCALE)
+            # The frame size of the video is given as width and height.
+            if background is not None and background.shape == ut.get_frame_size_from_video(video_path)[::-1]:
+                return background
+            print('Warning! Background {0} does not match the size of the video. Calculating the background.'.format(background_path))
+            return
+    return
+
+def write_log_entry(log_file, event, **values):
+    '''
+    Function that writes a structured log entry as a line of JSON.
+
+    Required Arguments:
+        log_file (file) - Open log file.
+        event (str) - Name of the event.
+
+    Optional Arguments:
+        values - Values that are stored in the log entry, such as the duration of an event in seconds.
+            ** The time of the log entry is stored as time, which is the time the entry was written.
+    '''
+    entry = {'time' : time.strftime('%Y-%m-%dT%H:%M:%S'), 'event' : event}
+    entry.update(values)
+    log_file.write(json.dumps(entry) + '\n')
+    log_file.flush()
+
+def format_summary_table(summary):
+    '''
+    Function that formats the summary of the tracked videos as a table.
+
+    Required Arguments:
+        summary (list(dict)) - Summary of each video containing the video name, status, number of frames, and time taken.
+
+    Returns:
+        table (str) - Summary table.
+    '''
+    columns = ['video', 'status', 'frames', 'time (s)', 'frames/s']
+    rows = [[row['video'], row['status'], str(row['frames']), '' if row['time'] is None else '{0:.1f}'.format(row['time']),
+            '' if not row['time'] else '{0:.1f}'.format(row['frames'] / row['time'])] for row in summary]
+    widths = [max([len(column)] + [len(row[i]) for row in rows]) for i, column in enumerate(columns)]
+    lines = ['  '.join(column.ljust(widths[i]) for i, column in enumerate(columns)), '  '.join('-' * width for width in widths)]
+    lines += ['  '.join(value.ljust(widths[i]) for i, value in enumerate(row)) for row in rows]
+    return '\n'.join(lines)
+
+def track_videos(video_inputs, tracking_parameters_path, colour_parameters_path = None, save_path = None, background_folder = None, recalculate_backgrounds = False,
+                n_workers = None, memory_budget = None, video_backend = 'opencv', log_path = None, n_sample_frames = None, sample_method = None):
+    '''
+    Function that tracks a batch of videos without the GUI.
+
+    Steps:
+        1. Find the videos and load the saved tracking parameters and colours.
+        2. Load the saved background of each video, or calculate the background in the worker process.
+        3. Track the videos in parallel using batch_tracking.track_videos_in_parallel.
+        4. Write a structured log and a summary table.
+
+    Required Arguments:
+        video_inputs (list(str)) - Folders, glob patterns, or paths to videos.
+        tracking_parameters_path (str) - Path to the tracking parameters saved by the GUI.
+
+    Optional Arguments:
+        colour_parameters_path (str) - Path to the colours saved by the GUI. Default = None.
+            ** When colour_parameters_path is None, colour_parameters.npy in the folder of the tracking parameters is used.
+        save_path (str) - Folder where the tracking results are saved. Default = None.
+            ** When save_path is None, the results are saved in the folder of each video.
+        background_folder (str) - Folder containing saved backgrounds. Default = None.
+        recalculate_backgrounds (bool) - Boolean to determine whether to calculate the backgrounds even if saved backgrounds are found. Default = False.
+        n_workers (int) - Same as in batch_tracking.track_videos_in_parallel. Default = None.
+        memory_budget (int) - Same as in batch_tracking.track_videos_in_parallel. Default = None.
+        video_backend (str) - Same as in utilities.track_video. Default = opencv.
+        log_path (str) - Path to the log. Default = None.
+            ** When log_path is None, the log is saved as batch_tracking_log.jsonl in save_path, or in the current folder.
+            ** The log is appended to, so that the log of a batch that is run again after being interrupted follows the log of the interrupted batch.
+            ** The summary table is saved next to the log as batch_tracking_log_summary.txt.
+        n_sample_frames (int) - Number of frames sampled from each video to calculate the background. Default = None.
+            ** When n_sample_frames is None, the number of sampled frames of the tracking parameters is used.
+            ** When n_sample_frames is 0, the frames are selected using the frames to skip of the tracking parameters.
+        sample_method (str) - Same as in utilities.calculate_background. Default = None.
+            ** When sample_method is None, the sample method of the tracking parameters is used.
+
+    Returns:
+        summary (list(dict)) - Summary of each video containing the video name, status, number of frames, time taken, and error message.
+            ** Returns None if the videos could not be tracked.
+    '''
+    video_paths = find_videos(video_inputs)
+    if len(video_paths) == 0:
+        print('Error: No videos found.')
+        return
+    tracking_parameters = bt.load_tracking_parameters(tracking_parameters_path)
+    if tracking_parameters is None:
+        return
+    if colour_parameters_path is None:
+        colour_parameters_path = os.path.join(os.path.dirname(tracking_parameters_path), 'colour_parameters.npy')
+    colours = bt.load_colours(colour_parameters_path, tracking_parameters['n_tail_points'])
+    if save_path is not None and not os.path.isdir(save_path):
+        os.makedirs(save_path)
+    tracking_parameters['save_path'] = save_path
+    if n_sample_frames is not None:
+        tracking_parameters['background_calculation_n_sample_frames'] = n_sample_frames
+    if sample_method is not None:
+        tracking_parameters['background_calculation_sample_method'] = sample_method
+    if log_path is None:
+        log_path = os.path.join(save_path if save_path is not None else os.getcwd(), 'batch_tracking_log.jsonl')
+    summary_path = '{0}_summary.txt'.format(os.path.splitext(log_path)[0])
+
+    jobs = []
+    with open(log_path, 'a') as log_file:
+        write_log_entry(log_file, 'batch_started', n_videos = len(video_paths), tracking_parameters_path = os.path.abspath(tracking_parameters_path), save_path = save_path, video_backend = video_backend)
+        for video_path in video_paths:
+            background = None if recalculate_backgrounds else load_background(video_path, save_path = save_path, background_folder = background_folder)
+            jobs.append(bt.create_tracking_job_from_parameters(video_path, tracking_parameters, colours, background = background, video_backend = video_backend))
+            write_log_entry(log_file, 'video_queued', video = video_path, n_frames = jobs[-1]['n_frames'], background = 'loaded' if background is not None else 'calculate', estimated_memory = jobs[-1]['memory'])
+
+        start_times = {}
+        summary = [{'video' : os.path.basename(job['video_path']), 'status' : 'not tracked', 'frames' : job['n_frames'], 'time' : None, 'error' : None} for job in jobs]
+
+        def update_progress(job_index, status, value):
+            # The first progress of each video is sent when the worker starts the video.
+            if job_index not in start_times:
+                start_times[job_index] = time.time()
+                write_log_entry(log_file, 'video_started', video = jobs[job_index]['video_path'])
+
+        def update_finished(job_index, error):
+            summary[job_index]['status'] = 'error' if error is not None else 'tracked'
+            summary[job_index]['time'] = time.time() - start_times.get(job_index, time.time())
+            summary[job_index]['error'] = error
+            write_log_entry(log_file, 'video_finished', video = jobs[job_index]['video_path'], status = summary[job_index]['status'], n_frames = jobs[job_index]['n_frames'], duration = round(summary[job_index]['time'], 2), error = error)
+
+        t0 = time.time()
+        try:
+            bt.track_videos_in_parallel(jobs, n_workers = n_workers, memory_budget = memory_budget, progress_callback = update_progress, finished_callback = update_finished)
+        except KeyboardInterrupt:
+            print('Tracking interrupted. Tracking the same videos again resumes from the last checkpoint of each video.')
+            write_log_entry(log_file, 'batch_interrupted')
+        write_log_entry(log_file, 'batch_finished', duration = round(time.time() - t0, 2), n_tracked = sum(row['status'] == 'tracked' for row in summary), n_errors = sum(row['status'] == 'error' for row in summary))
+
+    table = format_summary_table(summary)
+    print(table)
+    with open(summary_path, 'w') as summary_file:
+        summary_file.write(table + '\n')
+    return summary
+
+def main(args = None):
+    '''
+    Function that runs the command line batch tracking.
+
+    Optional Arguments:
+        args (list(str)) - Command line arguments. Default = None.
+            ** When args is None, the arguments are taken from sys.argv.
+
+    Returns:
+        exit_code (int) - 0 if every video was tracked, otherwise 1.
+    '''
+    parser = argparse.ArgumentParser(description = 'Track zebrafish behaviour videos in parallel without the GUI.')
+    parser.add_argument('videos', nargs = '+', help = 'Folders, glob patterns, or paths to videos.')
+    parser.add_argument('-p', '--parameters', default = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_parameters', 'tracking_parameters.npy'), help = 'Tracking parameters saved by the GUI. Default = saved_parameters/tracking_parameters.npy.')
+    parser.add_argument('-c', '--colours', default = None, help = 'Colours saved by the GUI. Default = colour_parameters.npy next to the tracking parameters.')
+    parser.add_argument('-o', '--save-path', default = None, help = 'Folder where the results are saved. Default = the folder of each video.')
+    parser.add_argument('-b', '--background-folder', default = None, help = 'Folder containing saved backgrounds named {video name}_background.tif.')
+    parser.add_argument('--recalculate-backgrounds', action = 'store_true', help = 'Calculate the backgrounds even if saved backgrounds are found.')
+    parser.add_argument('-n', '--n-workers', type = int, default = None, help = 'Number of videos tracked at the same time. Default = number of CPUs - 1.')
+    parser.add_argument('-m', '--memory-budget', type = float, default = None, help = 'Maximum estimated memory used by the videos tracked at the same time, in GB. Default = half of the memory of the computer.')
+    parser.add_argument('--video-backend', default = 'opencv', choices = fs.VIDEO_BACKENDS, help = 'Backend used to decode the videos. Default = opencv.')
+    parser.add_argument('--n-sample-frames', type = int, default = None, help = 'Number of frames sampled from each video to calculate the background. 0 uses the frames to skip of the tracking parameters. Default = the number of sampled frames of the tracking parameters.')
+    parser.add_argument('--sample-method', default = None, choices = ['evenly_spaced', 'random'], help = 'Method used to sample the frames used to calculate the background. Default = the sample method of the tracking parameters.')
+    parser.add_argument('--log', default = None, help = 'Path to the structured log. Default = batch_tracking_log.jsonl in the save path or the current folder.')
+    args = parser.parse_args(args)
+
+    memory_budget = None if args.memory_budget is None else int(args.memory_budget * 1024 ** 3)
+    summary = track_videos(args.videos, args.parameters, colour_parameters_path = args.colours, save_path = args.save_path, background_folder = args.background_folder,
+                            recalculate_backgrounds = args.recalculate_backgrounds, n_workers = args.n_workers, memory_budget = memory_budget, video_backend = args.video_backend, log_path = args.log,
+                            n_sample_frames = args.n_sample_frames, sample_method = args.sample_method)
+    if summary is None or any(row['status'] != 'tracked' for row in summary):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# Import libraries.
+import os
+import sys
+import json
+import numpy as np
+
+# Keys of the tracking results that are saved as arrays. All other keys are saved as metadata.
+ARRAY_KEYS = ['eye_coord_array', 'eye_angle_array', 'tail_coord_array', 'heading_coord_array', 'body_coord_array', 'heading_angle_array', 'frame_number_array']
+
+class TrackingResults(object):
+    '''
+    Holds the tracking results of a video in contiguous arrays that are allocated once before tracking.
+
+    Steps:
+        The number of frames and the number of tail points are provided.
+        An array is allocated for each of the eye coordinates, eye angles, tail coordinates, heading coordinates, body coordinates, and heading angles. All values are initialized to NaN.
+        The results of each frame are written in place into the next row of the arrays.
+        If a results path is provided, the arrays are allocated as memory mapped .npy files inside of the results folder and the results are committed to the files every block of frames.
+        Once tracking is complete, the arrays are trimmed to the number of frames that were added.
+
+    Required Arguments:
+        n_frames (int) - Maximum number of frames that will be added.
+        n_tail_points (int) - Number of points tracked along the tail.
+
+    Optional Arguments:
+        dtype (numpy.dtype) - Data type of the arrays. Default = np.float32.
+        results_path (str) - Path to the folder in which the arrays are allocated. Default = None.
+            ** When results_path is None, the arrays are allocated in memory.
+        checkpoint_frames (int) - Number of frames in each block of frames that is committed to the results folder. Default = 1000.
+            ** Only used if results_path is provided.
+        checkpoint_parameters (dict) - Parameters used to track the video. Default = None.
+            ** Saved with each checkpoint. Tracking is only resumed from a checkpoint if the parameters are the same.
+        mode (str) - Mode used to open the arrays in the results folder. Default = w+.
+            ** When mode is w+, new arrays are created. When mode is r+, existing arrays are opened to resume tracking.
+
+    Attributes:
+        eye_coord_array (n_frames, 2, 2) - First eye coordinates and second eye coordinates.
+        eye_angle_array (n_frames, 2) - First eye angle and second eye angle.
+        tail_coord_array (n_frames, n_tail_points + 1, 2) - Tail point coordinates, including the swim bladder.
+        heading_coord_array (n_frames, 2) - Heading coordinates.
+        body_coord_array (n_frames, 2) - Body coordinates.
+        heading_angle_array (n_frames) - Heading angle.
+        frame_number_array (n_frames) - Frame number in the video of each frame.
+        n_tracked_frames (int) - Number of frames that have been added.
+        n_skipped_frames (int) - Number of frames that have been added that used the results of the previous frame because the frame had not changed.
+    '''
+    def __init__(self, n_frames, n_tail_points, dtype = np.float32, results_path = None, checkpoint_frames = 1000, checkpoint_parameters = None, mode = 'w+'):
+        self.n_frames = n_frames
+        self.n_tail_points = n_tail_points
+        self.results_path = results_path
+        self.checkpoint_frames = checkpoint_frames
+        self.checkpoint_parameters = convert_to_json(checkpoint_parameters)
+        self.prev_frame_file = None
+        self.n_tracked_frames = 0
+        self.n_skipped_frames = 0
+        shapes = {  'eye_coord_array' : (n_frames, 2, 2),
+                    'eye_angle_array' : (n_frames, 2),
+                    'tail_coord_array' : (n_frames, n_tail_points + 1, 2),
+                    'heading_coord_array' : (n_frames, 2),
+                    'body_coord_array' : (n_frames, 2),
+                    'heading_angle_array' : (n_frames,),
+                    'frame_number_array' : (n_frames,)
+                }
+        if results_path is not None and not os.path.isdir(results_path):
+            os.makedirs(results_path)
+        if results_path is not None and mode == 'w+':
+            # Remove the metadata and checkpoints of previous tracking runs, since the results folder is incomplete until tracking is complete.
+            for filename in os.listdir(results_path):
+                if filename in ['metadata.json', 'progress.json'] or (filename.startswith('checkpoint_frame_') and filename.endswith('.npy')):
+                    os.remove(os.path.join(results_path, filename))
+        for key in ARRAY_KEYS:
+            array_dtype = np.int64 if key == 'frame_number_array' else dtype
+            fill_value = -1 if key == 'frame_number_array' else np.nan
+            if results_path is None:
+                setattr(self, key, np.full(shapes[key], fill_value, dtype = array_dtype))
+            elif mode == 'w+':
+                # Allocate the array as a memory mapped file.
+                setattr(self, key, np.lib.format.open_memmap(get_array_path(results_path, key), mode = 'w+', dtype = array_dtype, shape = shapes[key]))
+                getattr(self, key)[:] = fill_value
+            else:
+                # Open the existing memory mapped file.
+                array = np.lib.format.open_memmap(get_array_path(results_path, key), mode = mode)
+                if array.shape != shapes[key]:
+                    raise ValueError('{0} has shape {1} instead of {2}.'.format(key, array.shape, shapes[key]))
+                setattr(self, key, array)
+
+    def __len__(self):
+        return self.n_tracked_frames
+
+    def set_frame(self, index, results, frame_number = -1):
+        # Unpack the results returned by track_frame.
+        first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle, heading_coords, body_coords, heading_angle, tail_points = results
+        # Write the results into the arrays.
+        self.eye_coord_array[index, 0] = first_eye_coords
+        self.eye_coord_array[index, 1] = second_eye_coords
+        self.eye_angle_array[index] = [first_eye_angle, second_eye_angle]
+        self.tail_coord_array[index] = tail_points
+        self.heading_coord_array[index] = heading_coords
+        self.body_coord_array[index] = body_coords
+        self.heading_angle_array[index] = heading_angle
+        self.frame_number_array[index] = frame_number
+
+    def get_frame(self, index):
+        # Return the results of a frame in the same format as the results returned by track_frame. Eye coordinates are pixel coordinates and are returned as integers.
+        first_eye_coords, second_eye_coords = [[int(value) if np.isfinite(value) else np.nan for value in coords] for coords in self.eye_coord_array[index]]
+        return [first_eye_coords, second_eye_coords, float(self.eye_angle_array[index, 0]), float(self.eye_angle_array[index, 1]), self.heading_coord_array[index].tolist(), self.body_coord_array[index].tolist(), float(self.heading_angle_array[index]), self.tail_coord_array[index].tolist()]
+
+    def append(self, results, frame_number = -1, tracking_state = None, skipped = False):
+        if self.n_tracked_frames >= self.n_frames:
+            print('Error: Tracking results are full. Could not add the results of frame number: {0}.'.format(frame_number))
+            return
+        self.set_frame(self.n_tracked_frames, results, frame_number)
+        self.n_tracked_frames += 1
+        if skipped:
+            self.n_skipped_frames += 1
+        # Commit the results to the results folder at the end of each block of frames.
+        if self.results_path is not None and tracking_state is not None and self.n_tracked_frames % self.checkpoint_frames == 0:
+            self.checkpoint(tracking_state)
+
+    def checkpoint(self, tracking_state):
+        '''
+        Commits the results that have been added to the results folder, along with the tracking state needed to resume tracking from the next frame.
+
+        Steps:
+            The memory mapped arrays are flushed to the files.
+            The previous frame of the tracking state is saved into a new file.
+            The progress marker is replaced with a new progress marker containing the number of frames that have been added, the next frame number, and the tracking state.
+            The progress marker is only replaced once all of the files have been written, so the last committed block of frames is never lost.
+
+        Required Arguments:
+            tracking_state (dict) - Tracking state after the last frame that was added, created by utilities.initialize_tracking_state.
+        '''
+        for key in ARRAY_KEYS:
+            getattr(self, key).flush()
+        # Save the previous frame into a new file so that the previous checkpoint remains valid until the progress marker is replaced.
+        prev_frame_file = None
+        if tracking_state['prev_frame'] is not None:
+            prev_frame_file = 'checkpoint_frame_{0}.npy'.format(self.n_tracked_frames)
+            np.save(os.path.join(self.results_path, prev_frame_file), tracking_state['prev_frame'], allow_pickle = False)
+        progress = {'n_frames' : self.n_frames,
+                    'n_tail_points' : self.n_tail_points,
+                    'n_tracked_frames' : self.n_tracked_frames,
+                    'n_skipped_frames' : self.n_skipped_frames,
+                    'next_frame_number' : int(self.frame_number_array[self.n_tracked_frames - 1]) + 1,
+                    'checkpoint_parameters' : self.checkpoint_parameters,
+                    'prev_frame_file' : prev_frame_file,
+                    'prev_frame_number' : tracking_state['prev_frame_number'],
+                    'prev_frame_region' : tracking_state['prev_frame_region'],
+                    'prev_eye_angle' : tracking_state['prev_eye_angle'],
+                    'prev_results' : tracking_state['prev_results'],
+                    'first_results' : tracking_state['first_results']
+                }
+        # Write the progress marker into a temporary file and replace the progress marker.
+        progress_path = get_progress_path(self.results_path)
+        with open(progress_path + '.tmp', 'w') as f:
+            json.dump(progress, f, default = convert_to_json_value)
+        os.replace(progress_path + '.tmp', progress_path)
+        # Remove the previous frame of the last checkpoint.
+        if self.prev_frame_file is not None and self.prev_frame_file != prev_frame_file:
+            os.remove(os.path.join(self.results_path, self.prev_frame_file))
+        self.prev_frame_file = prev_frame_file
+
+    def save(self, results_path, metadata = {}):
+        '''
+        Saves the results into a results folder in the format used by save_tracking_results.
+
+        Required Arguments:
+            results_path (str) - Path to the folder that will contain the tracking results.
+                ** If the arrays were allocated in a results folder, the arrays are trimmed in place and results_path is ignored.
+
+        Optional Arguments:
+            metadata (dict) - Additional values saved into the metadata, such as the tracking parameters. Default = {}.
+
+        Returns:
+            results_path (str) - Path to the folder that contains the tracking results.
+        '''
+        if self.results_path is None:
+            results = self.to_dict()
+            results.update(metadata)
+            return save_tracking_results(results, results_path)
+        for key in ARRAY_KEYS:
+            array = getattr(self, key)
+            array.flush()
+            if self.n_tracked_frames < self.n_frames:
+                # Read the frames that were added into memory before rewriting the file with the trimmed array.
+                array = np.array(array[:self.n_tracked_frames])
+                setattr(self, key, array)
+                np.save(get_array_path(self.results_path, key), array, allow_pickle = False)
+        save_tracking_results_metadata(metadata, self.results_path, ARRAY_KEYS)
+        # Remove the progress marker since tracking is complete.
+        if os.path.isfile(get_progress_path(self.results_path)):
+            os.remove(get_progress_path(self.results_path))
+        if self.prev_frame_file is not None:
+            os.remove(os.path.join(self.results_path, self.prev_frame_file))
+            self.prev_frame_file = None
+        return self.results_path
+
+    def to_dict(self):
+        # Return the arrays trimmed to the number of frames that were added, using the same keys as the saved results.
+        return  {   'eye_coord_array' : self.eye_coord_array[:self.n_tracked_frames],
+                    'eye_angle_array' : self.eye_angle_array[:self.n_tracked_frames],
+                    'tail_coord_array' : self.tail_coord_array[:self.n_tracked_frames],
+                    'heading_coord_array' : self.heading_coord_array[:self.n_tracked_frames],
+                    'body_coord_array' : self.body_coord_array[:self.n_tracked_frames],
+                    'heading_angle_array' : self.heading_angle_array[:self.n_tracked_frames],
+                    'frame_number_array' : self.frame_number_array[:self.n_tracked_frames]
+                }
+
+def get_metadata_path(results_path):
+    return os.path.join(results_path, 'metadata.json')
+
+def get_array_path(results_path, key):
+    return os.path.join(results_path, '{0}.npy'.format(key))
+
+def get_progress_path(results_path):
+    return os.path.join(results_path, 'progress.json')
+
+def convert_to_json_value(value):
+    # Convert NumPy values into values that can be written to a JSON file.
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return str(value)
+
+def convert_to_json(value):
+    # Convert a value into the value that is read back from a JSON file.
+    return json.loads(json.dumps(value, default = convert_to_json_value))
+
+def save_tracking_results(results, results_path):
+    '''
+    Function that saves tracking results into a folder containing one NumPy array file for each array and a JSON file for the metadata.
+
+    Steps:
+        A dictionary containing the tracking results is provided.
+        A folder is created at the results path.
+        Each array in the tracking results is saved as a float32 array (or int64 array for the frame numbers) into a separate .npy file. The arrays are saved without pickling.
+        All other values in the tracking results are saved into metadata.json.
+
+    Required Arguments:
+        results (dict) - Dictionary containing the tracking results, such as the dictionary returned by TrackingResults.to_dict combined with the tracking parameters.
+        results_path (str) - Path to the folder that will contain the tracking results.
+
+    Returns:
+        results_path (str) - Path to the folder that contains the tracking results.
+    '''
+    # Create the folder that will contain the tracking results.
+    if not os.path.isdir(results_path):
+        os.makedirs(results_path)
+    metadata = {}
+    for key, value in results.items():
+        if key in ARRAY_KEYS:
+            # Save the array into a separate file.
+            np.save(get_array_path(results_path, key), np.asarray(value, dtype = np.int64 if key == 'frame_number_array' else np.float32), allow_pickle = False)
+        else:
+            metadata[key] = value
+    save_tracking_results_metadata(metadata, results_path, [key for key in ARRAY_KEYS if key in results])
+    return results_path
+
+def save_tracking_results_metadata(metadata, results_path, array_keys):
+    # Save the metadata and the keys of the arrays into a JSON file.
+    metadata = dict(metadata)
+    metadata['array_keys'] = array_keys
+    with open(get_metadata_path(results_path), 'w') as f:
+        json.dump(metadata, f, indent = 4, default = convert_to_json_value)
+
+def load_tracking_results(results_path, mmap_mode = 'r'):
+    '''
+    Function that loads tracking results.
+
+    Required Arguments:
+        results_path (str) - Path to the folder that contains the tracking results or the path to the metadata.json file inside of the folder.
+            ** Tracking results saved as a single pickled .npy file are also loaded, but are read entirely into memory.
+
+    Optional Arguments:
+        mmap_mode (str) - Memory map mode used to open the arrays. Default = r.
+            ** When mmap_mode is r, the arrays are opened without being read into memory. Only the parts of the arrays that are used are read from the files.
+            ** When mmap_mode is None, the arrays are read into memory.
+
+    Returns:
+        results (dict) - Dictionary containing the arrays and metadata of the tracking results.
+    '''
+    if os.path.isfile(results_path) and results_path.endswith('.npy'):
+        # Load tracking results that were saved as a pickled dictionary.
+        return np.load(results_path, allow_pickle = True).item()
+    if os.path.basename(results_path) == 'metadata.json':
+        results_path = os.path.dirname(results_path)
+    # Load the metadata.
+    with open(get_metadata_path(results_path), 'r') as f:
+        results = json.load(f)
+    # Open each array.
+    for key in results.pop('array_keys'):
+        results[key] = np.load(get_array_path(results_path, key), mmap_mode = mmap_mode, allow_pickle = False)
+    return results
+
+def resume_tracking_results(results_path, checkpoint_parameters, checkpoint_frames = 1000):
+    '''
+    Function that reopens the results of a tracking run that was interrupted, using the last checkpoint in the results folder.
+
+    Required Arguments:
+        results_path (str) - Path to the results folder.
+        checkpoint_parameters (dict) - Parameters used to track the video.
+            ** Tracking is only resumed if the parameters are the same as the parameters saved with the checkpoint.
+
+    Optional Arguments:
+        checkpoint_frames (int) - Same as in TrackingResults. Default = 1000.
+
+    Returns:
+        tracking_results (TrackingResults) - Results containing the frames that were committed. None if tracking cannot be resumed.
+        tracking_state (dict) - Tracking state after the last frame that was committed. None if tracking cannot be resumed.
+        next_frame_number (int) - Frame number of the next frame to track. None if tracking cannot be resumed.
+    '''
+    progress_path = get_progress_path(results_path)
+    if not os.path.isfile(progress_path):
+        return None, None, None
+    try:
+        with open(progress_path, 'r') as f:
+            progress = json.load(f)
+        if progress['checkpoint_parameters'] != convert_to_json(checkpoint_parameters):
+            print('Warning! Tracking parameters do not match the parameters of the last checkpoint. Tracking from the start.')
+            return None, None, None
+        # Open the arrays that were committed.
+        tracking_results = TrackingResults(progress['n_frames'], progress['n_tail_points'], results_path = results_path, checkpoint_frames = checkpoint_frames, checkpoint_parameters = checkpoint_parameters, mode = 'r+')
+        tracking_results.n_tracked_frames = progress['n_tracked_frames']
+        tracking_results.n_skipped_frames = progress.get('n_skipped_frames', 0)
+        tracking_results.prev_frame_file = progress['prev_frame_file']
+        # Restore the tracking state.
+        tracking_state = {  'prev_frame' : None if progress['prev_frame_file'] is None else np.load(os.path.join(results_path, progress['prev_frame_file']), allow_pickle = False),
+                            'prev_frame_number' : progress['prev_frame_number'],
+                            'prev_frame_region' : progress.get('prev_frame_region'),
+                            'prev_eye_angle' : progress['prev_eye_angle'],
+                            'prev_results' : progress['prev_results'],
+                            'first_results' : progress.get('first_results')
+                        }
+    except:
+        print('Warning! Could not resume tracking from the last checkpoint. Tracking from the start.')
+        return None, None, None
+    return tracking_results, tracking_state, progress['next_frame_number']
+
+def convert_tracking_results(results_path, save_path = None):
+    '''
+    Function that converts tracking results saved as a single pickled .npy file into the folder format used by save_tracking_results.
+
+    Required Arguments:
+        results_path (str) - Path to the .npy file containing the tracking results.
+
+    Optional Arguments:
+        save_path (str) - Path to the folder that will contain the converted tracking results. Default = None.
+            ** When save_path is None, the folder is created next to the .npy file using the same name without the extension.
+
+    Returns:
+        save_path (str) - Path to the folder that contains the converted tracking results.
+    '''
+    if save_path is None:
+        save_path = results_path[:-4]
+    results = np.load(results_path, allow_pickle = True).item()
+    return save_tracking_results(results, save_path)
+
+if __name__ == '__main__':
+    # Convert each of the tracking results files given as arguments.
+    for results_path in sys.argv[1:]:
+        print('Converted {0} to {1}.'.format(results_path, convert_tracking_results(results_path)))
@@ -2,19 +2,18 @@
 
 # import python modules
 import os
-import cv2
 import numpy as np
 import utilities as ut
-import matplotlib.cm as cm
+import frame_sources as fs
+import preview_image as pi
 from functools import partial
 from track_video_thread import TrackVideoProgressWindow
 from track_all_videos_thread import TrackAllVideosProgressWindow
 from background_calculation_thread import CalculateBackgroundProgressWindow
-from timer_thread import TimerThread
-import yaml
+from video_playback_thread import VideoPlaybackThread
 
 from PyQt5.QtWidgets import QMainWindow, QScrollArea, QFrame, QLabel, QListWidget, QPushButton, QSlider, QLineEdit, QCheckBox, QWidget, QSizePolicy, QGridLayout, QComboBox, QFileDialog, qApp
-from PyQt5.QtGui import QFont, QIcon, QImage, QPixmap
+from PyQt5.QtGui import QFont, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize
 
 class TrackingWindow(QScrollArea):
@@ -288,11 +287,15 @@ class TrackingContent(QMainWindow):
         self.play_video_medium_speed = False
         self.play_video_max_speed = False
         self.video_playback_thread = None
+        self.playback_frame_number = None
+        self.frame_reader = None
         self.median_blur = 0
         self.background_calculation_method = None
         self.background_calculation_frame_chunk_width = 0
         self.background_calculation_frame_chunk_height = 0
         self.background_calculation_frames_to_skip = 0
+        self.background_calculation_n_sample_frames = 0
+        self.background_calculation_sample_method = None
         self.initial_pixel_search = None
         self.recalculate_eye_coords_every_frame = None
         self.invert_threshold = None
@@ -312,6 +315,14 @@ class TrackingContent(QMainWindow):
         self.video_n_frames = ut.get_total_frame_number_from_video(self.video_path)
         self.video_fps = ut.get_fps_from_video(self.video_path)
         self.video_frame_width, self.video_frame_height = ut.get_frame_size_from_video(self.video_path)
+    def get_frame(self):
+        # Keep the video open and cache the frames that were read, so that scrubbing and playing back the video does not reopen the video for every frame.
+        if self.frame_reader is not None and self.frame_reader.video_path != self.video_path:
+            self.frame_reader.release()
+            self.frame_reader = None
+        if self.frame_reader is None:
+            self.frame_reader = fs.CachedFrameReader(self.video_path)
+        return self.frame_reader.read_frame(self.frame_number - 1)
     def get_background_attributes(self):
         self.background_path_basename = os.path.basename(self.background_path)
         self.background_height, self.background_width = self.background.shape
@@ -761,7 +772,7 @@ class TrackingContent(QMainWindow):
         self.tracking_parameters_scroll_area.resize(new_width, new_height)
 
         new_width = (self.tracking_parameters_window_size[0] - (4 * self.tracking_parameters_x_offset))
-        new_height = (self.main_window_y_offset + self.tracking_parameters_y_offset + (13 * (self.tracking_parameters_height + self.tracking_parameters_y_spacing)) + self.tracking_parameters_height)
+        new_height = (self.main_window_y_offset + self.tracking_parameters_y_offset + (15 * (self.tracking_parameters_height + self.tracking_parameters_y_spacing)) + self.tracking_parameters_height)
         self.tracking_parameters_widget = QWidget(self)
         self.tracking_parameters_widget.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
         self.tracking_parameters_widget.resize(new_width, new_height)
@@ -778,6 +789,7 @@ class TrackingContent(QMainWindow):
         self.background_calculation_method_combobox.addItem('Brightest')
         self.background_calculation_method_combobox.addItem('Darkest')
         self.background_calculation_method_combobox.addItem('Mode')
+        self.background_calculation_method_combobox.addItem('Median')
         self.background_calculation_method_combobox.setCurrentIndex(0)
         self.background_calculation_method_combobox.currentIndexChanged.connect(self.check_background_calculation_method_combobox)
         self.grid_layout.addWidget(self.background_calculation_method_combobox_label, 1, 1)
@@ -819,6 +831,30 @@ class TrackingContent(QMainWindow):
         self.grid_layout.addWidget(self.background_calculation_frames_to_skip_textbox_label, 4, 1)
         self.grid_layout.addWidget(self.background_calculation_frames_to_skip_textbox, 4, 2)
 
+        self.background_calculation_n_sample_frames_textbox_label = QLabel(self)
+        self.background_calculation_n_sample_frames_textbox_label.setText('Background Calculation Sample Frames: ')
+        self.background_calculation_n_sample_frames_textbox_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.background_calculation_n_sample_frames_textbox_label.setFont(self.font_text)
+        self.background_calculation_n_sample_frames_textbox = QLineEdit(self)
+        self.background_calculation_n_sample_frames_textbox.setText('{0}'.format(self.background_calculation_n_sample_frames))
+        self.background_calculation_n_sample_frames_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        self.background_calculation_n_sample_frames_textbox.setFont(self.font_text)
+        self.background_calculation_n_sample_frames_textbox.returnPressed.connect(self.check_background_calculation_n_sample_frames_textbox)
+        self.grid_layout.addWidget(self.background_calculation_n_sample_frames_textbox_label, 5, 1)
+        self.grid_layout.addWidget(self.background_calculation_n_sample_frames_textbox, 5, 2)
+
+        self.background_calculation_sample_method_combobox_label = QLabel(self)
+        self.background_calculation_sample_method_combobox_label.setText('Background Calculation Sample Method: ')
+        self.background_calculation_sample_method_combobox_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.background_calculation_sample_method_combobox_label.setFont(self.font_text)
+        self.background_calculation_sample_method_combobox = QComboBox(self)
+        self.background_calculation_sample_method_combobox.addItem('Evenly Spaced')
+        self.background_calculation_sample_method_combobox.addItem('Random')
+        self.background_calculation_sample_method_combobox.setCurrentIndex(0)
+        self.background_calculation_sample_method_combobox.currentIndexChanged.connect(self.check_background_calculation_sample_method_combobox)
+        self.grid_layout.addWidget(self.background_calculation_sample_method_combobox_label, 6, 1)
+        self.grid_layout.addWidget(self.background_calculation_sample_method_combobox, 6, 2)
+
         self.save_background_combobox_label = QLabel(self)
         self.save_background_combobox_label.setText('Save Background: ')
         self.save_background_combobox_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
@@ -828,8 +864,8 @@ class TrackingContent(QMainWindow):
         self.save_background_combobox.addItem('False')
         self.save_background_combobox.setCurrentIndex(0)
         self.save_background_combobox.currentIndexChanged.connect(self.check_save_background_combobox)
-        self.grid_layout.addWidget(self.save_background_combobox_label, 5, 1)
-        self.grid_layout.addWidget(self.save_background_combobox, 5, 2)
+        self.grid_layout.addWidget(self.save_background_combobox_label, 7, 1)
+        self.grid_layout.addWidget(self.save_background_combobox, 7, 2)
 
         self.tracking_method_combobox_label = QLabel(self)
         self.tracking_method_combobox_label.setText('Tracking Method: ')
@@ -841,8 +877,8 @@ class TrackingContent(QMainWindow):
         self.tracking_method_combobox.addItem('Head Fixed Type 2')
         self.tracking_method_combobox.setCurrentIndex(0)
         self.tracking_method_combobox.currentIndexChanged.connect(self.check_tracking_method_combobox)
-        self.grid_layout.addWidget(self.tracking_method_combobox_label, 6, 1)
-        self.grid_layout.addWidget(self.tracking_method_combobox, 6, 2)
+        self.grid_layout.addWidget(self.tracking_method_combobox_label, 8, 1)
+        self.grid_layout.addWidget(self.tracking_method_combobox, 8, 2)
 
         self.recalculate_eye_coords_every_frame_combobox_label = QLabel(self)
         self.recalculate_eye_coords_every_frame_combobox_label.setText('Recalculate Eye Coords Every Frame: ')
@@ -853,8 +889,8 @@ class TrackingContent(QMainWindow):
         self.recalculate_eye_coords_every_frame_combobox.addItem('False')
         self.recalculate_eye_coords_every_frame_combobox.setCurrentIndex(0)
         self.recalculate_eye_coords_every_frame_combobox.currentIndexChanged.connect(self.check_recalculate_eye_coords_every_frame_combobox)
-        self.grid_layout.addWidget(self.recalculate_eye_coords_every_frame_combobox_label, 7, 1)
-        self.grid_layout.addWidget(self.recalculate_eye_coords_every_frame_combobox, 7, 2)
+        self.grid_layout.addWidget(self.recalculate_eye_coords_every_frame_combobox_label, 9, 1)
+        self.grid_layout.addWidget(self.recalculate_eye_coords_every_frame_combobox, 9, 2)
 
         # Initial Pixel Search
         self.initial_pixel_search_combobox_label = QLabel(self)
@@ -866,8 +902,8 @@ class TrackingContent(QMainWindow):
         self.initial_pixel_search_combobox.addItem('Darkest')
         self.initial_pixel_search_combobox.setCurrentIndex(0)
         self.initial_pixel_search_combobox.currentIndexChanged.connect(self.check_initial_pixel_search_combobox)
-        self.grid_layout.addWidget(self.initial_pixel_search_combobox_label, 8, 1)
-        self.grid_layout.addWidget(self.initial_pixel_search_combobox, 8, 2)
+        self.grid_layout.addWidget(self.initial_pixel_search_combobox_label, 10, 1)
+        self.grid_layout.addWidget(self.initial_pixel_search_combobox, 10, 2)
 
         self.tracking_n_tail_points_textbox_label = QLabel(self)
         self.tracking_n_tail_points_textbox_label.setText('Number of Tail Points: ')
@@ -878,8 +914,8 @@ class TrackingContent(QMainWindow):
         self.tracking_n_tail_points_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_n_tail_points_textbox.setFont(self.font_text)
         self.tracking_n_tail_points_textbox.returnPressed.connect(self.check_tracking_n_tail_points_textbox)
-        self.grid_layout.addWidget(self.tracking_n_tail_points_textbox_label, 9, 1)
-        self.grid_layout.addWidget(self.tracking_n_tail_points_textbox, 9, 2)
+        self.grid_layout.addWidget(self.tracking_n_tail_points_textbox_label, 11, 1)
+        self.grid_layout.addWidget(self.tracking_n_tail_points_textbox, 11, 2)
 
         self.tracking_dist_tail_points_textbox_label = QLabel(self)
         self.tracking_dist_tail_points_textbox_label.setText('Distance Between Tail Points: ')
@@ -890,8 +926,8 @@ class TrackingContent(QMainWindow):
         self.tracking_dist_tail_points_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_dist_tail_points_textbox.setFont(self.font_text)
         self.tracking_dist_tail_points_textbox.returnPressed.connect(self.check_tracking_dist_tail_points_textbox)
-        self.grid_layout.addWidget(self.tracking_dist_tail_points_textbox_label, 10, 1)
-        self.grid_layout.addWidget(self.tracking_dist_tail_points_textbox, 10, 2)
+        self.grid_layout.addWidget(self.tracking_dist_tail_points_textbox_label, 12, 1)
+        self.grid_layout.addWidget(self.tracking_dist_tail_points_textbox, 12, 2)
 
         self.tracking_dist_eyes_textbox_label = QLabel(self)
         self.tracking_dist_eyes_textbox_label.setText('Distance Between Eyes: ')
@@ -902,8 +938,8 @@ class TrackingContent(QMainWindow):
         self.tracking_dist_eyes_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_dist_eyes_textbox.setFont(self.font_text)
         self.tracking_dist_eyes_textbox.returnPressed.connect(self.check_tracking_dist_eyes_textbox)
-        self.grid_layout.addWidget(self.tracking_dist_eyes_textbox_label, 11, 1)
-        self.grid_layout.addWidget(self.tracking_dist_eyes_textbox, 11, 2)
+        self.grid_layout.addWidget(self.tracking_dist_eyes_textbox_label, 13, 1)
+        self.grid_layout.addWidget(self.tracking_dist_eyes_textbox, 13, 2)
 
         self.tracking_dist_swim_bladder_textbox_label = QLabel(self)
         self.tracking_dist_swim_bladder_textbox_label.setText('Distance Between Eyes and Swim Bladder: ')
@@ -914,8 +950,8 @@ class TrackingContent(QMainWindow):
         self.tracking_dist_swim_bladder_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_dist_swim_bladder_textbox.setFont(self.font_text)
         self.tracking_dist_swim_bladder_textbox.returnPressed.connect(self.check_tracking_dist_swim_bladder_textbox)
-        self.grid_layout.addWidget(self.tracking_dist_swim_bladder_textbox_label, 12, 1)
-        self.grid_layout.addWidget(self.tracking_dist_swim_bladder_textbox, 12, 2)
+        self.grid_layout.addWidget(self.tracking_dist_swim_bladder_textbox_label, 14, 1)
+        self.grid_layout.addWidget(self.tracking_dist_swim_bladder_textbox, 14, 2)
 
         # Range of Search Angles
         self.range_angles_textbox_label = QLabel(self)
@@ -927,8 +963,8 @@ class TrackingContent(QMainWindow):
         self.range_angles_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.range_angles_textbox.setFont(self.font_text)
         self.range_angles_textbox.returnPressed.connect(self.check_range_angles_textbox)
-        self.grid_layout.addWidget(self.range_angles_textbox_label, 13, 1)
-        self.grid_layout.addWidget(self.range_angles_textbox, 13, 2)
+        self.grid_layout.addWidget(self.range_angles_textbox_label, 15, 1)
+        self.grid_layout.addWidget(self.range_angles_textbox, 15, 2)
 
         # Median Blur
         self.median_blur_textbox_label = QLabel(self)
@@ -940,8 +976,8 @@ class TrackingContent(QMainWindow):
         self.median_blur_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.median_blur_textbox.setFont(self.font_text)
         self.median_blur_textbox.returnPressed.connect(self.check_median_blur_textbox)
-        self.grid_layout.addWidget(self.median_blur_textbox_label, 14, 1)
-        self.grid_layout.addWidget(self.median_blur_textbox, 14, 2)
+        self.grid_layout.addWidget(self.median_blur_textbox_label, 16, 1)
+        self.grid_layout.addWidget(self.median_blur_textbox, 16, 2)
 
         # Pixel Threshold
         self.tracking_pixel_threshold_textbox_label = QLabel(self)
@@ -953,8 +989,8 @@ class TrackingContent(QMainWindow):
         self.tracking_pixel_threshold_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_pixel_threshold_textbox.setFont(self.font_text)
         self.tracking_pixel_threshold_textbox.returnPressed.connect(self.check_tracking_pixel_threshold_textbox)
-        self.grid_layout.addWidget(self.tracking_pixel_threshold_textbox_label, 15, 1)
-        self.grid_layout.addWidget(self.tracking_pixel_threshold_textbox, 15, 2)
+        self.grid_layout.addWidget(self.tracking_pixel_threshold_textbox_label, 17, 1)
+        self.grid_layout.addWidget(self.tracking_pixel_threshold_textbox, 17, 2)
 
         # Frame Change Threshold
         self.tracking_frame_change_threshold_textbox_label = QLabel(self)
@@ -966,8 +1002,8 @@ class TrackingContent(QMainWindow):
         self.tracking_frame_change_threshold_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_frame_change_threshold_textbox.setFont(self.font_text)
         self.tracking_frame_change_threshold_textbox.returnPressed.connect(self.check_tracking_frame_change_threshold_textbox)
-        self.grid_layout.addWidget(self.tracking_frame_change_threshold_textbox_label, 16, 1)
-        self.grid_layout.addWidget(self.tracking_frame_change_threshold_textbox, 16, 2)
+        self.grid_layout.addWidget(self.tracking_frame_change_threshold_textbox_label, 18, 1)
+        self.grid_layout.addWidget(self.tracking_frame_change_threshold_textbox, 18, 2)
 
         # Heading Line Length
         self.tracking_line_length_textbox_label = QLabel(self)
@@ -979,8 +1015,8 @@ class TrackingContent(QMainWindow):
         self.tracking_line_length_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_line_length_textbox.setFont(self.font_text)
         self.tracking_line_length_textbox.returnPressed.connect(self.check_tracking_line_length_textbox)
-        self.grid_layout.addWidget(self.tracking_line_length_textbox_label, 17, 1)
-        self.grid_layout.addWidget(self.tracking_line_length_textbox, 17, 2)
+        self.grid_layout.addWidget(self.tracking_line_length_textbox_label, 19, 1)
+        self.grid_layout.addWidget(self.tracking_line_length_textbox, 19, 2)
 
         # Extended Eyes Calculation
         self.extended_eyes_calculation_combobox_label = QLabel(self)
@@ -992,8 +1028,8 @@ class TrackingContent(QMainWindow):
         self.extended_eyes_calculation_combobox.addItem('False')
         self.extended_eyes_calculation_combobox.setCurrentIndex(1)
         self.extended_eyes_calculation_combobox.currentIndexChanged.connect(self.check_extended_eyes_calculation_combobox)
-        self.grid_layout.addWidget(self.extended_eyes_calculation_combobox_label, 18, 1)
-        self.grid_layout.addWidget(self.extended_eyes_calculation_combobox, 18, 2)
+        self.grid_layout.addWidget(self.extended_eyes_calculation_combobox_label, 20, 1)
+        self.grid_layout.addWidget(self.extended_eyes_calculation_combobox, 20, 2)
 
         # Eyes Threshold
         self.eyes_threshold_textbox_label = QLabel(self)
@@ -1005,8 +1041,8 @@ class TrackingContent(QMainWindow):
         self.eyes_threshold_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.eyes_threshold_textbox.setFont(self.font_text)
         self.eyes_threshold_textbox.returnPressed.connect(self.check_eyes_threshold_textbox)
-        self.grid_layout.addWidget(self.eyes_threshold_textbox_label, 19, 1)
-        self.grid_layout.addWidget(self.eyes_threshold_textbox, 19, 2)
+        self.grid_layout.addWidget(self.eyes_threshold_textbox_label, 21, 1)
+        self.grid_layout.addWidget(self.eyes_threshold_textbox, 21, 2)
 
         # Eyes Line Length
         self.eyes_line_length_textbox_label = QLabel(self)
@@ -1018,8 +1054,8 @@ class TrackingContent(QMainWindow):
         self.eyes_line_length_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.eyes_line_length_textbox.setFont(self.font_text)
         self.eyes_line_length_textbox.returnPressed.connect(self.check_eyes_line_length_textbox)
-        self.grid_layout.addWidget(self.eyes_line_length_textbox_label, 20, 1)
-        self.grid_layout.addWidget(self.eyes_line_length_textbox, 20, 2)
+        self.grid_layout.addWidget(self.eyes_line_length_textbox_label, 22, 1)
+        self.grid_layout.addWidget(self.eyes_line_length_textbox, 22, 2)
 
         # Invert Eyes Threshold
         self.invert_threshold_combobox_label = QLabel(self)
@@ -1031,8 +1067,8 @@ class TrackingContent(QMainWindow):
         self.invert_threshold_combobox.addItem('False')
         self.invert_threshold_combobox.setCurrentIndex(0)
         self.invert_threshold_combobox.currentIndexChanged.connect(self.check_invert_threshold_combobox)
-        self.grid_layout.addWidget(self.invert_threshold_combobox_label, 21, 1)
-        self.grid_layout.addWidget(self.invert_threshold_combobox, 21, 2)
+        self.grid_layout.addWidget(self.invert_threshold_combobox_label, 23, 1)
+        self.grid_layout.addWidget(self.invert_threshold_combobox, 23, 2)
 
         # Save Video
         self.save_tracked_video_combobox_label = QLabel(self)
@@ -1044,8 +1080,8 @@ class TrackingContent(QMainWindow):
         self.save_tracked_video_combobox.addItem('False')
         self.save_tracked_video_combobox.setCurrentIndex(1)
         self.save_tracked_video_combobox.currentIndexChanged.connect(self.check_save_tracked_video_combobox)
-        self.grid_layout.addWidget(self.save_tracked_video_combobox_label, 22, 1)
-        self.grid_layout.addWidget(self.save_tracked_video_combobox, 22, 2)
+        self.grid_layout.addWidget(self.save_tracked_video_combobox_label, 24, 1)
+        self.grid_layout.addWidget(self.save_tracked_video_combobox, 24, 2)
 
         # Starting Frame
         self.tracking_starting_frame_textbox_label = QLabel(self)
@@ -1057,8 +1093,8 @@ class TrackingContent(QMainWindow):
         self.tracking_starting_frame_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_starting_frame_textbox.setFont(self.font_text)
         self.tracking_starting_frame_textbox.returnPressed.connect(self.check_tracking_starting_frame_textbox)
-        self.grid_layout.addWidget(self.tracking_starting_frame_textbox_label, 23, 1)
-        self.grid_layout.addWidget(self.tracking_starting_frame_textbox, 23, 2)
+        self.grid_layout.addWidget(self.tracking_starting_frame_textbox_label, 25, 1)
+        self.grid_layout.addWidget(self.tracking_starting_frame_textbox, 25, 2)
 
         # Tracking Frames
         self.tracking_n_frames_textbox_label = QLabel(self)
@@ -1070,8 +1106,8 @@ class TrackingContent(QMainWindow):
         self.tracking_n_frames_textbox.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         self.tracking_n_frames_textbox.setFont(self.font_text)
         self.tracking_n_frames_textbox.returnPressed.connect(self.check_tracking_n_frames_textbox)
-        self.grid_layout.addWidget(self.tracking_n_frames_textbox_label, 24, 1)
-        self.grid_layout.addWidget(self.tracking_n_frames_textbox, 24, 2)
+        self.grid_layout.addWidget(self.tracking_n_frames_textbox_label, 26, 1)
+        self.grid_layout.addWidget(self.tracking_n_frames_textbox, 26, 2)
 
         self.trigger_load_default_tracking_parameters()
         self.trigger_load_default_colours()
@@ -1323,16 +1359,14 @@ class TrackingContent(QMainWindow):
         self.background_path_basename_descriptor.setText('Background Filename: {0}'.format(self.background_path_basename))
         self.save_path_descriptor.setText('Save Path: {0}'.format(self.save_path))
     def update_preview_frame(self, frame, frame_width, frame_height, scaled_width = None, grayscale = True, preview_crop = None):
-        if grayscale:
-            format = QImage.Format_Indexed8
-        else:
-            format = QImage.Format_RGB888
+        self.preview_frame = self.create_preview_image(frame, frame_width, frame_height, scaled_width = scaled_width, grayscale = grayscale, preview_crop = preview_crop)
+    def create_preview_image(self, frame, frame_width, frame_height, scaled_width = None, grayscale = True, preview_crop = None):
+        # The format of the image is chosen from the number of channels of the frame, since masked and annotated frames are colour frames.
         if scaled_width is None:
             scaled_width = int(self.video_frame_width / 100) * 100
         else:
             scaled_width = int(scaled_width / 100) * 100
         if self.mask:
-            format = QImage.Format_RGB888
             if frame_width > frame_height:
                 center_x = (self.mask[0] / self.preview_frame_window_size[0]) * frame_width
                 center_y = (self.mask[1] / int((frame_height / frame_width) * self.preview_frame_window_size[1])) * frame_height
@@ -1357,8 +1391,11 @@ class TrackingContent(QMainWindow):
         else:
             new_width = scaled_width
             new_height = int((frame_height / frame_width) * scaled_width)
-        frame = cv2.resize(frame, dsize=(new_width, new_height), interpolation=cv2.INTER_CUBIC).copy()
-        self.preview_frame = QImage(frame.data, frame.shape[1], frame.shape[0], int(frame.nbytes / frame.shape[0]), format)
+        return pi.create_preview_image(frame, new_width, new_height)
+    def create_playback_image(self, frame):
+        # Called by the playback thread. The image keeps the resized frame alive, so it can be displayed after the function returns.
+        frame, use_grayscale = self.process_preview_frame(frame)
+        return self.create_preview_image(frame, self.video_frame_width, self.video_frame_height, scaled_width = self.preview_frame_window_label_size[0], grayscale = use_grayscale)
     def update_preview_frame_window(self, clear = False):
         if not clear:
             self.preview_frame_window_label.setPixmap(QPixmap.fromImage(self.preview_frame))
@@ -1501,6 +1538,10 @@ class TrackingContent(QMainWindow):
                 self.background_calculation_frame_chunk_height_textbox.setEnabled(True)
             if not self.background_calculation_frames_to_skip_textbox.isEnabled():
                 self.background_calculation_frames_to_skip_textbox.setEnabled(True)
+            if not self.background_calculation_n_sample_frames_textbox.isEnabled():
+                self.background_calculation_n_sample_frames_textbox.setEnabled(True)
+            if not self.background_calculation_sample_method_combobox.isEnabled():
+                self.background_calculation_sample_method_combobox.setEnabled(True)
             if not self.save_background_combobox.isEnabled():
                 self.save_background_combobox.setEnabled(True)
             if not self.tracking_method_combobox.isEnabled():
@@ -1550,6 +1591,10 @@ class TrackingContent(QMainWindow):
                 self.background_calculation_frame_chunk_height_textbox.setEnabled(False)
             if self.background_calculation_frames_to_skip_textbox.isEnabled():
                 self.background_calculation_frames_to_skip_textbox.setEnabled(False)
+            if self.background_calculation_n_sample_frames_textbox.isEnabled():
+                self.background_calculation_n_sample_frames_textbox.setEnabled(False)
+            if self.background_calculation_sample_method_combobox.isEnabled():
+                self.background_calculation_sample_method_combobox.setEnabled(False)
             if self.save_background_combobox.isEnabled():
                 self.save_background_combobox.setEnabled(False)
             if self.tracking_method_combobox.isEnabled():
@@ -1595,14 +1640,23 @@ class TrackingContent(QMainWindow):
                 self.background_calculation_method_combobox.setCurrentIndex(0)
             elif self.background_calculation_method == 'darkest':
                 self.background_calculation_method_combobox.setCurrentIndex(1)
-            else:
+            elif self.background_calculation_method == 'mode':
                 self.background_calculation_method_combobox.setCurrentIndex(2)
+            else:
+                self.background_calculation_method_combobox.setCurrentIndex(3)
         if self.background_calculation_frame_chunk_width_textbox.isEnabled():
             self.background_calculation_frame_chunk_width_textbox.setText('{0}'.format(self.background_calculation_frame_chunk_width))
         if self.background_calculation_frame_chunk_height_textbox.isEnabled():
             self.background_calculation_frame_chunk_height_textbox.setText('{0}'.format(self.background_calculation_frame_chunk_height))
         if self.background_calculation_frames_to_skip_textbox.isEnabled():
             self.background_calculation_frames_to_skip_textbox.setText('{0}'.format(self.background_calculation_frames_to_skip))
+        if self.background_calculation_n_sample_frames_textbox.isEnabled():
+            self.background_calculation_n_sample_frames_textbox.setText('{0}'.format(self.background_calculation_n_sample_frames))
+        if self.background_calculation_sample_method_combobox.isEnabled():
+            if self.background_calculation_sample_method == 'random':
+                self.background_calculation_sample_method_combobox.setCurrentIndex(1)
+            else:
+                self.background_calculation_sample_method_combobox.setCurrentIndex(0)
         if self.save_background_combobox.isEnabled():
             if self.save_background:
                 self.save_background_combobox.setCurrentIndex(0)
@@ -1652,14 +1706,23 @@ class TrackingContent(QMainWindow):
                 self.background_calculation_method_combobox.setCurrentIndex(0)
             elif self.background_calculation_method == 'darkest':
                 self.background_calculation_method_combobox.setCurrentIndex(1)
-            else:
+            elif self.background_calculation_method == 'mode':
                 self.background_calculation_method_combobox.setCurrentIndex(2)
+            else:
+                self.background_calculation_method_combobox.setCurrentIndex(3)
         if self.background_calculation_frame_chunk_width_textbox.isEnabled():
             self.background_calculation_frame_chunk_width_textbox.setText('{0}'.format(self.background_calculation_frame_chunk_width))
         if self.background_calculation_frame_chunk_height_textbox.isEnabled():
             self.background_calculation_frame_chunk_height_textbox.setText('{0}'.format(self.background_calculation_frame_chunk_height))
         if self.background_calculation_frames_to_skip_textbox.isEnabled():
             self.background_calculation_frames_to_skip_textbox.setText('{0}'.format(self.background_calculation_frames_to_skip))
+        if self.background_calculation_n_sample_frames_textbox.isEnabled():
+            self.background_calculation_n_sample_frames_textbox.setText('{0}'.format(self.background_calculation_n_sample_frames))
+        if self.background_calculation_sample_method_combobox.isEnabled():
+            if self.background_calculation_sample_method == 'random':
+                self.background_calculation_sample_method_combobox.setCurrentIndex(1)
+            else:
+                self.background_calculation_sample_method_combobox.setCurrentIndex(0)
         if self.recalculate_eye_coords_every_frame_combobox.isEnabled():
             if self.recalculate_eye_coords_every_frame:
                 self.recalculate_eye_coords_every_frame_combobox.setCurrentIndex(0)
@@ -1906,6 +1969,8 @@ class TrackingContent(QMainWindow):
         self.calculate_background_progress_window.background_calculation_frame_chunk_width = self.background_calculation_frame_chunk_width
         self.calculate_background_progress_window.background_calculation_frame_chunk_height = self.background_calculation_frame_chunk_height
         self.calculate_background_progress_window.background_calculation_frames_to_skip = self.background_calculation_frames_to_skip
+        self.calculate_background_progress_window.background_calculation_n_sample_frames = self.background_calculation_n_sample_frames
+        self.calculate_background_progress_window.background_calculation_sample_method = self.background_calculation_sample_method
         self.calculate_background_progress_window.save_path = self.save_path
         self.calculate_background_progress_window.save_background = self.save_background
         self.calculate_background_progress_window.video_n_frames = self.video_n_frames
@@ -1934,7 +1999,7 @@ class TrackingContent(QMainWindow):
                 self.update_preview_parameters(activate_preview_background = True)
     def trigger_open_video(self):
         self.trigger_update_parameters()
-        self.video_path = QFileDialog.getOpenFileName(self,"Open Video File", "","Video Files (*.avi; *.mp4, *.mov)", options=QFileDialog.Options())[0]
+        self.video_path = QFileDialog.getOpenFileName(self,"Open Video File", "","Video Files (*.avi; *.mp4, *.mov, *.raw, *.npy)", options=QFileDialog.Options())[0]
         if self.video_path:
             self.frame_number = 1
             self.background = None
@@ -1968,7 +2033,7 @@ class TrackingContent(QMainWindow):
                 else:
                     self.loaded_videos_listbox.setCurrentRow(list(self.loaded_videos_and_parameters_dict.keys()).index(self.video_path))
             self.trigger_update_parameters()
-            success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1)
+            success, self.frame = self.get_frame()
             if success and self.frame is not None:
                 self.update_preview_frame(self.frame, self.video_frame_width, self.video_frame_height)
                 self.update_preview_frame_window()
@@ -2006,13 +2071,9 @@ class TrackingContent(QMainWindow):
             self.update_interactive_frame_buttons(activate = True)
         elif self.preview_eyes_threshold:
             if self.video_path is not None:
-                success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1)
+                success, self.frame = self.get_frame()
                 if success and self.frame is not None:
-                    use_grayscale = True
-                    if self.tracking_method == 'free_swimming':
-                        self.frame = ut.apply_threshold_to_frame(ut.apply_median_blur_to_frame(ut.subtract_background_from_frame(self.frame, self.background)), self.eyes_threshold, invert = self.invert_threshold)
-                    elif self.tracking_method == 'head_fixed_1' or self.tracking_method == 'head_fixed_2':
-                        self.frame = ut.apply_threshold_to_frame(self.frame, self.eyes_threshold, invert = self.invert_threshold)
+                    self.frame, use_grayscale = self.process_preview_frame(self.frame, success)
                     if magnify:
                         self.update_preview_frame(self.frame, self.video_frame_width, self.video_frame_height, scaled_width = label_size + 100, grayscale = use_grayscale, preview_crop = preview_crop)
                     if demagnify:
@@ -2027,23 +2088,9 @@ class TrackingContent(QMainWindow):
                     self.update_interactive_frame_buttons(activate = True)
         else:
             if self.video_path is not None:
-                success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1)
+                success, self.frame = self.get_frame()
                 if success and self.frame is not None:
-                    use_grayscale = True
-                    if self.preview_background_subtracted_frame:
-                        if self.preview_tracking_results:
-                            results = ut.track_tail_in_frame(self.frame, self.background, success, self.n_tail_points, self.dist_tail_points, self.dist_eyes, self.dist_swim_bladder, self.pixel_threshold, self.extended_eyes_calculation, self.eyes_threshold, self.median_blur, self.tracking_method, self.initial_pixel_search, self.invert_threshold, self.range_angles)
-                            self.frame = ut.subtract_background_from_frame(self.frame, self.background)
-                            if results is not None:
-                                self.frame = ut.annotate_tracking_results_onto_frame(self.frame, results, self.colours, self.heading_line_length, self.extended_eyes_calculation, self.eyes_line_length)
-                                use_grayscale = False
-                        else:
-                            self.frame = ut.subtract_background_from_frame(self.frame, self.background)
-                    elif self.preview_tracking_results:
-                        results = ut.track_tail_in_frame(self.frame, self.background, success, self.n_tail_points, self.dist_tail_points, self.dist_eyes, self.dist_swim_bladder, self.pixel_threshold, self.extended_eyes_calculation, self.eyes_threshold, self.median_blur, self.tracking_method, self.initial_pixel_search, self.invert_threshold, self.range_angles)
-                        if results is not None:
-                            self.frame = ut.annotate_tracking_results_onto_frame(self.frame, results, self.colours, self.heading_line_length, self.extended_eyes_calculation, self.eyes_line_length)
-                            use_grayscale = False
+                    self.frame, use_grayscale = self.process_preview_frame(self.frame, success)
                     if magnify:
                         self.update_preview_frame(self.frame, self.video_frame_width, self.video_frame_height, scaled_width = label_size + 100, grayscale = use_grayscale, preview_crop = preview_crop)
                     if demagnify:
@@ -2059,6 +2106,29 @@ class TrackingContent(QMainWindow):
                     self.update_interactive_frame_buttons(activate = True)
             else:
                 self.update_preview_frame_window(clear = True)
+    def process_preview_frame(self, frame, success = True):
+        # Apply the preview options to a frame. Returns the frame and whether the frame is grayscale.
+        use_grayscale = True
+        if self.preview_eyes_threshold:
+            if self.tracking_method == 'free_swimming':
+                frame = ut.apply_threshold_to_frame(ut.apply_median_blur_to_frame(ut.subtract_background_from_frame(frame, self.background)), self.eyes_threshold, invert = self.invert_threshold)
+            elif self.tracking_method == 'head_fixed_1' or self.tracking_method == 'head_fixed_2':
+                frame = ut.apply_threshold_to_frame(frame, self.eyes_threshold, invert = self.invert_threshold)
+        elif self.preview_background_subtracted_frame:
+            if self.preview_tracking_results:
+                results = ut.track_tail_in_frame(frame, self.background, success, self.n_tail_points, self.dist_tail_points, self.dist_eyes, self.dist_swim_bladder, self.pixel_threshold, self.extended_eyes_calculation, self.eyes_threshold, self.median_blur, self.tracking_method, self.initial_pixel_search, self.invert_threshold, self.range_angles)
+                frame = ut.subtract_background_from_frame(frame, self.background)
+                if results is not None:
+                    frame = ut.annotate_tracking_results_onto_frame(frame, results, self.colours, self.heading_line_length, self.extended_eyes_calculation, self.eyes_line_length)
+                    use_grayscale = False
+            else:
+                frame = ut.subtract_background_from_frame(frame, self.background)
+        elif self.preview_tracking_results:
+            results = ut.track_tail_in_frame(frame, self.background, success, self.n_tail_points, self.dist_tail_points, self.dist_eyes, self.dist_swim_bladder, self.pixel_threshold, self.extended_eyes_calculation, self.eyes_threshold, self.median_blur, self.tracking_method, self.initial_pixel_search, self.invert_threshold, self.range_angles)
+            if results is not None:
+                frame = ut.annotate_tracking_results_onto_frame(frame, results, self.colours, self.heading_line_length, self.extended_eyes_calculation, self.eyes_line_length)
+                use_grayscale = False
+        return frame, use_grayscale
     def trigger_load_default_tracking_parameters(self):
         self.tracking_method_combobox.setCurrentIndex(0)
         self.tracking_method = 'free_swimming'
@@ -2080,6 +2150,8 @@ class TrackingContent(QMainWindow):
         self.background_calculation_frame_chunk_width = 250
         self.background_calculation_frame_chunk_height = 250
         self.background_calculation_frames_to_skip = 10
+        self.background_calculation_n_sample_frames = 0
+        self.background_calculation_sample_method = 'evenly_spaced'
         self.initial_pixel_search = 'brightest'
         self.recalculate_eye_coords_every_frame = True
         self.invert_threshold = False
@@ -2110,6 +2182,9 @@ class TrackingContent(QMainWindow):
             self.background_calculation_frame_chunk_width = tracking_parameters['background_calculation_frame_chunk_width']
             self.background_calculation_frame_chunk_height = tracking_parameters['background_calculation_frame_chunk_height']
             self.background_calculation_frames_to_skip = tracking_parameters['background_calculation_frames_to_skip']
+            # Parameters that were added later are missing from the parameters saved by older versions.
+            self.background_calculation_n_sample_frames = tracking_parameters.get('background_calculation_n_sample_frames', 0)
+            self.background_calculation_sample_method = tracking_parameters.get('background_calculation_sample_method', 'evenly_spaced')
             self.initial_pixel_search = tracking_parameters['initial_pixel_search']
             self.recalculate_eye_coords_every_frame = tracking_parameters['recalculate_eye_coords_every_frame']
             self.invert_threshold = tracking_parameters['invert_threshold']
@@ -2136,6 +2211,8 @@ class TrackingContent(QMainWindow):
             'background_calculation_frame_chunk_width' : self.background_calculation_frame_chunk_width,
             'background_calculation_frame_chunk_height' : self.background_calculation_frame_chunk_height,
             'background_calculation_frames_to_skip' : self.background_calculation_frames_to_skip,
+            'background_calculation_n_sample_frames' : self.background_calculation_n_sample_frames,
+            'background_calculation_sample_method' : self.background_calculation_sample_method,
             'initial_pixel_search' : self.initial_pixel_search, 'invert_threshold' : self.invert_threshold,
             'recalculate_eye_coords_every_frame' : self.recalculate_eye_coords_every_frame, 'save_background' : self.save_background}
         np.save('saved_parameters\\tracking_parameters.npy', tracking_parameters)
@@ -2183,6 +2260,8 @@ class TrackingContent(QMainWindow):
             self.tracking_parameters_dict['background_calculation_frame_chunk_width'] = self.background_calculation_frame_chunk_width
             self.tracking_parameters_dict['background_calculation_frame_chunk_height'] = self.background_calculation_frame_chunk_height
             self.tracking_parameters_dict['background_calculation_frames_to_skip'] = self.background_calculation_frames_to_skip
+            self.tracking_parameters_dict['background_calculation_n_sample_frames'] = self.background_calculation_n_sample_frames
+            self.tracking_parameters_dict['background_calculation_sample_method'] = self.background_calculation_sample_method
             self.loaded_videos_and_parameters_dict[self.video_path]['tracking_parameters'] = self.tracking_parameters_dict.copy()
 
         if self.loaded_videos_and_parameters_dict[self.video_path]['colour_parameters'] is None:
@@ -2211,6 +2290,7 @@ class TrackingContent(QMainWindow):
         self.track_video_progress_window.trigger_track_video()
         self.track_video_progress_window.track_video_progress_finished.connect(self.update_track_video_buttons)
     def trigger_unload_all_tracking(self):
+        self.trigger_pause_video()
         if self.preview_background_checkbox.isChecked():
             self.preview_background_checkbox.setChecked(False)
         if self.preview_background_subtracted_frame_checkbox.isChecked():
@@ -2229,6 +2309,9 @@ class TrackingContent(QMainWindow):
             del(self.colour_textbox_list[-1])
             del(self.colour_button_list[-1])
         self.loaded_videos_listbox.clear()
+        if self.frame_reader is not None:
+            self.frame_reader.release()
+        fs.release_idle_videos()
         self.initialize_class_variables()
         self.trigger_load_default_tracking_parameters()
         self.update_descriptors()
@@ -2256,16 +2339,8 @@ class TrackingContent(QMainWindow):
         self.colour_textbox_list[id].setText('{0}'.format(colour))
         self.trigger_update_preview()
     def trigger_load_default_colours(self):
-        self.colours = [[] for i in range(self.n_tail_points + 3)]
-        colour_map = cm.gnuplot2
-        self.colours[-1] = (0, 170, 0)
-        self.colours[-2] = (255, 0, 127)
-        self.colours[-3] = (255, 0, 127)
-        for i in range(self.n_tail_points):
-            colour = colour_map(i / (self.n_tail_points - 1))[:3]
-            if i == self.n_tail_points - 1:
-                colour = (1, 1, 0.5)
-            self.colours[i] = (int(colour[2] * 255), int(colour[1] * 255), int(colour[0] * 255))
+        # Calculate the gnuplot2 colour map without importing matplotlib, since the default colours are loaded when the GUI starts.
+        self.colours = ut.get_default_colours(self.n_tail_points)
     def trigger_load_previous_colours(self):
         try:
             colours = np.load('saved_parameters\\colour_parameters.npy').item()
@@ -2294,29 +2369,44 @@ class TrackingContent(QMainWindow):
         if self.play_video_max_speed:
             self.play_video_max_speed = False
     def trigger_play_video_slow_speed(self):
-        if self.play_video_slow_speed:
-            self.frame_number += 1
-            if self.frame_number <= self.video_n_frames:
-                self.trigger_update_preview()
-            else:
-                self.frame_number = 1
-                self.trigger_update_preview()
+        # Play 10 frames per second.
+        self.trigger_play_video(10)
     def trigger_play_video_medium_speed(self):
-        if self.play_video_medium_speed:
-            self.frame_number += int(self.video_fps / 10)
-            if self.frame_number <= self.video_n_frames:
-                self.trigger_update_preview()
-            else:
-                self.frame_number = 1
-                self.trigger_update_preview()
+        # Play the video in real time.
+        self.trigger_play_video(self.video_fps)
     def trigger_play_video_max_speed(self):
-        if self.play_video_max_speed:
-            self.frame_number += int(self.video_fps)
-            if self.frame_number <= self.video_n_frames:
-                self.trigger_update_preview()
-            else:
-                self.frame_number = 1
-                self.trigger_update_preview()
+        # Play the video 10 times faster than real time.
+        self.trigger_play_video(self.video_fps * 10)
+    def trigger_play_video(self, playback_rate):
+        if self.video_playback_thread is not None:
+            self.video_playback_thread.close()
+            self.video_playback_thread.wait()
+        # Decode and prepare the frames in a background thread, which drops the frames that are no longer due to keep to the playback rate.
+        self.video_playback_thread = VideoPlaybackThread(self.video_path, frame_number = self.frame_number - 1, playback_rate = playback_rate, process_frame = self.create_playback_image, grayscale = True)
+        self.video_playback_thread.frame_ready_signal.connect(self.trigger_update_playback_frame)
+        self.playback_frame_number = self.frame_number
+        self.video_playback_thread.start()
+    def trigger_update_playback_frame(self, frame_number):
+        if self.video_playback_thread is None:
+            return
+        if self.video_playback_thread.video_path != self.video_path:
+            # A different video was opened during playback, so play the new video instead.
+            self.trigger_play_video(self.video_playback_thread.playback_rate)
+            return
+        if self.frame_number != self.playback_frame_number:
+            # A different frame was selected during playback, so continue playback from the selected frame.
+            self.video_playback_thread.seek(self.frame_number - 1)
+            self.playback_frame_number = self.frame_number
+            return
+        ready_frame = self.video_playback_thread.get_ready_frame()
+        if ready_frame is None:
+            return
+        self.frame_number = self.playback_frame_number = ready_frame[0] + 1
+        self.preview_frame = ready_frame[1]
+        self.update_preview_frame_window()
+        self.update_frame_window_slider(activate = True)
+        self.update_preview_frame_number_textbox(activate = True)
+        self.update_video_time_textbox(activate = True)
     def trigger_unload_selected_video(self):
         if len(self.loaded_videos_and_parameters_dict) > 0:
             if len(self.loaded_videos_and_parameters_dict) == 1:
@@ -2331,7 +2421,7 @@ class TrackingContent(QMainWindow):
                 self.video_path = self.loaded_videos_listbox.currentItem().text()
                 self.get_video_attributes()
                 self.update_descriptors()
-                success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1)
+                success, self.frame = self.get_frame()
                 if success and self.frame is not None:
                     self.update_preview_frame(self.frame, self.video_frame_width, self.video_frame_height)
                     self.update_preview_frame_window()
@@ -2391,6 +2481,8 @@ class TrackingContent(QMainWindow):
             self.tracking_parameters_dict['background_calculation_frame_chunk_width'] = self.background_calculation_frame_chunk_width
             self.tracking_parameters_dict['background_calculation_frame_chunk_height'] = self.background_calculation_frame_chunk_height
             self.tracking_parameters_dict['background_calculation_frames_to_skip'] = self.background_calculation_frames_to_skip
+            self.tracking_parameters_dict['background_calculation_n_sample_frames'] = self.background_calculation_n_sample_frames
+            self.tracking_parameters_dict['background_calculation_sample_method'] = self.background_calculation_sample_method
 
             self.loaded_videos_and_parameters_dict[self.video_path]['descriptors'] = self.descriptors_dict.copy()
             self.loaded_videos_and_parameters_dict[self.video_path]['tracking_parameters'] = self.tracking_parameters_dict.copy()
@@ -2454,11 +2546,13 @@ class TrackingContent(QMainWindow):
             self.background_calculation_frame_chunk_width = self.tracking_parameters_dict['background_calculation_frame_chunk_width']
             self.background_calculation_frame_chunk_height = self.tracking_parameters_dict['background_calculation_frame_chunk_height']
             self.background_calculation_frames_to_skip = self.tracking_parameters_dict['background_calculation_frames_to_skip']
+            self.background_calculation_n_sample_frames = self.tracking_parameters_dict.get('background_calculation_n_sample_frames', 0)
+            self.background_calculation_sample_method = self.tracking_parameters_dict.get('background_calculation_sample_method', 'evenly_spaced')
             self.update_tracking_parameters()
     def trigger_open_videos_from_folder(self):
         folder = QFileDialog.getExistingDirectory(self, 'Select folder to add videos.')
         if folder:
-            filenames = ut.filenames_from_folder(folder, filename_ends_with = ['.avi', '.mp4'])
+            filenames = ut.filenames_from_folder(folder, filename_ends_with = ['.avi', '.mp4', '.raw', '.npy'])
             if len(filenames) > 0:
                 self.frame_number = 1
                 self.background = None
@@ -2494,7 +2588,7 @@ class TrackingContent(QMainWindow):
                         else:
                             self.loaded_videos_listbox.setCurrentRow(list(self.loaded_videos_and_parameters_dict.keys()).index(self.video_path))
                     self.trigger_update_parameters()
-                    success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1)
+                    success, self.frame = self.get_frame()
                     if success and self.frame is not None:
                         self.update_preview_frame(self.frame, self.video_frame_width, self.video_frame_height)
                         self.update_preview_frame_window()
@@ -2535,7 +2629,7 @@ class TrackingContent(QMainWindow):
                             else:
                                 self.loaded_videos_listbox.setCurrentRow(list(self.loaded_videos_and_parameters_dict.keys()).index(self.video_path))
                             self.trigger_update_parameters()
-                            success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1)
+                            success, self.frame = self.get_frame()
                             if success and self.frame is not None:
                                 self.update_preview_frame(self.frame, self.video_frame_width, self.video_frame_height)
                                 self.update_preview_frame_window()
@@ -2828,10 +2922,7 @@ class TrackingContent(QMainWindow):
                     self.video_playback_thread.close()
                     self.video_playback_thread.wait()
                     self.video_playback_thread = None
-            if self.video_playback_thread is None:
-                self.video_playback_thread = TimerThread(sleep_time = 0.1)
-                self.video_playback_thread.start()
-            self.video_playback_thread.time_signal.connect(self.trigger_play_video_slow_speed)
+            self.trigger_play_video_slow_speed()
             self.play_video_slow_speed = True
         else:
             self.play_video_slow_speed = False
@@ -2855,10 +2946,7 @@ class TrackingContent(QMainWindow):
                     self.video_playback_thread.close()
                     self.video_playback_thread.wait()
                     self.video_playback_thread = None
-            if self.video_playback_thread is None:
-                self.video_playback_thread = TimerThread(sleep_time = 0.1)
-                self.video_playback_thread.start()
-            self.video_playback_thread.time_signal.connect(self.trigger_play_video_medium_speed)
+            self.trigger_play_video_medium_speed()
             self.play_video_medium_speed = True
         else:
             self.play_video_medium_speed = False
@@ -2882,10 +2970,7 @@ class TrackingContent(QMainWindow):
                     self.video_playback_thread.close()
                     self.video_playback_thread.wait()
                     self.video_playback_thread = None
-            if self.video_playback_thread is None:
-                self.video_playback_thread = TimerThread(sleep_time = 0.1)
-                self.video_playback_thread.start()
-            self.video_playback_thread.time_signal.connect(self.trigger_play_video_max_speed)
+            self.trigger_play_video_max_speed()
             self.play_video_max_speed = True
         else:
             self.play_video_max_speed = False
@@ -2919,6 +3004,8 @@ class TrackingContent(QMainWindow):
             self.background_calculation_method = 'darkest'
         if current_index == 2:
             self.background_calculation_method = 'mode'
+        if current_index == 3:
+            self.background_calculation_method = 'median'
     def check_background_calculation_frame_chunk_width_textbox(self):
         if self.background_calculation_frame_chunk_width_textbox.text().isdigit():
             self.background_calculation_frame_chunk_width = int(self.background_calculation_frame_chunk_width_textbox.text())
@@ -2934,6 +3021,17 @@ class TrackingContent(QMainWindow):
             self.background_calculation_frames_to_skip = int(self.background_calculation_frames_to_skip_textbox.text())
         else:
             self.background_calculation_frames_to_skip_textbox.setText(str(self.background_calculation_frames_to_skip))
+    def check_background_calculation_n_sample_frames_textbox(self):
+        if self.background_calculation_n_sample_frames_textbox.text().isdigit():
+            self.background_calculation_n_sample_frames = int(self.background_calculation_n_sample_frames_textbox.text())
+        else:
+            self.background_calculation_n_sample_frames_textbox.setText(str(self.background_calculation_n_sample_frames))
+    def check_background_calculation_sample_method_combobox(self):
+        current_index = self.background_calculation_sample_method_combobox.currentIndex()
+        if current_index == 0:
+            self.background_calculation_sample_method = 'evenly_spaced'
+        if current_index == 1:
+            self.background_calculation_sample_method = 'random'
     def check_initial_pixel_search_combobox(self):
         current_index = self.initial_pixel_search_combobox.currentIndex()
         if current_index == 0:
@@ -2964,7 +3062,7 @@ class TrackingContent(QMainWindow):
         self.video_path = self.loaded_videos_listbox.currentItem().text()
         self.get_video_attributes()
         self.update_descriptors()
-        success, self.frame = ut.load_frame_into_memory(self.video_path, self.frame_number - 1)
+        success, self.frame = self.get_frame()
         if success and self.frame is not None:
             self.update_preview_frame(self.frame, self.video_frame_width, self.video_frame_height)
             self.update_preview_frame_window()
@@ -7,30 +7,30 @@ import cv2
 import sys
 import multiprocessing as mp
 import time
-import scipy.stats as stats
+import hashlib
+import itertools
+from functools import lru_cache, partial
+import frame_sources as fs
+import tracking_results as tr
 
 def get_total_frame_number_from_video(video_path):
-    capture = cv2.VideoCapture(video_path)
-    total_frame_number = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
-    capture.release()
+    total_frame_number = fs.get_video_properties(video_path)[0]
     return total_frame_number
 
 def get_fps_from_video(video_path):
-    capture = cv2.VideoCapture(video_path)
-    video_fps = capture.get(cv2.CAP_PROP_FPS)
-    capture.release()
+    video_fps = fs.get_video_properties(video_path)[1]
+    # Some videos do not give a frame rate, in which case OpenCV returns 0.
+    if not video_fps > 0:
+        print('Warning! Could not read the fps of {0}. Using {1} fps.'.format(video_path, fs.DEFAULT_FPS))
+        video_fps = fs.DEFAULT_FPS
     return video_fps
 
 def get_frame_size_from_video(video_path):
-    capture = cv2.VideoCapture(video_path)
-    frame_size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
-    capture.release()
+    frame_size = tuple(fs.get_video_properties(video_path)[2:])
     return frame_size
 
 def get_video_format_from_video(video_path):
-    capture = cv2.VideoCapture(video_path)
-    video_format = capture.get(cv2.CAP_PROP_FORMAT)
-    capture.release()
+    video_format = fs.get_video_metadata(video_path)['format']
     return video_format
 
 def filenames_from_folder(folder, filename_starts_with = None, filename_contains = None, filename_ends_with = None, filename_does_not_contain = None):
@@ -82,36 +82,326 @@ def convert_total_seconds_to_hours_minutes_seconds(total_seconds):
     seconds = int(total_seconds - (hours * 3600) - (minutes * 60))
     return [hours, minutes, seconds]
 
-def calculate_background(video_path, method = 'brightest', save_path = None, save_background = False, chunk_size = [100, 100], frames_to_skip = 0, print_progress = True):
+def initialize_background_statistics(frame_size, methods = ['brightest']):
+    '''
+    Function that initializes the running statistics used to calculate the background of a video in a single pass.
+
+    Required Arguments:
+        frame_size (frame height, frame width) - Size of the frames in the video.
+
+    Optional Arguments:
+        methods (list(str)) - Methods that will be used to calculate the background. Can include brightest, darkest, mode and median. Default = ['brightest'].
+            ** The mode and median methods keep a 256 bin histogram of the pixel values for every pixel in the frame. The histograms use 512 bytes per pixel (1024 bytes per pixel once more than 65535 frames have been added).
+
+    Returns:
+        background_statistics (dict) - Dictionary containing the number of frames that have been added, the running brightest and darkest frames, and the histogram of pixel values.
+    '''
+    background_statistics = {'n_frames' : 0, 'brightest' : None, 'darkest' : None, 'histogram' : None, 'pixel_offsets' : None}
+    if 'mode' in methods or 'median' in methods:
+        # Create a histogram of the 256 possible pixel values for every pixel in the frame.
+        background_statistics['histogram'] = np.zeros((frame_size[0] * frame_size[1], 256), dtype = np.uint16)
+        # The offsets of each pixel in the flattened histogram.
+        background_statistics['pixel_offsets'] = np.arange(frame_size[0] * frame_size[1]) * 256
+    return background_statistics
+
+def update_background_statistics(background_statistics, frame):
+    '''
+    Function that adds a grayscale frame to the running statistics used to calculate the background.
+
+    Required Arguments:
+        background_statistics (dict) - Running statistics created by initialize_background_statistics.
+            ** The running statistics are updated in place.
+        frame (frame height, frame width) - Grayscale frame.
+    '''
+    if background_statistics['n_frames'] == 0:
+        # Copy the first frame into the brightest and darkest frames.
+        background_statistics['brightest'] = frame.copy()
+        background_statistics['darkest'] = frame.copy()
+    else:
+        # Update the pixels in the frame that are brighter or darker than the brightest or darkest frames.
+        np.maximum(background_statistics['brightest'], frame, out = background_statistics['brightest'])
+        np.minimum(background_statistics['darkest'], frame, out = background_statistics['darkest'])
+    if background_statistics['histogram'] is not None:
+        if background_statistics['n_frames'] == np.iinfo(background_statistics['histogram'].dtype).max:
+            # Increase the size of the histogram counts before they overflow.
+            background_statistics['histogram'] = background_statistics['histogram'].astype(np.uint32)
+        # Increment the bin of the pixel value for every pixel in the frame. Each index only occurs once per frame.
+        background_statistics['histogram'].reshape(-1)[background_statistics['pixel_offsets'] + frame.reshape(-1)] += 1
+    background_statistics['n_frames'] += 1
+
+def get_background_from_statistics(background_statistics, method = 'brightest', chunk_size = [100, 100]):
+    '''
+    Function that calculates a background from the running statistics.
+
+    Required Arguments:
+        background_statistics (dict) - Running statistics created by initialize_background_statistics.
+
+    Optional Arguments:
+        method (str) - Method to use for calculating background. Different types of methods include brightest, darkest, mode and median. Default = brightest.
+            ** The mode uses the lowest pixel value when multiple pixel values are equally common.
+            ** The median uses the lower of the two middle pixel values when an even number of frames has been added.
+        chunk_size (list(int, int)) - Determines the number of pixels (width x height) of the histogram that are processed at a time when calculating the mode or median. Default = [100, 100].
+
+    Returns:
+        background (frame height, frame width) - Calculated background image.
+    '''
+    if method in ['brightest', 'darkest']:
+        return background_statistics[method].copy()
+    histogram = background_statistics['histogram']
+    frame_size = background_statistics['brightest'].shape
+    background = np.zeros(frame_size[0] * frame_size[1], dtype = np.uint8)
+    n_pixels = chunk_size[0] * chunk_size[1]
+    # Process the histogram in chunks of pixels to limit the size of the temporary arrays.
+    for i in range(0, len(histogram), n_pixels):
+        if method == 'mode':
+            # The mode is the most common pixel value.
+            background[i : i + n_pixels] = np.argmax(histogram[i : i + n_pixels], axis = 1)
+        elif method == 'median':
+            # The median is the first pixel value where the cumulative count reaches half of the frames.
+            background[i : i + n_pixels] = np.argmax(np.cumsum(histogram[i : i + n_pixels], axis = 1, dtype = np.uint32) >= (background_statistics['n_frames'] + 1) // 2, axis = 1)
+    return background.reshape(frame_size)
+
+def get_sample_frame_numbers(video_total_frames, n_sample_frames, sample_method = 'evenly_spaced', random_seed = None):
+    '''
+    Function that selects the frames of a video used to estimate the background.
+
+    Required Arguments:
+        video_total_frames (int) - Total number of frames in the video.
+        n_sample_frames (int) - Number of frames to select.
+
+    Optional Arguments:
+        sample_method (str) - Method used to select the frames. Can be evenly_spaced or random. Default = evenly_spaced.
+        random_seed (int) - Seed used to select the frames when using the random method. Default = None.
+
+    Returns:
+        sample_frame_numbers (array(int)) - Sorted frame numbers of the selected frames.
+    '''
+    n_sample_frames = min(n_sample_frames, video_total_frames)
+    if sample_method == 'random':
+        # Select frames at random without replacement.
+        return np.sort(np.random.RandomState(random_seed).choice(video_total_frames, n_sample_frames, replace = False))
+    # Select frames that are evenly spaced throughout the video.
+    return np.unique(np.round(np.linspace(0, video_total_frames - 1, n_sample_frames)).astype(int))
+
+def read_frame_at_frame_number(capture, frame_number, current_frame_number, max_frames_to_grab = 25):
+    '''
+    Function that reads a specific frame from a video by either grabbing the frames in between or seeking to the frame.
+
+    Required Arguments:
+        capture (cv2.VideoCapture or frame_sources.FrameSource) - Opened video.
+        frame_number (int) - Frame number of the frame to read.
+        current_frame_number (int) - Frame number of the next frame that will be read from the video.
+
+    Optional Arguments:
+        max_frames_to_grab (int) - Maximum number of frames to grab instead of seeking. Default = 25.
+            ** Grabbing a frame skips the conversion of the frame into an image, which is faster than seeking for short distances.
+            ** Seeking jumps to the closest keyframe before the frame and only decodes the frames from the keyframe onwards.
+
+    Returns:
+        success (bool) - Whether the frame was read successfully.
+        frame (frame height, frame width, 3) - Frame.
+    '''
+    if 0 <= frame_number - current_frame_number <= max_frames_to_grab:
+        # Grab the frames in between without retrieving them.
+        for i in range(frame_number - current_frame_number):
+            capture.grab()
+    else:
+        # Seek to the frame.
+        capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    return capture.read()
+
+def calculate_backgrounds(video_path, methods = ['brightest', 'darkest', 'mode', 'median'], chunk_size = [100, 100], frames_to_skip = 0, n_sample_frames = None, sample_method = 'evenly_spaced', print_progress = True, progress_callback = None, video_backend = 'opencv'):
+    '''
+    Function that calculates several backgrounds of a video in a single pass through the video.
+
+    Steps:
+        A path to the video is provided.
+        The video is opened using the video backend, which returns grayscale frames.
+        Each frame used to calculate the background is read into memory once and added to the running statistics of the background.
+        Frames that are not used are skipped without being retrieved, or seeked past when sampling frames.
+        The backgrounds are calculated from the running statistics.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        methods (list(str)) - Methods to use for calculating the backgrounds. Default = ['brightest', 'darkest', 'mode', 'median'].
+        chunk_size (list(int, int)) - Same as in get_background_from_statistics. Default = [100, 100].
+        frames_to_skip (int) - Determines the number of frames to skip between the frames used to calculate the background. Default = 0.
+        n_sample_frames (int) - Number of frames sampled from the video to calculate the background. Default = None.
+            ** When default is None, frames_to_skip is used to select the frames.
+            ** Only the sampled frames are decoded, which is much faster than reading every frame in long videos.
+        sample_method (str) - Same as in get_sample_frame_numbers. Default = evenly_spaced.
+        print_progress (bool) - Print the progress of the background calculation. Default = True.
+        progress_callback (function) - Function that is called with the number of frames processed after each frame. Default = None.
+            ** When sampling frames, the callback is called with the frame number of each sampled frame so that the progress spans the whole video.
+        video_backend (str) - Backend used to decode the frames. Same as backend in frame_sources.open_video. Default = opencv.
+
+    Returns:
+        backgrounds (dict) - Dictionary containing the calculated background image for each method.
+    '''
+    # Load the video.
+    capture = fs.open_video(video_path, video_backend, grayscale = True)
+    # Retrieve total number of frames in video.
+    video_total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_size = (int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    frames_to_skip += 1
+    background_statistics = initialize_background_statistics(frame_size, methods)
+    if n_sample_frames is not None:
+        sample_frame_numbers = get_sample_frame_numbers(video_total_frames, n_sample_frames, sample_method)
+        current_frame_number = 0
+        # Iterate through each sampled frame in the video.
+        for i, frame_num in enumerate(sample_frame_numbers):
+            if print_progress:
+                print('Calculating background. Processing sampled frame: {0}/{1}.'.format(i + 1, len(sample_frame_numbers)), end = '\r')
+            # Load frame into memory.
+            success, frame = read_frame_at_frame_number(capture, frame_num, current_frame_number)
+            current_frame_number = frame_num + 1
+            # Check if frame was loaded successfully.
+            if success:
+                # Add the frame to the running statistics.
+                update_background_statistics(background_statistics, frame)
+            if progress_callback is not None:
+                progress_callback(frame_num + 1)
+        if progress_callback is not None:
+            progress_callback(video_total_frames)
+    else:
+        # Iterate through each frame in the video.
+        for frame_num in range(video_total_frames):
+            if print_progress:
+                print('Calculating background. Processing frame number: {0}/{1}.'.format(frame_num + 1, video_total_frames), end = '\r')
+            if frame_num % frames_to_skip == 0:
+                # Load frame into memory.
+                success, frame = capture.read()
+                # Check if frame was loaded successfully.
+                if success:
+                    # Add the frame to the running statistics.
+                    update_background_statistics(background_statistics, frame)
+            else:
+                # Skip the frame without retrieving it.
+                capture.grab()
+            if progress_callback is not None:
+                progress_callback(frame_num + 1)
+    # Unload video from memory.
+    capture.release()
+    if print_progress:
+        print('Calculating background complete. Processing frame number: {0}/{1}.'.format(video_total_frames, video_total_frames))
+    # Calculate the background for each method.
+    backgrounds = {method : get_background_from_statistics(background_statistics, method, chunk_size) for method in methods}
+    return backgrounds
+
+def calculate_background_convergence(video_path, method = 'brightest', sample_sizes = [25, 50, 100, 200, 400], sample_method = 'evenly_spaced', random_seed = None, reference_background = None, chunk_size = [100, 100], print_progress = True, video_backend = 'opencv'):
+    '''
+    Function that reports how the background estimated from sampled frames converges as the number of sampled frames increases.
+
+    Steps:
+        A path to the video is provided.
+        Frames are sampled from the video once for the largest sample size.
+        The frames of each smaller sample size are a subset of the frames of the next sample size, selected from those frames using the same sample method, and are read first.
+        Each sampled frame is read into memory once and added to the running statistics of the background.
+        After each sample size has been reached, the background is compared to the reference background and to the background of the previous sample size.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        method (str) - Method to use for calculating background. Default = brightest.
+        sample_sizes (list(int)) - Numbers of sampled frames at which the background is compared. Default = [25, 50, 100, 200, 400].
+        sample_method (str) - Same as in get_sample_frame_numbers. Default = evenly_spaced.
+        random_seed (int) - Same as in get_sample_frame_numbers. Default = None.
+        reference_background (frame height, frame width) - Background to compare the estimated backgrounds to. Default = None.
+            ** When default is None, the background estimated from the largest sample size is used as the reference.
+        chunk_size (list(int, int)) - Same as in get_background_from_statistics. Default = [100, 100].
+        print_progress (bool) - Print the convergence report. Default = True.
+        video_backend (str) - Same as in calculate_backgrounds. Default = opencv.
+
+    Returns:
+        convergence (list(dict)) - List containing, for each sample size, the number of frames used, the mean and maximum absolute difference from the reference background, the fraction of pixels that differ from the reference background, and the mean absolute change from the previous sample size.
+    '''
+    # Load the video.
+    capture = fs.open_video(video_path, video_backend, grayscale = True)
+    video_total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_size = (int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    sample_sizes = sorted(sample_sizes)
+    # Order the sampled frames so that the frames of each sample size are read before the frames of the next sample size.
+    if sample_method == 'random':
+        # The first frames of a random permutation are the frames selected by get_sample_frame_numbers with the same random seed.
+        sample_frame_numbers = np.random.RandomState(random_seed).permutation(video_total_frames)[:sample_sizes[-1]]
+        sample_frame_batches = [np.sort(sample_frame_numbers[start : stop]) for start, stop in zip([0] + sample_sizes[:-1], sample_sizes)]
+    else:
+        sample_frame_numbers = get_sample_frame_numbers(video_total_frames, sample_sizes[-1])
+        # Index of the smallest sample size that contains each sampled frame.
+        sample_size_indices = np.full(len(sample_frame_numbers), len(sample_sizes) - 1)
+        subset_indices = np.arange(len(sample_frame_numbers))
+        for i in range(len(sample_sizes) - 2, -1, -1):
+            # Select evenly spaced frames from the frames of the next sample size.
+            subset_indices = subset_indices[np.unique(np.round(np.linspace(0, len(subset_indices) - 1, min(sample_sizes[i], len(subset_indices)))).astype(int))]
+            sample_size_indices[subset_indices] = i
+        sample_frame_batches = [sample_frame_numbers[sample_size_indices == i] for i in range(len(sample_sizes))]
+    background_statistics = initialize_background_statistics(frame_size, [method])
+    backgrounds = []
+    current_frame_number = 0
+    for sample_frame_batch in sample_frame_batches:
+        for frame_num in sample_frame_batch:
+            # Load frame into memory.
+            success, frame = read_frame_at_frame_number(capture, frame_num, current_frame_number)
+            current_frame_number = frame_num + 1
+            if success:
+                update_background_statistics(background_statistics, frame)
+        if background_statistics['n_frames'] > 0:
+            backgrounds.append([background_statistics['n_frames'], get_background_from_statistics(background_statistics, method, chunk_size)])
+    # Unload video from memory.
+    capture.release()
+    if len(backgrounds) == 0:
+        print('Error: Could not read any frames from the video.')
+        return
+    if reference_background is None:
+        reference_background = backgrounds[-1][1]
+    reference_background = reference_background.astype(np.int16)
+    convergence = []
+    previous_background = None
+    for n_frames, background in backgrounds:
+        background = background.astype(np.int16)
+        absolute_difference = np.abs(background - reference_background)
+        convergence.append({'n_frames' : n_frames, 'mean_absolute_difference' : float(np.mean(absolute_difference)), 'max_absolute_difference' : int(np.max(absolute_difference)), 'fraction_of_pixels_different' : float(np.mean(absolute_difference > 0)), 'mean_absolute_change' : None if previous_background is None else float(np.mean(np.abs(background - previous_background)))})
+        previous_background = background
+        if print_progress:
+            print('Sampled frames: {0}. Mean absolute difference: {1:.3f}. Maximum absolute difference: {2}. Fraction of pixels different: {3:.4f}.'.format(n_frames, convergence[-1]['mean_absolute_difference'], convergence[-1]['max_absolute_difference'], convergence[-1]['fraction_of_pixels_different']))
+    return convergence
+
+def calculate_background(video_path, method = 'brightest', save_path = None, save_background = False, chunk_size = [100, 100], frames_to_skip = 0, n_sample_frames = None, sample_method = 'evenly_spaced', print_progress = True, progress_callback = None, video_backend = 'opencv'):
 
     '''
     Function that calculates the background of a video.
 
     Steps:
         A path to the video is provided.
-        OpenCV is used to open the video.
-        The first frame is read into memory.
-        The first frame is copied as the background.
-        Each frame is subsequently iterated through and compared to the current background.
-        Pixels in the frame that are either brighter (default) or darker than the background are used to update the existing background.
-        The final output is an array of background images that are equally spaced throughout the video.
+        The video is opened using the video backend.
+        Each frame is read into memory once and added to the running statistics of the background.
+        For the brightest (default) or darkest methods, pixels in the frame that are either brighter or darker than the background are used to update the existing background.
+        For the mode or median methods, the pixel value of every pixel is counted in a histogram.
+        The final output is the background image calculated from the running statistics.
 
     Required Arguments:
         video_path (str) - Path to the video.
 
     Optional Arguments:
-        method (str) - Method to use for calculating background. Different types of methods include brightest, darkest and mode. Default = brightest.
+        method (str) - Method to use for calculating background. Different types of methods include brightest, darkest, mode and median. Default = brightest.
         save_background (bool) - Saves the background(s) seperately into external TIFF files. Default = False.
             ** Location of images can be found in path to video.
             ** Name of file will be {name of video}_background.tif
-        chunk_size (list(int, int)) - Determines the size of the area of the background to be successively computed if using mode as the method of background calculation. Default = [100, 100].
-            ** When calculating the mode, the entire distribution of pixel values across the entire video must be held in memory.
-            ** Thus, to preserve memory resources, patches of the background are computed sequentially until the entire background image has been calculated.
-            ** Smaller chunk sizes take longer to process but decrease the number of values held in memory at a time.
-            ** Larger chunk sizes make processing faster but require more values to be held in memory.
-        frames_to_skip (int) - Determines the number of frames to skip when calculating background. Default = 1.
-            ** When default is 1, every frame is used when calculating background.
+        chunk_size (list(int, int)) - Determines the size of the area of the background to be successively computed if using mode or median as the method of background calculation. Default = [100, 100].
+            ** The video is only read once. The chunk size only limits the size of the temporary arrays used when calculating the background from the histograms.
+        frames_to_skip (int) - Determines the number of frames to skip when calculating background. Default = 0.
+            ** When default is 0, every frame is used when calculating background.
             ** Larger values speed up the background calculation but may provide a less accurate representation of the background.
+        n_sample_frames (int) - Number of frames sampled from the video to calculate the background. Default = None.
+            ** When default is None, frames_to_skip is used to select the frames.
+            ** Only the sampled frames are decoded. Use calculate_background_convergence to choose the number of sampled frames.
+        sample_method (str) - Method used to sample the frames. Can be evenly_spaced or random. Default = evenly_spaced.
+        progress_callback (function) - Function that is called with the number of frames processed after each frame. Default = None.
+        video_backend (str) - Backend used to decode the frames. Can be opencv, ffmpeg, or pyav. Default = opencv.
+            ** The ffmpeg and pyav backends decode the frames directly to grayscale.
 
     Returns:
         background (frame width, frame height) - Calculated background image.
@@ -121,8 +411,8 @@ def calculate_background(video_path, method = 'brightest', save_path = None, sav
     if not isinstance(video_path, str):
         print('Error: video_path must be formatted as a string.')
         return
-    if not isinstance(method, str) or method not in ['brightest', 'darkest', 'mode']:
-        print('Error: method must be formatted as a string and must be one of the following: brightest, darkest, or mode.')
+    if not isinstance(method, str) or method not in ['brightest', 'darkest', 'mode', 'median']:
+        print('Error: method must be formatted as a string and must be one of the following: brightest, darkest, mode, or median.')
         return
     if not isinstance(save_background, bool):
         print('Error: save_background must be formatted as a boolean (True/False).')
@@ -139,122 +429,96 @@ def calculate_background(video_path, method = 'brightest', save_path = None, sav
     if not isinstance(frames_to_skip, int):
         print('Error: frames_to_skip must be formatted as an integer.')
         return
+    if n_sample_frames is not None and (not isinstance(n_sample_frames, int) or n_sample_frames < 1):
+        print('Error: n_sample_frames must be formatted as a positive integer.')
+        return
+    if not isinstance(sample_method, str) or sample_method not in ['evenly_spaced', 'random']:
+        print('Error: sample_method must be formatted as a string and must be one of the following: evenly_spaced or random.')
+        return
+    if video_backend not in fs.VIDEO_BACKENDS:
+        print('Error: video_backend must be formatted as a string and must be one of the following: {0}.'.format(', '.join(fs.VIDEO_BACKENDS)))
+        return
 
     if print_progress:
         t0 = time.time()
 
     try:
-        # Load the video.
-        capture = cv2.VideoCapture(video_path)
-        # Retrieve total number of frames in video.
-        video_total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
-        frames_to_skip += 1
-
-        if method == 'mode':
-            frame_size = (int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)))
-            background = np.zeros(frame_size)
-            pix = []
-            height_iterations = int(frame_size[0]/chunk_size[0])
-            if frame_size[0] % chunk_size[0] != 0:
-                height_iterations += 1
-            width_iterations = int(frame_size[1] / chunk_size[1])
-            if frame_size[1] % chunk_size[1] != 0:
-                width_iterations += 1
-            for i in range(height_iterations):
-                for j in range(width_iterations):
-                    for frame_num in range(video_total_frames):
-                        if print_progress:
-                            print('Calculating background. Processing frame number: {0}/{1}.'.format(frame_num + 1 + (j * video_total_frames) + (video_total_frames * width_iterations * i), video_total_frames * width_iterations * height_iterations), end = '\r')
-                        success, frame = capture.read()
-                        if success:
-                            if frame_num % frames_to_skip == 0:
-                                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                                if i == height_iterations - 1 and j == width_iterations - 1:
-                                    pix.append(frame[i * chunk_size[1] : , j * chunk_size[0] : ])
-                                elif i == height_iterations - 1:
-                                    pix.append(frame[i * chunk_size[1] : , j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]])
-                                elif j == width_iterations - 1:
-                                    pix.append(frame[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : ])
-                                else:
-                                    pix.append(frame[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]])
-                    bg_pix = stats.mode(pix)[0]
-                    if i == height_iterations - 1 and j == width_iterations - 1:
-                        background[i * chunk_size[1] : , j * chunk_size[0] : ] = bg_pix
-                    elif i == height_iterations - 1:
-                        background[i * chunk_size[1] : , j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]] = bg_pix
-                    elif j == width_iterations - 1:
-                        background[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : ] = bg_pix
-                    else:
-                        background[i * chunk_size[1] : i * chunk_size[1] + chunk_size[1], j * chunk_size[0] : j * chunk_size[0] + chunk_size[0]] = bg_pix
-                    pix = []
-                    capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            background = background.astype(np.uint8)
-            if print_progress:
-                print('Calculating background complete. Processing frame number: {0}/{1}.'.format(1 + frame_num + (j * video_total_frames) + (video_total_frames * width_iterations * i), video_total_frames * width_iterations * height_iterations))
-            if save_background:
-                if save_path != None:
-                    background_path = '{0}\\{1}_background.tif'.format(save_path, os.path.basename(video_path)[:-4])
-                else:
-                    background_path = '{0}_background.tif'.format(video_path[:-4])
-                cv2.imwrite(background_path, background)
-        else:
-            # Iterate through each frame in the video.
-            for frame_num in range(video_total_frames):
-                if print_progress:
-                    print('Calculating background. Processing frame number: {0}/{1}.'.format(frame_num + 1, video_total_frames), end = '\r')
-                # Load frame into memory.
-                success, frame = capture.read()
-                # Check if frame was loaded successfully.
-                if success:
-                    if frame_num % frames_to_skip == 0:
-                        # Convert frame to grayscale.
-                        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                        # Copy frame into background if this is the first frame.
-                        if frame_num == 0:
-                            background = frame.copy().astype(np.float32)
-                        elif method == 'brightest':
-                            # Create a mask where the background is compared to the frame in the loop and used to update the background where the frame is.
-                            mask = np.less(background, frame)
-                            # Update the background image where all of the pixels in the new frame are brighter than the background image.
-                            background[mask] = frame[mask]
-                        elif method == 'darkest':
-                            # Create a mask where the background is compared to the frame in the loop and used to update the background where the frame is.
-                            mask = np.greater(background, frame)
-                            # Update the background image where all of the pixels in the new frame are darker than the background image.
-                            background[mask] = frame[mask]
-            background = background.astype(np.uint8)
-            if print_progress:
-                print('Calculating background complete. Processing frame number: {0}/{1}.'.format(frame_num + 1, video_total_frames))
-            # Save the background into an external file if requested.
-            if save_background:
-                if save_path != None:
-                    background_path = '{0}\\{1}_background.tif'.format(save_path, os.path.basename(video_path)[:-4])
-                else:
-                    background_path = '{0}_background.tif'.format(video_path[:-4])
-                cv2.imwrite(background_path, background)
+        # Calculate the background in a single pass through the video.
+        background = calculate_backgrounds(video_path, methods = [method], chunk_size = chunk_size, frames_to_skip = frames_to_skip, n_sample_frames = n_sample_frames, sample_method = sample_method, print_progress = print_progress, progress_callback = progress_callback, video_backend = video_backend)[method]
+        # Save the background into an external file if requested.
+        if save_background:
+            if save_path != None:
+                background_path = os.path.join(save_path, '{0}_background.tif'.format(os.path.basename(video_path)[:-4]))
+            else:
+                background_path = '{0}_background.tif'.format(video_path[:-4])
+            cv2.imwrite(background_path, background)
     except:
         # Errors that may occur during the background calculation are handled.
         print('Error! Could not calculate background.')
-        if capture.isOpened():
-            capture.release()
         return None
-    if capture.isOpened():
-        # Unload video from memory.
-        capture.release()
     if print_progress:
         print('Total processing time: {0} seconds.'.format(time.time() - t0))
     # Return the calculated background.
     return background
 
-def calculate_next_coords(init_coords, radius, frame, method = 'brightest', angle = 0, n_angles = 20, range_angles = 120, tail_calculation = True):
+def calculate_arc_offsets(radius, angle, n_angles, range_angles):
     '''
-    Function that calculates the next set of coordinates provided an initial set of coordinates, radius, and frame.
+    Function that calculates the offsets between a set of initial coordinates and all of the points that lie along an arc.
 
     Steps:
         Calculates a list of angles provided by the number of angles (n_angles) and range of angles (range_angles).
-        Calculates a list of all potential coordinates in the image that lie on the circumference of a circle or arc given by the list of angles, the radius, and the initial coordinates.
-        Removes unnecessary duplicated coordinates from the list.
-        Computes the brightest coordinates out of the list of potential coordinates.
+        Calculates the vertical and horizontal offsets of each point along the arc given by the list of angles and the radius.
+
+    Required Arguments:
+        radius (float) - Radius of the arc.
+        angle (float) - Angle at the center of the arc.
+            ** Units in radians.
+        n_angles (int) - Number of angles along the arc.
+        range_angles (float) - The entire range of angles covered by the arc.
+            ** Units in radians.
+
+    Returns:
+        offsets (2, n_angles) - Vertical and horizontal offsets of the points along the arc.
+    '''
+    # Calculate list of angles.
+    angles = np.linspace(angle - range_angles / 2, angle + range_angles / 2, n_angles)
+    # Calculate the offsets of all points along the arc.
+    offsets = np.array([radius * np.sin(angles), radius * np.cos(angles)])
+    return offsets
+
+@lru_cache(maxsize = 64)
+def calculate_unrotated_arc_offsets(radius, n_angles, range_angles):
+    '''
+    Function that calculates the offsets of the points along an arc whose center is at an angle of 0.
+
+    Steps:
+        Calculates the offsets of the points along the arc using calculate_arc_offsets with an angle of 0.
+
+    Required Arguments:
+        radius (float) - Radius of the arc.
+        n_angles (int) - Number of angles along the arc.
+        range_angles (float) - The entire range of angles covered by the arc.
+            ** Units in radians.
+
+    Returns:
+        offsets (2, n_angles) - Vertical and horizontal offsets of the points along the arc.
+            ** The results are cached since the eyes and the swim bladder are searched along the same full circles on every frame. The returned array is read-only.
+            ** The tail is searched along arcs centered on the continuous angle of the previous tail point, which almost never repeats, so the arcs of the tail are not cached.
+    '''
+    offsets = calculate_arc_offsets(radius, 0, n_angles, range_angles)
+    # Protect the cached offsets from being modified.
+    offsets.flags.writeable = False
+    return offsets
+
+def calculate_next_coords(init_coords, radius, frame, method = 'brightest', angle = 0, n_angles = 20, range_angles = 120, tail_calculation = True, tracking_mask = None, outside_value = 0):
+    '''
+    Function that calculates the next set of coordinates provided an initial set of coordinates, radius, and frame.
+
+    Steps:
+        Calculates the offsets of all points along the arc given by the angle, the number of angles (n_angles), the range of angles (range_angles), and the radius. The offsets of the arcs centered at an angle of 0 are cached.
+        Calculates an array of all potential coordinates in the image that lie on the circumference of a circle or arc given by the offsets and the initial coordinates.
+        Removes unnecessary duplicated coordinates and coordinates that are outside of the frame from the array.
+        Computes the brightest coordinates out of the array of potential coordinates.
         Check if more than one set of coordinates had the same, brightest values.
         When the tail is being calculated, use the coordinate that is most stimilar to the previous angle.
         When the tail is not being calculated, use the first set of coordinates that have the minimum distance between the next coordinates and the initial coordinates.
@@ -274,6 +538,10 @@ def calculate_next_coords(init_coords, radius, frame, method = 'brightest', angl
         n_angles (int) - Number of angles used when searching for initial points. Default = 20.
         range_angles (float) - The entire range of angles with which to look for the next pixel. Default = 2 / 3 * pi.
             ** Units in radians.
+        tracking_mask (dict) - Tracking mask returned by get_tracking_mask when the frame is the region of a mask. Default = None.
+            ** The initial coordinates and next coordinates are coordinates of the entire frame.
+            ** Coordinates outside of the region but inside of the entire frame are given the outside_value, which is the value of the pixels outside of the mask.
+        outside_value (int) - Value of the pixels outside of the region. Default = 0.
 
     Returns:
         next_coords (y, x) - The next coordinates in the frame.
@@ -281,35 +549,46 @@ def calculate_next_coords(init_coords, radius, frame, method = 'brightest', angl
     if not isinstance(method, str) or method not in ['brightest', 'darkest']:
         print('Error: method must be formatted as a string and must be one of the following: brightest or darkest.')
         return
-    # Calculate list of angles.
-    angles = np.linspace(angle - range_angles / 2, angle + range_angles / 2, n_angles)
-    # Calculate list of all potential next coordinates.
-    next_coords = np.unique([[int(round(init_coords[0] + (radius * np.sin(angles[i])))), int(round(init_coords[1] + (radius * np.cos(angles[i]))))] for i in range(len(angles))], axis = 0)
-    frame_shape = frame.shape
-    next_coords = [next_coords[i] for i in range(len(next_coords)) if next_coords[i][0] >= 0 and next_coords[i][0] < frame_shape[0] and next_coords[i][1] >= 0 and next_coords[i][1] < frame_shape[1]]
+    if angle == 0:
+        # Get the cached offsets of all points along the arc.
+        offsets = calculate_unrotated_arc_offsets(radius, n_angles, range_angles)
+    else:
+        # Calculate the offsets of all points along the arc.
+        offsets = calculate_arc_offsets(radius, angle, n_angles, range_angles)
+    # Calculate array of all potential next coordinates. Unique sorts the coordinates in the same order as the pixels in the frame.
+    next_coords = np.unique(np.round(np.array([[init_coords[0]], [init_coords[1]]]) + offsets).astype(int).T, axis = 0)
+    if tracking_mask is None:
+        # Remove the coordinates that lie outside of the frame.
+        next_coords = next_coords[(next_coords[:, 0] >= 0) & (next_coords[:, 0] < frame.shape[0]) & (next_coords[:, 1] >= 0) & (next_coords[:, 1] < frame.shape[1])]
+        # Get the values of the pixels at the potential next coordinates.
+        values = frame[next_coords[:, 0], next_coords[:, 1]]
+    else:
+        frame_height, frame_width = tracking_mask['frame_shape']
+        # Remove the coordinates that lie outside of the entire frame.
+        next_coords = next_coords[(next_coords[:, 0] >= 0) & (next_coords[:, 0] < frame_height) & (next_coords[:, 1] >= 0) & (next_coords[:, 1] < frame_width)]
+        # Convert the coordinates into coordinates of the region.
+        region_coords = next_coords - [tracking_mask['y_offset'], tracking_mask['x_offset']]
+        inside = (region_coords[:, 0] >= 0) & (region_coords[:, 0] < frame.shape[0]) & (region_coords[:, 1] >= 0) & (region_coords[:, 1] < frame.shape[1])
+        # Get the values of the pixels at the potential next coordinates, using the value of the pixels outside of the mask for the coordinates outside of the region.
+        values = np.full(len(next_coords), outside_value, dtype = frame.dtype)
+        values[inside] = frame[region_coords[inside, 0], region_coords[inside, 1]]
     if method == 'brightest':
-        # Get the list of coordinates where the potential next coordinates are the brightest pixels in the frame.
-        coords = np.transpose(np.where(frame == np.max([frame[i[0]][i[1]] for i in next_coords])))
+        # Get only the coordinates that are the brightest pixels out of the potential next coordinates.
+        next_coords = next_coords[values == np.max(values)]
     elif method == 'darkest':
-        # Get the list of coordinates where the potential next coordinates are the brightest pixels in the frame.
-        coords = np.transpose(np.where(frame == np.min([frame[i[0]][i[1]] for i in next_coords])))
-    # Get only the coordinates that were in the original list.
-    next_coords = [[coords[j] for i in range(len(next_coords)) if coords[j][0] == next_coords[i][0] and coords[j][1] == next_coords[i][1]] for j in range(len(coords))]
-    # Convert the coordinates to lists.
-    next_coords = [next_coords[i][0].tolist() for i in range(len(next_coords)) if len(next_coords[i]) > 0]
+        # Get only the coordinates that are the darkest pixels out of the potential next coordinates.
+        next_coords = next_coords[values == np.min(values)]
     # Checks if more than one set of coordinates was found. This can occur if there are multiple pixels with the same (maximum) value.
     if len(next_coords) > 1:
         # Method to use for finding the next point if it is searching along the tail. For tail calculation, if multiple points are returned, then take the point whose angle is most similar to the previous angle.
         if tail_calculation:
-            # Calculate the minimum difference between the angle of the next coordinates and the initial coordinates and the previous angle that was given.
-            min_value = np.min([abs(angle - np.arctan2(next_coords[i][0] - init_coords[0], next_coords[i][1] - init_coords[1])) for i in range(len(next_coords))])
-            # Take the set of coordinates whose angle matches the minimum difference.
-            next_coords = [next_coords[i] for i in range(len(next_coords)) if abs(angle - np.arctan2(next_coords[i][0] - init_coords[0], next_coords[i][1] - init_coords[1])) == min_value]
+            # Calculate the difference between the angle of the next coordinates and the initial coordinates and the previous angle that was given.
+            differences = np.abs(angle - np.arctan2(next_coords[:, 0] - init_coords[0], next_coords[:, 1] - init_coords[1]))
         else:
-            # Calculate the minimum length between the next coordinates and the initial coordinates.
-            min_value = np.min([np.hypot(next_coords[i][0] - init_coords[0], next_coords[i][1] - init_coords[1]) for i in range(len(next_coords))])
-            # Take the set of coordinates whose length between the next coordinates and previous coordinates matches the minimum length.
-            next_coords = [next_coords[i] for i in range(len(next_coords)) if np.hypot(next_coords[i][0] - init_coords[0], next_coords[i][1] - init_coords[1]) == min_value]
+            # Calculate the length between the next coordinates and the initial coordinates.
+            differences = np.hypot(next_coords[:, 0] - init_coords[0], next_coords[:, 1] - init_coords[1])
+        # Take the first set of coordinates whose difference matches the minimum difference.
+        next_coords = next_coords[[np.argmin(differences)]]
     # Return the first set of coordinates.
     return np.array(next_coords[0])
 
@@ -320,6 +599,40 @@ def subtract_background_from_frame(frame, background):
     background_subtracted_frame = cv2.absdiff(frame, background)
     return background_subtracted_frame
 
+def get_gnuplot2_colour(value):
+    '''
+    Function that returns the colour of the gnuplot2 colour map at a value between 0 and 1 as (R, G, B) values between 0 and 1.
+    The colour map is calculated directly, using the same lookup table of 256 colours as matplotlib, so that matplotlib does not need to be imported.
+    '''
+    # Position of the colour in the lookup table, calculated in the same way as numpy.linspace(0, 1, 256).
+    index = min(max(int(value * 256), 0), 255)
+    x = 1.0 if index == 255 else index * (1 / 255)
+    red = x / 0.32 - 0.78125
+    green = 2 * x - 0.84
+    if x < 0.25:
+        blue = 4 * x
+    elif x < 0.92:
+        blue = -2 * x + 1.84
+    else:
+        blue = x / 0.08 - 11.5
+    return tuple(min(max(colour, 0), 1) for colour in [red, green, blue])
+
+def get_default_colours(n_tail_points):
+    '''
+    Function that returns the default colours used to annotate the tracking results, in the order and format saved by the GUI.
+    The tail points are coloured using the gnuplot2 colour map, followed by the colours of the eyes and the heading angle.
+    '''
+    colours = [[] for i in range(n_tail_points + 3)]
+    colours[-1] = (0, 170, 0)
+    colours[-2] = (255, 0, 127)
+    colours[-3] = (255, 0, 127)
+    for i in range(n_tail_points):
+        colour = get_gnuplot2_colour(i / max(n_tail_points - 1, 1))
+        if i == n_tail_points - 1:
+            colour = (1, 1, 0.5)
+        colours[i] = (int(colour[2] * 255), int(colour[1] * 255), int(colour[0] * 255))
+    return colours
+
 def annotate_tracking_results_onto_frame(frame, results, colours, line_length, extended_eyes_calculation, eyes_line_length):
 
     first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle, heading_coords, body_coords, heading_angle, tail_point_coords = results
@@ -396,25 +709,26 @@ def load_background_into_memory(background_path, convert_to_grayscale = True):
 
     return background
 
-def load_frame_into_memory(video_path, frame_number = 0, convert_to_grayscale = True):
+def load_frame_into_memory(video_path, frame_number = 0, convert_to_grayscale = True, video_backend = 'opencv'):
 
     video_n_frames = get_total_frame_number_from_video(video_path)
 
     if frame_number > video_n_frames:
         frame_number = video_n_frames
 
-    capture = cv2.VideoCapture(video_path)
+    # Reuse an open video if possible. Grayscale frames are decoded directly to grayscale by the ffmpeg and pyav backends.
+    capture = fs.borrow_video(video_path, video_backend, grayscale = convert_to_grayscale)
 
-    # Set the frame number to load.
-    capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    # Set the frame number to load, unless the reused video is already at the frame.
+    if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) != frame_number:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
 
     success, original_frame = capture.read()
     frame = None
     if success:
-        if convert_to_grayscale:
-            frame = cv2.cvtColor(original_frame, cv2.COLOR_BGR2GRAY).astype(np.uint8).copy()
-        else:
-            frame = original_frame.astype(np.uint8).copy()
+        frame = original_frame.astype(np.uint8).copy()
+
+    fs.return_video(capture)
 
     return success, frame
 
@@ -426,27 +740,26 @@ def apply_median_blur_to_frames(frame_array):
     frame_array = [[success, cv2.medianBlur(frame, 3)] if success else [success, frame] for success, frame in frame_array]
     return frame_array
 
-def load_frames_into_memory(video_path, starting_frame = 0, frame_batch_size = 50, convert_to_grayscale = True):
+def load_frames_into_memory(video_path, starting_frame = 0, frame_batch_size = 50, convert_to_grayscale = True, video_backend = 'opencv'):
 
-    # Open the video path.
-    capture = cv2.VideoCapture(video_path)
+    # Open the video path or reuse an open video.
+    capture = fs.borrow_video(video_path, video_backend, grayscale = convert_to_grayscale)
 
     # Get the total number of frames in the video.
     video_n_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    # Set the frame position to start.
-    capture.set(cv2.CAP_PROP_POS_FRAMES, starting_frame)
+    # Set the frame position to start, unless the reused video is already at the frame.
+    if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) != starting_frame:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, starting_frame)
 
     frame_array = []
     # Load frames into memory.
     for i in range(frame_batch_size):
         success, original_frame = capture.read()
         frame = original_frame.astype(np.uint8).copy()
-        if success and convert_to_grayscale:
-            frame = cv2.cvtColor(original_frame, cv2.COLOR_BGR2GRAY).astype(np.uint8)
         frame_array.append([success, frame])
 
-    capture.release()
+    fs.return_video(capture)
 
     return frame_array
 
@@ -847,181 +1160,1177 @@ def track_tail_in_frame(frame, background, success, n_tail_points, dist_tail_poi
         print('Error! Could not track tail in frame.')
         return None
 
-def track_tail_in_video_with_multiprocessing(video_path, colours, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, init_frame_batch_size = 50, init_starting_frame = 0, save_path = None, background_path = None, save_background = False, line_length = 0, video_fps = None, n_frames = 'All', pixel_threshold = 100, frame_change_threshold = 10):
+def calculate_next_coords_in_frames(init_coords, radius, frames, method = 'brightest', angle = 0, n_angles = 20, range_angles = 120, tail_calculation = True):
+    '''
+    Function that calculates the next set of coordinates in every frame of a stack of frames provided an initial set of coordinates for each frame, radius, and stack of frames.
 
-    t0 = time.time()
+    Steps:
+        Calculates an array of angles for each frame provided by the number of angles (n_angles) and range of angles (range_angles).
+        Calculates an array of all potential coordinates in each frame that lie on the circumference of a circle or arc given by the angles, the radius, and the initial coordinates.
+        Gathers the values of the pixels at all of the potential coordinates that lie inside the frames.
+        Computes the brightest coordinates out of the potential coordinates in each frame.
+        When the tail is being calculated, use the coordinate that is most stimilar to the previous angle.
+        When the tail is not being calculated, use the first set of coordinates that have the minimum distance between the next coordinates and the initial coordinates.
 
-    # Create or load background image.
-    if background_path is None:
-        background = calculate_background(video_path, save_path = save_path, save_background = save_background).astype(np.uint8)
-    else:
-        background = cv2.imread(background_path, cv2.IMREAD_GRAYSCALE).astype(np.uint8)
+    Required Arguments:
+        init_coords (n frames, 2) - Coordinates to use for initializing search of next coordinates in each frame.
+            ** Frames whose initial coordinates are NaN are skipped.
+        radius (float) - Radius to use for calculating the distance between the initial coordinates and potential next coordinates.
+        frames (n frames, frame height, frame width) - Stack of video frames to search for coordinates.
+            ** Expects background subtracted frames where objects are brighter than the background.
 
-    video_n_frames = get_total_frame_number_from_video(video_path)
-    starting_frame = init_starting_frame
-    frame_batch_size = init_frame_batch_size
+    Optional Arguments:
+        angle (float or n frames) - Initial angle that will be used when drawing a line between the inital coordinates and the next coordinates. Can be given separately for each frame. Default = 0.
+            ** Units in radians.
+        tail_calculation (bool) - Determines which method to use if multiple coordinates are returned. Default = True.
+        n_angles (int) - Number of angles used when searching for initial points. Default = 20.
+        range_angles (float) - The entire range of angles with which to look for the next pixel. Default = 2 / 3 * pi.
+            ** Units in radians.
 
-    # Get the total number of frames.
-    if n_frames == 'All' or not isinstance(n_frames, int):
-        n_frames = video_n_frames
+    Returns:
+        next_coords (n frames, 2) - The next coordinates in each frame.
+            ** Frames where no coordinates could be found are set to NaN.
+    '''
+    if not isinstance(method, str) or method not in ['brightest', 'darkest']:
+        print('Error: method must be formatted as a string and must be one of the following: brightest or darkest.')
+        return
+    init_coords = np.asarray(init_coords, dtype = float)
+    n_frames = len(frames)
+    if np.ndim(angle) == 0 and angle == 0:
+        # Get the cached offsets of all points along the arc, which are the same for every frame.
+        offsets = calculate_unrotated_arc_offsets(radius, n_angles, range_angles)[:, np.newaxis, :]
+    elif np.ndim(angle) == 0:
+        # Get the offsets of all points along the arc, which are the same for every frame.
+        offsets = calculate_arc_offsets(radius, angle, n_angles, range_angles)[:, np.newaxis, :]
+    else:
+        # Calculate the angles of the arc in each frame.
+        angles = np.linspace(angle - range_angles / 2, angle + range_angles / 2, n_angles, axis = 1)
+        # Calculate the offsets of all points along the arc in each frame.
+        offsets = np.array([radius * np.sin(angles), radius * np.cos(angles)])
+    # Calculate array of all potential next coordinates.
+    with np.errstate(invalid = 'ignore'):
+        potential_coords = np.round(init_coords.T[:, :, np.newaxis] + offsets)
+    # Find the potential coordinates that lie inside of the frame.
+    valid = (potential_coords[0] >= 0) & (potential_coords[0] < frames.shape[1]) & (potential_coords[1] >= 0) & (potential_coords[1] < frames.shape[2])
+    potential_coords = np.where(valid, potential_coords, 0).astype(int)
+    # Gather the values of the pixels at the potential next coordinates.
+    values = frames[np.arange(n_frames)[:, np.newaxis], potential_coords[0], potential_coords[1]].astype(int)
+    if method == 'brightest':
+        # Potential coordinates outside of the frame can never be the brightest pixels.
+        values[~valid] = -1
+        best_values = np.max(values, axis = 1)
+    elif method == 'darkest':
+        # Potential coordinates outside of the frame can never be the darkest pixels.
+        values[~valid] = 256
+        best_values = np.min(values, axis = 1)
+    # Get only the coordinates that match the brightest (or darkest) pixel value in each frame.
+    matches = valid & (values == best_values[:, np.newaxis])
+    if tail_calculation:
+        # Calculate the difference between the angle of the next coordinates and the initial coordinates and the previous angle that was given.
+        differences = np.abs(np.reshape(angle, (-1, 1)) - np.arctan2(potential_coords[0] - init_coords[:, [0]], potential_coords[1] - init_coords[:, [1]]))
+    else:
+        # Calculate the length between the next coordinates and the initial coordinates.
+        differences = np.hypot(potential_coords[0] - init_coords[:, [0]], potential_coords[1] - init_coords[:, [1]])
+    differences[~matches] = np.inf
+    matches &= differences == np.min(differences, axis = 1)[:, np.newaxis]
+    # When multiple coordinates remain, take the first set of coordinates in the same order as the pixels in the frame.
+    pixel_index = np.where(matches, potential_coords[0] * frames.shape[2] + potential_coords[1], frames.shape[1] * frames.shape[2])
+    index = np.argmin(pixel_index, axis = 1)
+    next_coords = potential_coords[:, np.arange(n_frames), index].T.astype(float)
+    # Frames without any potential coordinates inside of the frame are set to NaN.
+    next_coords[~np.any(matches, axis = 1)] = np.nan
+    return next_coords
+
+def calculate_eye_coords_and_angles_in_frame(frame, first_eye_coords, second_eye_coords, eyes_threshold, invert_threshold, tracking_mask = None):
+    '''
+    Function that refines the eye coordinates and calculates the eye angles using the binary regions of a thresholded frame.
 
-    if n_frames > video_n_frames:
-        print('Warning! The number of frames requested to track exceeds the total number of frames in the video. Setting the number of frames to track to the total number of frames in the video.')
-        n_frames = video_n_frames
+    Required Arguments:
+        frame (frame height, frame width) - Video frame that the eyes were found in.
+        first_eye_coords (y, x) - Coordinates of the first eye.
+        second_eye_coords (y, x) - Coordinates of the second eye.
+        eyes_threshold (int) - Threshold applied to the frame to find the eyes.
+        invert_threshold (bool) - Whether to invert the threshold.
 
-    if starting_frame >= video_n_frames:
-        print('Warning! Starting frame number provided exceeds the total number of frames in the video. Setting the starting frame number to 0.')
-        starting_frame = 0
-        n_frames = video_n_frames
+    Optional Arguments:
+        tracking_mask (dict) - Tracking mask returned by get_tracking_mask when the frame is the region of a mask. Default = None.
+            ** The contours are found in coordinates of the entire frame.
 
-    if starting_frame + n_frames > video_n_frames:
-        print('Warning! The number of frames requested to track plus the number of initial frames to offset exceeds the total number of frames in the video. Keeping the initial frames to offset and tracking the remaining frames.')
-        n_frames = video_n_frames - starting_frame
+    Returns:
+        first_eye_coords (y, x) - Centroid of the binary region containing the first eye.
+        second_eye_coords (y, x) - Centroid of the binary region containing the second eye.
+        first_eye_angle (float) - Angle of the first eye. NaN if no binary region contains the first eye.
+        second_eye_angle (float) - Angle of the second eye. NaN if no binary region contains the second eye.
+    '''
+    first_eye_angle = np.nan
+    second_eye_angle = np.nan
+    # Apply a threshold to the frame.
+    thresh = apply_threshold_to_frame(frame, eyes_threshold, invert = invert_threshold)
+    if tracking_mask is None:
+        # Find the contours of the binary regions in the thresholded frame.
+        contours = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)[1]
+    else:
+        # Find the contours of the binary regions in the thresholded region of the frame and move them to the region's position in the entire frame.
+        contours = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE, offset = (tracking_mask['x_offset'], tracking_mask['y_offset']))[1]
+    # Iterate through each contour in the list of contours.
+    for i in range(len(contours)):
+        # Check if the first eye coordinate are within the current contour.
+        if cv2.pointPolygonTest(contours[i], (first_eye_coords[1], first_eye_coords[0]), False) == 1:
+            # Set the first eye coordinates to the centroid of the binary region and calculate the first eye angle.
+            M = cv2.moments(contours[i])
+            first_eye_coords = [int(round(M['m01']/M['m00'])), int(round(M['m10']/M['m00']))]
+            first_eye_angle = cv2.fitEllipse(contours[i])[2] * np.pi / 180
+        # Check if the second eye coordinate are within the current contour.
+        if cv2.pointPolygonTest(contours[i], (second_eye_coords[1], second_eye_coords[0]), False) == 1:
+            # Set the second eye coordinates to the centroid of the binary region and calculate the second eye angle.
+            M = cv2.moments(contours[i])
+            second_eye_coords = [int(round(M['m01']/M['m00'])), int(round(M['m10']/M['m00']))]
+            second_eye_angle = cv2.fitEllipse(contours[i])[2] * np.pi / 180
+    return first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle
+
+def correct_eye_angles(first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle, heading_coords, heading_angle, swim_bladder_coords, dist_eyes):
+    '''
+    Function that flips the eye angles that face towards the body instead of away from it.
 
-    batch_iterations = int((video_n_frames - starting_frame) / frame_batch_size)
-    if (video_n_frames - starting_frame) % frame_batch_size != 0:
-        batch_iterations += 1
-
-    # Initialize variables for data.
-    eye_coord_array = np.array([])
-    heading_coord_array = np.array([])
-    body_coord_array = np.array([])
-    heading_angle_array = np.array([])
-    tail_coord_array = np.array([])
-
-    for i in range(batch_iterations):
-        print('Tracking video. Processing frame numbers: {0} - {1} / {2}.'.format(starting_frame, starting_frame + frame_batch_size, video_n_frames), end = '\r')
-        frame_array = load_frames_into_memory(video_path, starting_frame = starting_frame, frame_batch_size = frame_batch_size)
-        frame_array = subtract_background_from_frames(frame_array, background)
-        frame_array = apply_median_blur_to_frames(frame_array)
-        tracking_params = [[frame, success, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, pixel_threshold] for success, frame in frame_array]
-        pool = mp.Pool(mp.cpu_count())
-        tracking_results = np.array(pool.map(track_tail_in_frame, tracking_params))
-        pool.close()
-        pool.join()
+    Required Arguments:
+        first_eye_coords (y, x) - Coordinates of the first eye.
+        second_eye_coords (y, x) - Coordinates of the second eye.
+        first_eye_angle (float) - Angle of the first eye.
+        second_eye_angle (float) - Angle of the second eye.
+        heading_coords (y, x) - Midpoint between the eyes.
+        heading_angle (float) - Heading angle.
+        swim_bladder_coords (y, x) - Coordinates of the swim bladder.
+        dist_eyes (float) - Distance between the eyes.
 
-        eye_coord_array = np.append(eye_coord_array, np.array([tracking_results[:,0], tracking_results[:,1]]))
-        heading_coord_array = np.append(heading_coord_array, tracking_results[:,2])
-        body_coord_array = np.append(body_coord_array, tracking_results[:,3])
-        heading_angle_array = np.append(heading_angle_array, tracking_results[:,4])
-        tail_coord_array = np.append(tail_coord_array, tracking_results[:,5])
-
-        if starting_frame + frame_batch_size != video_n_frames:
-            starting_frame += frame_batch_size
-            if starting_frame + frame_batch_size > video_n_frames:
-                frame_batch_size = video_n_frames - starting_frame
-
-    print('Tracking video. Processing frame numbers: {0} - {1} / {2}.'.format(starting_frame, starting_frame + frame_batch_size, video_n_frames))
-
-    eye_coord_array = eye_coord_array.reshape((2, video_n_frames))
-    starting_frame = init_starting_frame
-    frame_batch_size = init_frame_batch_size
-
-    results =   {   'eye_coord_array' : eye_coord_array,
-                    'heading_coord_array' : heading_coord_array,
-                    'tail_coord_array' : tail_coord_array,
-                    'body_coord_array' : body_coord_array,
-                    'heading_angle_array' : heading_angle_array,
-                    'video_path' : video_path,
-                    'video_n_frames' : video_n_frames,
-                    'video_fps' : video_fps,
-                    'dist_tail_points' : dist_tail_points,
-                    'dist_eyes' : dist_eyes,
-                    'dist_swim_bladder' : dist_swim_bladder,
-                    'pixel_threshold' : pixel_threshold,
-                    'frame_change_threshold' : frame_change_threshold
-                }
+    Returns:
+        first_eye_angle (float) - Corrected angle of the first eye.
+        second_eye_angle (float) - Corrected angle of the second eye.
+    '''
+    # Create an array that acts as a contour for the body and contains the swim bladder coordinates and eye coordinates.
+    body_contour = np.array([np.array([swim_bladder_coords[1], swim_bladder_coords[0]]), np.array([first_eye_coords[1], first_eye_coords[0]]), np.array([int(round(heading_coords[1] + (dist_eyes / 2 * np.cos(heading_angle)))), int(round(heading_coords[0] + (dist_eyes / 2 * np.sin(heading_angle))))]), np.array([second_eye_coords[1], second_eye_coords[0]])])
+    # Check to see if the point that is created by drawing a line from the first eye coordinates with a length equal to half of the distance between the eyes is within the body contour. Occasionally, the angle of the eye is flipped to face towards the body instead of away. This is to check whether or not the eye angle should be flipped.
+    if cv2.pointPolygonTest(body_contour, (first_eye_coords[1] + (dist_eyes / 2 * np.cos(first_eye_angle)), first_eye_coords[0] + (dist_eyes / 2 * np.sin(first_eye_angle))), False) == 1:
+        # Flip the first eye angle.
+        if first_eye_angle > 0:
+            first_eye_angle -= np.pi
+        else:
+            first_eye_angle += np.pi
+    # Check to see if the point that is created by drawing a line from the second eye coordinates with a length equal to half of the distance between the eyes is within the body contour.
+    if cv2.pointPolygonTest(body_contour, (second_eye_coords[1] + (dist_eyes / 2 * np.cos(second_eye_angle)), second_eye_coords[0] + (dist_eyes / 2 * np.sin(second_eye_angle))), False) == 1:
+        # Flip the second eye angle.
+        if second_eye_angle > 0:
+            second_eye_angle -= np.pi
+        else:
+            second_eye_angle += np.pi
+    return first_eye_angle, second_eye_angle
 
-    print('Total processing time: {0} seconds.'.format(time.time() - t0))
+def get_tracking_results_dtype(n_tail_points):
+    '''
+    Function that returns the structured data type used to store the tracking results of a stack of frames.
 
-    return results
+    Required Arguments:
+        n_tail_points (int) - Number of tail points.
 
-def track_tail_in_video_without_multiprocessing(video_path, colours, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, init_frame_batch_size = 50, init_starting_frame = 0, save_path = None, background_path = None, save_background = False, line_length = 0, video_fps = None, n_frames = None, pixel_threshold = 100, frame_change_threshold = 10):
+    Returns:
+        dtype (np.dtype) - Structured data type with one field for each of the tracking results returned by track_tail_in_frame, and a field that indicates whether the frame was tracked.
+    '''
+    return np.dtype([('tracked', bool), ('first_eye_coords', float, 2), ('second_eye_coords', float, 2), ('first_eye_angle', float), ('second_eye_angle', float), ('heading_coords', float, 2), ('body_coords', float, 2), ('heading_angle', float), ('tail_point_coords', float, (n_tail_points + 1, 2))])
 
-    t0 = time.time()
+def track_tail_in_frames(frames, background, successes, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, pixel_threshold, extended_eyes_calculation, eyes_threshold, median_blur, tracking_method, initial_pixel_search, invert_threshold, range_angles, preprocessed = False):
+    '''
+    Function that tracks the eyes, swim bladder, and tail in every frame of a stack of frames at once.
 
-    # Create or load background image.
-    if background_path is None:
-        background = calculate_background(video_path, save_path = save_path, save_background = save_background)
-    else:
-        background = cv2.imread(background_path, cv2.IMREAD_GRAYSCALE).astype(np.uint8)
+    Steps:
+        Finds the frames that were loaded successfully and contain pixels that pass the pixel threshold.
+        Finds the first eye in each frame using the brightest (or darkest) pixel in the frame.
+        Searches the arcs around the previous coordinates of every frame at once to find the second eye, swim bladder, and each tail point.
+        Calculates the heading coordinates, body coordinates, and heading angle of every frame at once.
+        When the extended eyes calculation is used, the eye regions are calculated and the eye angles are corrected separately for each frame.
 
-    video_n_frames = get_total_frame_number_from_video(video_path)
-    starting_frame = init_starting_frame
-    frame_batch_size = init_frame_batch_size
+    Required Arguments:
+        frames (n frames, frame height, frame width) - Stack of grayscale video frames.
+        background (frame height, frame width) - Background of the video.
+        successes (n frames) - Whether each frame was loaded successfully.
+        All other arguments are the same as the arguments of track_tail_in_frame.
+            ** The head_fixed tracking method is the same as head_fixed_2.
 
-    # Get the total number of frames.
-    if n_frames is None:
-        n_frames = video_n_frames
+    Optional Arguments:
+        preprocessed (bool) - Whether the frames were preprocessed by preprocess_frame without a mask, such as the frames returned by get_prefetching_frame_reader. Default = False.
+            ** When preprocessed is True, the free swimming tracking method applies the pixel threshold to the background subtracted frames, the same as track_frame, instead of the grayscale frames.
 
-    if n_frames > video_n_frames:
-        print('Warning! The number of frames requested to track exceeds the total number of frames in the video. Setting the number of frames to track to the total number of frames in the video.')
-        n_frames = video_n_frames
+    Returns:
+        tracking_results (n frames) - Structured array of tracking results given by get_tracking_results_dtype.
+            ** The results are the same as calling track_tail_in_frame on each frame, or track_frame when preprocessed is True. Frames that could not be tracked have the tracked field set to False and all other fields set to NaN.
+    '''
+    frames = np.asarray(frames, dtype = np.uint8)
+    # Initialize the results of every frame.
+    tracking_results = np.zeros(len(frames), dtype = get_tracking_results_dtype(n_tail_points))
+    for field in tracking_results.dtype.names[1:]:
+        tracking_results[field] = np.nan
+    range_angles = np.radians(range_angles)
+    if tracking_method not in ['free_swimming', 'head_fixed', 'head_fixed_1', 'head_fixed_2']:
+        print('Error: tracking_method must be one of the following: free_swimming, head_fixed, head_fixed_1, or head_fixed_2.')
+        return tracking_results
+    successes = np.asarray(successes, dtype = bool)
+    if tracking_method == 'free_swimming':
+        # Find the frames that contain pixels brighter than the pixel threshold. When the frames are preprocessed, these are the background subtracted frames.
+        tracked = successes & (np.max(frames.reshape(len(frames), -1), axis = 1) > pixel_threshold)
+    else:
+        # Find the frames that contain pixels darker than the pixel threshold.
+        tracked = successes & (np.min(frames.reshape(len(frames), -1), axis = 1) < pixel_threshold)
+    frames = frames[tracked]
+    n_frames = len(frames)
+    if n_frames == 0:
+        return tracking_results
+    if tracking_method == 'free_swimming' and preprocessed:
+        # The frames are already background subtracted.
+        processed_frames = frames
+    else:
+        # Apply the background subtraction and the median blur filter to each frame.
+        processed_frames = np.array([cv2.medianBlur(cv2.absdiff(frame, background), median_blur) for frame in frames])
+    if tracking_method == 'free_swimming':
+        # Free swimming tracking uses the background subtracted frames for every step.
+        frames = processed_frames
+        method = 'brightest'
+    else:
+        method = initial_pixel_search
+    flat_frames = frames.reshape(n_frames, -1)
+    if method == 'brightest':
+        # Return the coordinates of the brightest pixel in each frame.
+        first_eye_coords = np.array(np.unravel_index(np.argmax(flat_frames, axis = 1), frames.shape[1:])).T.astype(float)
+    else:
+        # Return the coordinates of the darkest pixel in each frame.
+        first_eye_coords = np.array(np.unravel_index(np.argmin(flat_frames, axis = 1), frames.shape[1:])).T.astype(float)
+    # Calculate the next brightest pixel that lies on the circle drawn around the first eye coordinates and has a radius equal to the distance between the eyes.
+    second_eye_coords = calculate_next_coords_in_frames(first_eye_coords, dist_eyes, frames, method = method, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
+    first_eye_angles = np.full(n_frames, np.nan)
+    second_eye_angles = np.full(n_frames, np.nan)
+    if extended_eyes_calculation:
+        # Calculate the eye coordinates and angles using the binary regions of each frame.
+        for i in np.where(~np.isnan(second_eye_coords[:, 0]))[0]:
+            try:
+                first_eye_coords[i], second_eye_coords[i], first_eye_angles[i], second_eye_angles[i] = calculate_eye_coords_and_angles_in_frame(frames[i], first_eye_coords[i].astype(int), second_eye_coords[i].astype(int), eyes_threshold, invert_threshold)
+            except:
+                # The frame is not tracked if the eyes could not be calculated.
+                second_eye_coords[i] = np.nan
+    # Find the midpoint of the line that connects both eyes.
+    heading_coords = (first_eye_coords + second_eye_coords) / 2
+    if tracking_method == 'head_fixed_1':
+        # Find the swim bladder coordinates by finding the next brightest coordinates that lie on a circle around the heading coordinates with a radius equal to the distance between the eyes and the swim bladder.
+        swim_bladder_coords = calculate_next_coords_in_frames(heading_coords, dist_swim_bladder, frames, method = initial_pixel_search, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
+    else:
+        # Find the swim bladder coordinates using the background subtracted frames.
+        swim_bladder_coords = calculate_next_coords_in_frames(heading_coords, dist_swim_bladder, processed_frames, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
+    # Find the body coordinates by finding the center of the triangle that connects the eyes and swim bladder.
+    body_coords = np.round((swim_bladder_coords + first_eye_coords + second_eye_coords) / 3)
+    # Calculate the heading angle as the angle between the body coordinates and the heading coordinates.
+    heading_angles = np.arctan2(heading_coords[:, 0] - body_coords[:, 0], heading_coords[:, 1] - body_coords[:, 1])
+    if extended_eyes_calculation:
+        for i in np.where(~np.isnan(heading_angles))[0]:
+            # Flip the eye angles that face towards the body.
+            try:
+                first_eye_angles[i], second_eye_angles[i] = correct_eye_angles(first_eye_coords[i].astype(int), second_eye_coords[i].astype(int), first_eye_angles[i], second_eye_angles[i], heading_coords[i], heading_angles[i], swim_bladder_coords[i].astype(int), dist_eyes)
+            except:
+                # The frame is not tracked if the eye angles could not be corrected.
+                heading_angles[i] = np.nan
+        failed_eyes = ~np.isnan(heading_angles) & (np.isnan(first_eye_angles) | np.isnan(second_eye_angles))
+        if tracking_method == 'free_swimming':
+            # Fall back to the brightest pixels when an eye angle could not be calculated.
+            first_eye_coords[failed_eyes] = np.array(np.unravel_index(np.argmax(flat_frames[failed_eyes], axis = 1), frames.shape[1:])).T
+            second_eye_coords[failed_eyes] = calculate_next_coords_in_frames(first_eye_coords[failed_eyes], dist_eyes, frames[failed_eyes], n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
+            first_eye_angles[failed_eyes] = np.nan
+            second_eye_angles[failed_eyes] = np.nan
+        else:
+            # The frames where an eye angle could not be calculated are not tracked.
+            heading_angles[failed_eyes] = np.nan
+    # Calculate the initial tail angle as the angle opposite to the heading angle.
+    tail_angles = np.where(heading_angles > 0, heading_angles - np.pi, heading_angles + np.pi)
+    tail_point_coords = np.full((n_frames, n_tail_points + 1, 2), np.nan)
+    tail_point_coords[:, 0] = swim_bladder_coords
+    # Iterate through the number of tail points.
+    for m in range(1, n_tail_points + 1):
+        if m > 1:
+            # Calculate the next tail angle as the angle between the last two tail points.
+            tail_angles = np.arctan2(tail_point_coords[:, m - 1, 0] - tail_point_coords[:, m - 2, 0], tail_point_coords[:, m - 1, 1] - tail_point_coords[:, m - 2, 1])
+        # Calculate the next set of tail coordinates in every frame.
+        tail_point_coords[:, m] = calculate_next_coords_in_frames(tail_point_coords[:, m - 1], dist_tail_points, processed_frames, angle = tail_angles, range_angles = range_angles)
+    # Only keep the frames where every step of the tracking was successful.
+    complete = ~np.isnan(heading_angles) & ~np.any(np.isnan(tail_point_coords), axis = (1, 2))
+    frame_numbers = np.where(tracked)[0][complete]
+    # Store the tracking results of each frame.
+    tracking_results['tracked'][frame_numbers] = True
+    tracking_results['first_eye_coords'][frame_numbers] = first_eye_coords[complete]
+    tracking_results['second_eye_coords'][frame_numbers] = second_eye_coords[complete]
+    tracking_results['first_eye_angle'][frame_numbers] = first_eye_angles[complete]
+    tracking_results['second_eye_angle'][frame_numbers] = second_eye_angles[complete]
+    tracking_results['heading_coords'][frame_numbers] = heading_coords[complete]
+    tracking_results['body_coords'][frame_numbers] = body_coords[complete]
+    tracking_results['heading_angle'][frame_numbers] = heading_angles[complete]
+    tracking_results['tail_point_coords'][frame_numbers] = tail_point_coords[complete]
+    return tracking_results
+
+@lru_cache(maxsize = 16)
+def get_tracking_mask(center_x, center_y, width, height, type, frame_height, frame_width, margin = 1):
+    '''
+    Function that converts a mask into the region of the frame that is used for tracking.
 
-    if starting_frame >= video_n_frames:
-        print('Starting frame number provided exceeds the total number of frames in the video. Setting the starting frame number to 0.')
-        starting_frame = 0
-        n_frames = video_n_frames
+    Steps:
+        Calculates which pixels of the frame lie outside of the mask.
+        Finds the bounding box of the pixels that lie inside of the mask and adds a margin around the bounding box.
+        Keeps the pixels that lie outside of the mask within the bounding box.
 
-    if starting_frame + n_frames > video_n_frames:
-        print('The number of frames requested to track plus the number of initial frames to offset exceeds the total number of frames in the video. Keeping the initial frames to offset and tracking the remaining frames.')
-        n_frames = video_n_frames - starting_frame
+    Required Arguments:
+        center_x, center_y, width, height, type - The values of the mask.
+            ** The type of the mask is either ellipse or rectangle.
+        frame_height (int) - Height of the frame.
+        frame_width (int) - Width of the frame.
 
-    batch_iterations = int((video_n_frames - starting_frame) / frame_batch_size)
-    if (video_n_frames - starting_frame) % frame_batch_size != 0:
-        batch_iterations += 1
-
-    # Initialize variables for data.
-    eye_coord_array = np.array([])
-    heading_coord_array = np.array([])
-    body_coord_array = np.array([])
-    heading_angle_array = np.array([])
-    tail_coord_array = np.array([])
-
-    for i in range(batch_iterations):
-        print('Tracking video. Processing frame numbers: {0} - {1} / {2}.'.format(starting_frame, starting_frame + frame_batch_size, video_n_frames), end = '\r')
-        frame_array = load_frames_into_memory(video_path, starting_frame = starting_frame, frame_batch_size = frame_batch_size)
-        # frame_array = subtract_background_from_frames(frame_array, background)
-        # frame_array = apply_median_blur_to_frames(frame_array)
-        extended_eyes_calculation, eyes_threshold, median_blur, tracking_method, initial_pixel_search, invert_threshold, range_angles
-        tracking_params = [[frame, background, success, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, pixel_threshold, False, 100, 3, 'free_swimming', 'darkest', False, 120] for success, frame in frame_array]
-        tracking_results = np.array([track_tail_in_frame(i) for i in tracking_params])
-
-        eye_coord_array = np.append(eye_coord_array, np.array([tracking_results[:,0], tracking_results[:,1]]))
-        heading_coord_array = np.append(heading_coord_array, tracking_results[:,2])
-        body_coord_array = np.append(body_coord_array, tracking_results[:,3])
-        heading_angle_array = np.append(heading_angle_array, tracking_results[:,4])
-        tail_coord_array = np.append(tail_coord_array, tracking_results[:,5])
-
-        if starting_frame + frame_batch_size != video_n_frames:
-            starting_frame += frame_batch_size
-            if starting_frame + frame_batch_size > video_n_frames:
-                frame_batch_size = video_n_frames - starting_frame
-
-    print('Tracking video. Processing frame numbers: {0} - {1} / {2}.'.format(starting_frame, starting_frame + frame_batch_size, video_n_frames))
-
-    eye_coord_array = eye_coord_array.reshape((2, video_n_frames))
-    starting_frame = init_starting_frame
-    frame_batch_size = init_frame_batch_size
-
-    results =   {   'eye_coord_array' : eye_coord_array,
-                    'heading_coord_array' : heading_coord_array,
-                    'tail_coord_array' : tail_coord_array,
-                    'body_coord_array' : body_coord_array,
-                    'heading_angle_array' : heading_angle_array,
-                    'video_path' : video_path,
-                    'video_n_frames' : video_n_frames,
-                    'video_fps' : video_fps,
-                    'dist_tail_points' : dist_tail_points,
-                    'dist_eyes' : dist_eyes,
-                    'dist_swim_bladder' : dist_swim_bladder,
-                    'pixel_threshold' : pixel_threshold,
-                    'frame_change_threshold' : frame_change_threshold
-                }
+    Optional Arguments:
+        margin (int) - Number of pixels added around the bounding box. Default = 1.
+            ** The margin must be at least half of the size of the median blur filter so that the pixels inside of the mask are filtered the same way as in the entire frame.
+
+    Returns:
+        tracking_mask (dict) - Dictionary containing the following keys:
+            ** y_offset, x_offset - Coordinates of the top left corner of the region in the frame.
+            ** region - Slices used to crop the frame to the region.
+            ** outside - Boolean array that is True for the pixels of the region that lie outside of the mask.
+            ** frame_shape - Height and width of the entire frame.
+            ** The results are cached since the same mask is used for every frame of a video. The returned array is read-only.
+    '''
+    Y, X = np.ogrid[:frame_height, :frame_width]
+    if type == 'rectangle':
+        x_dist_from_center = ((X - center_x) / width) ** 2 + (Y * 0)
+        y_dist_from_center = ((Y - center_y) / height) ** 2 + (X * 0)
+        outside = (x_dist_from_center > 1) | (y_dist_from_center > 1)
+    elif type == 'ellipse':
+        dist_from_center = ((X - center_x) / width) ** 2 + ((Y - center_y) / height) ** 2
+        outside = dist_from_center > 1
+    else:
+        outside = np.zeros((frame_height, frame_width), dtype = bool)
+    inside_rows = np.where(~outside.all(axis = 1))[0]
+    inside_columns = np.where(~outside.all(axis = 0))[0]
+    if len(inside_rows) == 0:
+        # Use the entire frame if no pixels lie inside of the mask.
+        y_start, y_end, x_start, x_end = 0, frame_height, 0, frame_width
+    else:
+        # Add the margin around the bounding box of the pixels that lie inside of the mask.
+        y_start = max(int(inside_rows[0]) - margin, 0)
+        y_end = min(int(inside_rows[-1]) + margin + 1, frame_height)
+        x_start = max(int(inside_columns[0]) - margin, 0)
+        x_end = min(int(inside_columns[-1]) + margin + 1, frame_width)
+    outside = outside[y_start : y_end, x_start : x_end].copy()
+    # Protect the cached mask from being modified.
+    outside.flags.writeable = False
+    return {'y_offset' : y_start, 'x_offset' : x_start, 'region' : (slice(y_start, y_end), slice(x_start, x_end)), 'outside' : outside, 'frame_shape' : (frame_height, frame_width)}
+
+def get_tracking_mask_from_frame_shape(mask, frame_shape, median_blur = 3):
+    '''
+    Function that returns the cached tracking mask of a mask for frames of a given shape. Returns None if mask is None.
+    '''
+    if not mask:
+        return None
+    center_x, center_y, width, height, type = mask
+    return get_tracking_mask(center_x, center_y, width, height, type, frame_shape[0], frame_shape[1], margin = max(median_blur // 2, 1))
+
+def calculate_tracking_window_border(dist_tail_points, dist_eyes, dist_swim_bladder, median_blur = 3):
+    '''
+    Function that returns the number of pixels along the edges of a tracking window in which the coordinates may differ from the coordinates found in the entire frame. Calculated as the largest distance used to search for the next coordinates plus half of the size of the median blur filter.
+    '''
+    return int(np.ceil(max(dist_eyes, dist_swim_bladder, dist_tail_points))) + median_blur // 2 + 1
+
+def calculate_tracking_window_bounds(center_coords, frame_shape, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, median_blur = 3):
+    '''
+    Function that calculates the bounds of a tracking window that is centred on the fish.
+
+    Steps:
+        Calculates the size of the window so that the eyes, swim bladder, and tail fit inside of the window, away from the border, when the window is centred on the body coordinates.
+        Crops the window to the entire frame.
+
+    Required Arguments:
+        center_coords (y, x) - Coordinates of the center of the window, usually the body coordinates of the fish.
+        frame_shape (frame height, frame width) - Shape of the entire frame.
+        n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder - Same as in track_video.
+
+    Optional Arguments:
+        median_blur (int) - Same as in track_frame. Default = 3.
+
+    Returns:
+        bounds (list) - List containing the start and end of the rows and columns of the window.
+            ** Returns None if the center coordinates are NaN.
+    '''
+    if np.isnan(center_coords).any():
+        return None
+    frame_height, frame_width = frame_shape[:2]
+    # Calculate half of the size of the window.
+    window_size = int(np.ceil(dist_swim_bladder + n_tail_points * dist_tail_points)) + calculate_tracking_window_border(dist_tail_points, dist_eyes, dist_swim_bladder, median_blur)
+    center_y, center_x = int(round(center_coords[0])), int(round(center_coords[1]))
+    y_start = min(max(center_y - window_size, 0), frame_height)
+    y_end = max(min(center_y + window_size + 1, frame_height), y_start)
+    x_start = min(max(center_x - window_size, 0), frame_width)
+    x_end = max(min(center_x + window_size + 1, frame_width), x_start)
+    return [y_start, y_end, x_start, x_end]
+
+def get_tracking_window(bounds, frame_shape, dist_tail_points, dist_eyes, dist_swim_bladder, median_blur = 3):
+    '''
+    Function that converts the bounds of a tracking window into a window of the frame that is used for tracking in the same way as a tracking mask.
+
+    Required Arguments:
+        bounds (list) - Bounds returned by calculate_tracking_window_bounds.
+        frame_shape (frame height, frame width) - Shape of the entire frame.
+        dist_tail_points, dist_eyes, dist_swim_bladder - Same as in track_video.
+
+    Optional Arguments:
+        median_blur (int) - Same as in track_frame. Default = 3.
+
+    Returns:
+        tracking_window (dict) - Dictionary containing the same keys as the tracking mask returned by get_tracking_mask, and the following key:
+            ** border - Number of pixels along the edges of the window given by calculate_tracking_window_border.
+            ** Every pixel of the window is used for tracking, so outside is None.
+    '''
+    y_start, y_end, x_start, x_end = bounds
+    return {'y_offset' : y_start, 'x_offset' : x_start, 'region' : (slice(y_start, y_end), slice(x_start, x_end)), 'outside' : None, 'frame_shape' : tuple(frame_shape[:2]), 'border' : calculate_tracking_window_border(dist_tail_points, dist_eyes, dist_swim_bladder, median_blur)}
+
+def tracking_results_are_inside_tracking_window(results, tracking_window):
+    '''
+    Function that checks whether the eye coordinates and tail points returned by track_frame lie inside of a tracking window and away from its border. The edges of the window that are edges of the entire frame do not have a border.
+    '''
+    coords = np.array([results[0], results[1]] + list(results[7]), dtype = float)
+    frame_height, frame_width = tracking_window['frame_shape']
+    y_region, x_region = tracking_window['region']
+    border = tracking_window['border']
+    # Calculate the range of coordinates that lie away from the border of the window.
+    y_min = y_region.start + border if y_region.start > 0 else 0
+    y_max = y_region.stop - 1 - border if y_region.stop < frame_height else frame_height - 1
+    x_min = x_region.start + border if x_region.start > 0 else 0
+    x_max = x_region.stop - 1 - border if x_region.stop < frame_width else frame_width - 1
+    # NaN coordinates are not inside of the window.
+    return bool(np.all((coords[:, 0] >= y_min) & (coords[:, 0] <= y_max) & (coords[:, 1] >= x_min) & (coords[:, 1] <= x_max)))
+
+def subtract_background_from_tracking_frame(frame, background, median_blur = 3, tracking_mask = None):
+    '''
+    Function that converts a grayscale frame into the absolute difference between the frame and the background and applies a median blur filter.
+
+    Required Arguments:
+        frame (frame height, frame width) - Grayscale frame.
+        background (frame height, frame width) - Background of the video.
+            ** When a tracking mask is used, the frame and the background are cropped to the region of the tracking mask.
+
+    Optional Arguments:
+        median_blur (int) - Same as in track_frame. Default = 3.
+        tracking_mask (dict) - Tracking mask returned by get_tracking_mask or get_tracking_window. Default = None.
+            ** The pixels outside of the mask are set to 0 before applying the median blur filter.
+
+    Returns:
+        frame (frame height, frame width) - Background subtracted frame.
+    '''
+    # Convert the frame into the absolute difference between the frame and the background.
+    frame = cv2.absdiff(frame, background)
+    if tracking_mask is not None and tracking_mask['outside'] is not None:
+        # Ignore the pixels outside of the mask.
+        frame[tracking_mask['outside']] = 0
+    # Apply a median blur filter to the frame.
+    return cv2.medianBlur(frame, median_blur)
+
+def preprocess_frame(original_frame, background, tracking_method = 'free_swimming', median_blur = 3, mask = None, initial_pixel_search = 'brightest', tracking_mask = None):
+    '''
+    Function that converts a frame loaded from a video into the frame used for tracking.
+
+    Steps:
+        Crops the original frame and the background to the region of the mask.
+        Converts the original frame to grayscale if the frame was not decoded directly to grayscale.
+        For the free swimming tracking method, converts the frame into the absolute difference between the frame and the background, applies a median blur filter, and sets the pixels outside of the mask to 0.
+        For the head fixed tracking methods, sets the pixels outside of the mask to 255 when searching for the darkest pixel or 0 when searching for the brightest pixel.
+
+    Required Arguments:
+        original_frame (frame height, frame width, 3) or (frame height, frame width) - Frame loaded from the video.
+        background (frame height, frame width) - Background of the video.
+
+    Optional Arguments:
+        tracking_method (str) - Same as in track_frame. Default = free_swimming.
+        median_blur (int) - Same as in track_frame. Default = 3.
+        mask (list) - Same as in track_frame. Default = None.
+            ** When a mask is used, the preprocessed frame only contains the region of the frame given by get_tracking_mask.
+        initial_pixel_search (str) - Same as in track_frame. Default = brightest.
+        tracking_mask (dict) - Tracking mask returned by get_tracking_mask or get_tracking_window. Default = None.
+            ** When tracking_mask is None, the tracking mask of the mask is used.
+
+    Returns:
+        frame (frame height, frame width) - Preprocessed frame.
+    '''
+    if tracking_mask is None:
+        tracking_mask = get_tracking_mask_from_frame_shape(mask, original_frame.shape, median_blur)
+    if tracking_mask is not None:
+        # Only process the region of the frame that contains the mask.
+        original_frame = original_frame[tracking_mask['region']]
+        background = background[tracking_mask['region']]
+    if original_frame.ndim == 2:
+        # The frame was decoded directly to grayscale. The head fixed tracking methods modify the frame, so the original frame is copied.
+        frame = original_frame if tracking_method == 'free_swimming' else original_frame.copy()
+    else:
+        # Convert the original frame to grayscale.
+        frame = cv2.cvtColor(original_frame, cv2.COLOR_BGR2GRAY).astype(np.uint8)
+    if tracking_method == 'free_swimming':
+        # Convert the frame into the absolute difference between the frame and the background.
+        frame = cv2.absdiff(frame, background)
+        # Apply a median blur filter to the frame.
+        frame = cv2.medianBlur(frame, median_blur)
+        if tracking_mask is not None and tracking_mask['outside'] is not None:
+            # Ignore the pixels outside of the mask.
+            frame[tracking_mask['outside']] = 0
+    elif tracking_mask is not None and initial_pixel_search == 'darkest':
+        # Ignore the pixels outside of the mask when searching for the darkest pixel.
+        frame[tracking_mask['outside']] = 255
+    elif tracking_mask is not None and initial_pixel_search == 'brightest':
+        # Ignore the pixels outside of the mask when searching for the brightest pixel.
+        frame[tracking_mask['outside']] = 0
+    return frame
+
+def open_video_for_tracking(video_path, video_backend = 'opencv'):
+    '''
+    Function that opens a video to read the frames that are tracked.
+
+    Steps:
+        The opencv backend returns colour frames, which are converted to grayscale by preprocess_frame.
+        The ffmpeg and pyav backends decode the frames directly to grayscale, which skips the conversion into colour frames and back. The frames are converted to colour frames only when they are annotated.
+        Raw frame stacks (.raw or .npy) are memory-mapped and the frames are views of the grayscale frames in the stack, regardless of the backend.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        video_backend (str) - Same as in calculate_background. Default = opencv.
+
+    Returns:
+        capture (frame_sources.FrameSource) - Opened video.
+    '''
+    return fs.open_video(video_path, video_backend, grayscale = fs.decodes_to_grayscale(video_path, video_backend))
+
+def convert_frame_to_colour(frame):
+    '''
+    Function that converts a frame that was decoded directly to grayscale into a colour frame that can be annotated and written to the tracked video.
+    '''
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    return frame
+
+def get_prefetching_frame_reader(video_path, background, starting_frame = 0, n_frames = None, tracking_parameters = None, queue_size = 32, video_backend = 'opencv'):
+    '''
+    Function that creates a reader that decodes and preprocesses the frames of a video in a background thread.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+        background (frame height, frame width) - Background of the video.
+
+    Optional Arguments:
+        starting_frame (int) - Frame number of the first frame to read. Default = 0.
+        n_frames (int) - Number of frames to read. Default = None.
+        tracking_parameters (dict) - Keyword arguments passed to track_frame. Default = None.
+            ** The tracking_method, median_blur, mask, and initial_pixel_search are used to preprocess the frames. When tracking_parameters is None, the frames are not preprocessed.
+            ** When adaptive_crop is True, the frames are not preprocessed since the region of each frame depends on the results of the previous frame.
+        queue_size (int) - Maximum number of frames read ahead of the tracking. Default = 32.
+        video_backend (str) - Same as in open_video_for_tracking. Default = opencv.
+
+    Returns:
+        reader (frame_sources.PrefetchingFrameReader) - Reader that returns the frame number, success, original frame, and preprocessed frame of each frame.
+    '''
+    preprocess_function = None
+    if tracking_parameters is not None and not (tracking_parameters.get('adaptive_crop', False) and tracking_parameters.get('tracking_method', 'free_swimming') == 'free_swimming' and not tracking_parameters.get('mask')):
+        preprocess_function = partial(preprocess_frame, background = background, tracking_method = tracking_parameters.get('tracking_method', 'free_swimming'), median_blur = tracking_parameters.get('median_blur', 3), mask = tracking_parameters.get('mask'), initial_pixel_search = tracking_parameters.get('initial_pixel_search', 'brightest'))
+    return fs.PrefetchingFrameReader(video_path, starting_frame = starting_frame, n_frames = n_frames, preprocess_function = preprocess_function, queue_size = queue_size, backend = video_backend, grayscale = fs.decodes_to_grayscale(video_path, video_backend))
+
+def initialize_tracking_state():
+    '''
+    Function that creates the state that is carried from one frame to the next while tracking a video.
+
+    Returns:
+        tracking_state (dict) - Dictionary containing the following keys:
+            ** prev_frame - The last frame in which new coordinates were calculated. Used for the frame_change_threshold comparison.
+            ** prev_frame_number - The frame number of prev_frame.
+            ** prev_frame_region - The start and end of the rows and columns of the region of the frame contained in prev_frame. None if prev_frame contains the entire frame. Used as the window of the next frame when using the adaptive crop.
+            ** prev_eye_angle - The eye angle calculated in prev_frame. Only used for the extended eyes calculation.
+            ** prev_results - The results of the last frame that was tracked. Used when the frame has not changed.
+            ** first_results - The results of the first frame that was tracked. Used by the head fixed tracking methods when the eye coordinates are not recalculated every frame.
+    '''
+    return {'prev_frame' : None, 'prev_frame_number' : None, 'prev_frame_region' : None, 'prev_eye_angle' : None, 'prev_results' : None, 'first_results' : None}
+
+def update_tracking_state(tracking_state, results):
+    '''
+    Function that keeps the final results of a frame in the tracking state once the frame has been tracked (and annotated).
+    '''
+    # Keep the results of the frame for the next frame.
+    tracking_state['prev_results'] = results
+    # Keep the results of the first frame for the frames that follow.
+    if tracking_state['first_results'] is None:
+        tracking_state['first_results'] = results
+
+def frame_has_changed(frame, prev_frame, frame_change_threshold = 10, n_rows = 64):
+    '''
+    Function that checks whether any pixel of a frame differs from the same pixel of the previous frame by at least the frame change threshold.
+
+    Steps:
+        Iterates through blocks of rows of the frames.
+        Calculates the absolute difference between the blocks of the frame and the previous frame in uint8, using the same buffer for every block.
+        Returns as soon as a block contains a pixel whose absolute difference is greater than or equal to the frame change threshold.
+
+    Required Arguments:
+        frame (frame height, frame width) - Preprocessed frame.
+        prev_frame (frame height, frame width) - Preprocessed frame of the last frame in which new coordinates were calculated.
+
+    Optional Arguments:
+        frame_change_threshold (int) - Same as in track_video. Default = 10.
+        n_rows (int) - Number of rows in each block. Default = 64.
+
+    Returns:
+        changed (bool) - Whether the frame has changed.
+            ** Same as np.sum(np.abs(frame.astype(float) - prev_frame.astype(float)) >= frame_change_threshold) > 0, without converting the frames to float.
+    '''
+    if frame.shape != prev_frame.shape:
+        raise ValueError('Frame shape {0} does not match previous frame shape {1}.'.format(frame.shape, prev_frame.shape))
+    difference = np.empty((min(n_rows, frame.shape[0]),) + frame.shape[1:], dtype = np.uint8)
+    # Iterate through each block of rows.
+    for row in range(0, frame.shape[0], n_rows):
+        block_difference = difference[:min(n_rows, frame.shape[0] - row)]
+        # Calculate the absolute difference between the blocks.
+        cv2.absdiff(frame[row : row + n_rows], prev_frame[row : row + n_rows], block_difference)
+        if block_difference.max() >= frame_change_threshold:
+            return True
+    return False
+
+def find_first_eye_coords(frame, initial_pixel_search = 'brightest', tracking_mask = None):
+    '''
+    Function that returns the coordinates of the brightest (or darkest) pixel in the frame. When the frame is the region of a tracking mask, the coordinates are coordinates of the entire frame.
+    '''
+    if initial_pixel_search == 'darkest':
+        # Return the coordinate of the darkest pixel.
+        first_eye_coords = [np.where(frame == np.min(frame))[0][0], np.where(frame == np.min(frame))[1][0]]
+    else:
+        # Return the coordinate of the brightest pixel.
+        first_eye_coords = [np.where(frame == np.max(frame))[0][0], np.where(frame == np.max(frame))[1][0]]
+    if tracking_mask is not None:
+        # Convert the coordinates into coordinates of the entire frame.
+        first_eye_coords = [first_eye_coords[0] + tracking_mask['y_offset'], first_eye_coords[1] + tracking_mask['x_offset']]
+    return first_eye_coords
+
+def track_frame(original_frame, background, tracking_state, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, frame_number = None, tracking_method = 'free_swimming',
+                extended_eyes_calculation = False, eyes_threshold = None, pixel_threshold = 100, frame_change_threshold = 10, range_angles = 120, median_blur = 3,
+                initial_pixel_search = 'brightest', invert_threshold = False, mask = None, recalculate_eye_coords_every_frame = True, adaptive_crop = False, frame = None, tracking_mask = None):
+    '''
+    Tracks a single frame of a video.
+
+    Steps:
+        When using the adaptive crop, first tracks the frame inside of a window centred on the body coordinates of the last frame in which new coordinates were calculated and searches the entire frame if the fish was not found away from the border of the window.
+        Converts the original frame to grayscale.
+        Checks whether the frame passes the pixel threshold.
+        Checks whether the frame has changed compared to the last frame in which new coordinates were calculated. If it has not changed, the previous results are used.
+        Otherwise, calculates the eye coordinates, swim bladder coordinates, body coordinates, heading angle, and tail points and updates the tracking state.
+
+    Required Arguments:
+        original_frame (frame height, frame width, 3) - Frame loaded from the video.
+        background (frame height, frame width) - Background of the video.
+        tracking_state (dict) - State carried from one frame to the next, created by initialize_tracking_state.
+            ** The tracking state is updated in place. The caller must pass the results of this frame to update_tracking_state once the results are final.
+        n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder - Same as in track_video.
+
+    Optional Arguments:
+        frame_number (int) - Frame number of the frame in the video. Default = None.
+            ** Stored in the tracking state to identify the previous frame.
+        tracking_method (str) - The method used to track the fish. Default = free_swimming.
+            ** free_swimming - The eyes, swim bladder, and tail are found in the background subtracted frame.
+            ** head_fixed_1 - The eyes and swim bladder are found in the grayscale frame using the initial pixel search. The tail is found in the background subtracted frame.
+            ** head_fixed_2 - The eyes are found in the grayscale frame using the initial pixel search. The swim bladder and tail are found in the background subtracted frame.
+            ** head_fixed - Same as head_fixed_2.
+        range_angles (float) - The entire range of angles with which to look for the next tail point. Default = 120.
+            ** Units in degrees.
+        initial_pixel_search (str) - Whether the eyes are found by searching for the brightest or darkest pixel in the head fixed tracking methods. Default = brightest.
+        mask (list) - List containing the center x, center y, width, height, and type (ellipse or rectangle) of the region of the frame that contains the fish. Default = None.
+            ** When mask is None, the entire frame is used.
+            ** Otherwise, only the bounding box of the mask is processed and the coordinates are converted back into coordinates of the entire frame.
+        recalculate_eye_coords_every_frame (bool) - Whether the eye, swim bladder, and body coordinates are recalculated in every frame for the head fixed tracking methods. Default = True.
+            ** When recalculate_eye_coords_every_frame is False, the coordinates of the first frame that was tracked are used for all frames and only the tail points are recalculated.
+        adaptive_crop (bool) - Whether to track the free swimming tracking method inside of a window centred on the body coordinates of the last frame in which new coordinates were calculated. Default = False.
+            ** Only the window given by calculate_tracking_window_bounds is processed and the coordinates are converted back into coordinates of the entire frame.
+            ** The entire frame is searched when the fish has not been tracked yet, when the fish is not found inside of the window, or when the fish lies along the border of the window.
+            ** The results are the same as searching the entire frame unless another object outside of the window is brighter than the fish or the frame only changed outside of the window.
+            ** Not used when a mask is used or when frame is given.
+        frame (frame height, frame width) - The original frame preprocessed by preprocess_frame. Default = None.
+            ** When frame is None, the original frame is preprocessed by track_frame.
+        tracking_mask (dict) - Tracking mask returned by get_tracking_mask or get_tracking_window. Default = None.
+            ** When tracking_mask is None, the tracking mask of the mask is used.
+        All other arguments are the same as in track_video.
+
+    Returns:
+        results (list) - List containing the first eye coordinates, second eye coordinates, first eye angle, second eye angle, heading coordinates, body coordinates, heading angle, and tail points (including the swim bladder).
+        success (bool) - Whether the frame passed the pixel threshold and was tracked without any errors.
+            ** Only frames that were tracked successfully are annotated when saving the tracked video.
+    '''
+    if adaptive_crop and tracking_method == 'free_swimming' and not mask and frame is None and tracking_mask is None:
+        # Keyword arguments used to track the frame inside of the window or the entire frame.
+        tracking_parameters = { 'frame_number' : frame_number, 'tracking_method' : tracking_method, 'extended_eyes_calculation' : extended_eyes_calculation, 'eyes_threshold' : eyes_threshold,
+                                'pixel_threshold' : pixel_threshold, 'frame_change_threshold' : frame_change_threshold, 'range_angles' : range_angles, 'median_blur' : median_blur,
+                                'initial_pixel_search' : initial_pixel_search, 'invert_threshold' : invert_threshold
+                            }
+        prev_frame = tracking_state['prev_frame']
+        tracking_window = None
+        if prev_frame is not None and tracking_state['prev_frame_region'] is not None:
+            # Use the window that is centred on the body coordinates of the last frame in which new coordinates were calculated.
+            tracking_window = get_tracking_window(tracking_state['prev_frame_region'], background.shape, dist_tail_points, dist_eyes, dist_swim_bladder, median_blur)
+            # Track the frame inside of the window using a copy of the tracking state, so that the tracking state is unchanged if the entire frame has to be searched.
+            window_tracking_state = tracking_state.copy()
+            results, success = track_frame(original_frame, background, window_tracking_state, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, tracking_mask = tracking_window, **tracking_parameters)
+            # Check whether the frame has not changed inside of the window, or whether the fish was found inside of the window and away from its border.
+            if success and (window_tracking_state['prev_frame'] is prev_frame or tracking_results_are_inside_tracking_window(results, tracking_window)):
+                tracking_state.update(window_tracking_state)
+            else:
+                tracking_window = None
+        if tracking_window is None:
+            # Search the entire frame.
+            results, success = track_frame(original_frame, background, tracking_state, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, **tracking_parameters)
+        # Check whether new coordinates were calculated in this frame.
+        if success and tracking_state['prev_frame'] is not prev_frame:
+            bounds = calculate_tracking_window_bounds(results[5], background.shape, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder, median_blur)
+            if bounds is not None:
+                # Keep the window of the frame that is centred on the new body coordinates, which is the window used in the next frame, so that the next frame can be compared with it.
+                tracking_state['prev_frame'] = preprocess_frame(original_frame, background, tracking_method, median_blur, tracking_mask = get_tracking_window(bounds, background.shape, dist_tail_points, dist_eyes, dist_swim_bladder, median_blur))
+                tracking_state['prev_frame_region'] = bounds
+        return results, success
+    # Initialize variables for each frame.
+    first_eye_coords = [np.nan, np.nan]
+    second_eye_coords = [np.nan, np.nan]
+    first_eye_angle = np.nan
+    second_eye_angle = np.nan
+    heading_coords = [np.nan, np.nan]
+    body_coords = [np.nan, np.nan]
+    heading_angle = np.nan
+    swim_bladder_coords = [np.nan, np.nan]
+    tail_point_coords = [[np.nan, np.nan] for m in range(n_tail_points)]
+    tail_points = [[np.nan, np.nan] for m in range(n_tail_points + 1)]
+    eye_angle = None
+    success = False
+    range_angles = np.radians(range_angles)
+    head_fixed = tracking_method in ['head_fixed', 'head_fixed_1', 'head_fixed_2']
+    if tracking_mask is None:
+        tracking_mask = get_tracking_mask_from_frame_shape(mask, background.shape, median_blur)
+    if frame is None:
+        # Preprocess the original frame.
+        frame = preprocess_frame(original_frame, background, tracking_method, median_blur, mask, initial_pixel_search, tracking_mask)
+    frame_region = None
+    if tracking_mask is not None:
+        # The preprocessed frame only contains the region of the mask. The coordinates are kept as coordinates of the entire frame.
+        background = background[tracking_mask['region']]
+        y_region, x_region = tracking_mask['region']
+        frame_region = [y_region.start, y_region.stop, x_region.start, x_region.stop]
+    # Value of the pixels outside of the mask in the frame used to find the eyes.
+    eyes_outside_value = 255 if tracking_method != 'free_swimming' and initial_pixel_search == 'darkest' else 0
+    try:
+        # Check to ensure that the maximum pixel value is greater than a certain value (or the minimum pixel value is less than a certain value for head fixed tracking). Useful for determining whether or not the at least one of the eyes is present in the frame.
+        if (tracking_method == 'free_swimming' and np.max(frame) > pixel_threshold) or (head_fixed and np.min(frame) < pixel_threshold):
+            prev_frame = tracking_state['prev_frame']
+            first_results = tracking_state['first_results']
+            # Check to see if it's not the first frame and check if the sum of the absolute difference between the current frame and the previous frame is greater than a certain threshold. This helps reduce frame to frame noise in the position of the pixels.
+            if prev_frame is not None and tracking_state['prev_frame_region'] == frame_region and not frame_has_changed(frame, prev_frame, frame_change_threshold):
+                # If the difference between the current frame and the previous frame is less than a certain threshold, then use the values that were previously calculated.
+                first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle, heading_coords, body_coords, heading_angle, tail_points = tracking_state['prev_results']
+            else:
+                if head_fixed and not recalculate_eye_coords_every_frame and first_results is not None and not np.isnan(first_results[:2]).any():
+                    # Use the coordinates that were calculated in the first frame.
+                    first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle, heading_coords, body_coords, heading_angle = first_results[:7]
+                    swim_bladder_coords = first_results[7][0]
+                    # Convert the frame into the background subtracted frame used to find the tail.
+                    frame = subtract_background_from_tracking_frame(frame, background, median_blur, tracking_mask)
+                else:
+                    if tracking_method == 'free_swimming':
+                        # Return the coordinate of the brightest pixel.
+                        first_eye_coords = find_first_eye_coords(frame, tracking_mask = tracking_mask)
+                        # Calculate the next brightest pixel that lies on the circle drawn around the first eye coordinates and has a radius equal to the distance between the eyes.
+                        second_eye_coords = calculate_next_coords(first_eye_coords, dist_eyes, frame, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False, tracking_mask = tracking_mask)
+                    else:
+                        # Return the coordinate of the brightest or darkest pixel.
+                        first_eye_coords = find_first_eye_coords(frame, initial_pixel_search, tracking_mask)
+                        # Calculate the next brightest or darkest pixel that lies on the circle drawn around the first eye coordinates and has a radius equal to the distance between the eyes.
+                        second_eye_coords = calculate_next_coords(first_eye_coords, dist_eyes, frame, method = initial_pixel_search, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False, tracking_mask = tracking_mask, outside_value = eyes_outside_value)
+                    # Keep the frame used to find the eyes.
+                    eyes_frame = frame
+                    # Check whether to to an additional process to calculate eye angles.
+                    if extended_eyes_calculation:
+                        # Calculate the angle between the two eyes.
+                        eye_angle = np.arctan2(second_eye_coords[0] - first_eye_coords[0], second_eye_coords[1] - first_eye_coords[1])
+                        prev_eye_angle = tracking_state['prev_eye_angle']
+                        # Check if this is the first frame.
+                        if prev_eye_angle is not None:
+                            # Check if the difference between the current eye angle and previous eye angle is somwehere around pi, meaning the first and second eye coordiantes have reversed. Occasionally, the coordinates of the eyes will switch between one and the other. This method is useful for keeping the positions of the left and right eye the same between frames.
+                            if eye_angle - prev_eye_angle > np.pi / 2 or eye_angle - prev_eye_angle < -np.pi / 2:
+                                if eye_angle - prev_eye_angle < np.pi * 3 / 2 and eye_angle - prev_eye_angle > -np.pi * 3 / 2:
+                                    # Switch the first and second eye coordinates.
+                                    coords = first_eye_coords
+                                    first_eye_coords = second_eye_coords
+                                    second_eye_coords = coords
+                                    # Calculate the new eye angle.
+                                    eye_angle = np.arctan2(second_eye_coords[0] - first_eye_coords[0], second_eye_coords[1] - first_eye_coords[1])
+                        # Calculate the eye coordinates and eye angles using the binary regions that contain the eyes.
+                        first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle = calculate_eye_coords_and_angles_in_frame(frame, first_eye_coords, second_eye_coords, eyes_threshold, invert_threshold, tracking_mask)
+                    # Find the midpoint of the line that connects both eyes.
+                    heading_coords = [(first_eye_coords[0] + second_eye_coords[0]) / 2, (first_eye_coords[1] + second_eye_coords[1]) / 2]
+                    if tracking_method == 'head_fixed_1':
+                        # Find the swim bladder coordinates by finding the next brightest or darkest coordinates that lie on a circle around the heading coordinates with a radius equal to the distance between the eyes and the swim bladder.
+                        swim_bladder_coords = calculate_next_coords(heading_coords, dist_swim_bladder, frame, method = initial_pixel_search, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False, tracking_mask = tracking_mask, outside_value = eyes_outside_value)
+                        # Convert the frame into the background subtracted frame used to find the tail.
+                        frame = subtract_background_from_tracking_frame(frame, background, median_blur, tracking_mask)
+                    else:
+                        if head_fixed:
+                            # Convert the frame into the background subtracted frame used to find the swim bladder and the tail.
+                            frame = subtract_background_from_tracking_frame(frame, background, median_blur, tracking_mask)
+                        # Find the swim bladder coordinates by finding the next brightest coordinates that lie on a circle around the heading coordinates with a radius equal to the distance between the eyes and the swim bladder.
+                        swim_bladder_coords = calculate_next_coords(heading_coords, dist_swim_bladder, frame, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False, tracking_mask = tracking_mask)
+                    # Find the body coordinates by finding the center of the triangle that connects the eyes and swim bladder.
+                    body_coords = [int(round((swim_bladder_coords[0] + first_eye_coords[0] + second_eye_coords[0]) / 3)), int(round((swim_bladder_coords[1] + first_eye_coords[1] + second_eye_coords[1]) / 3))]
+                    # Calculate the heading angle as the angle between the body coordinates and the heading coordinates.
+                    heading_angle = np.arctan2(heading_coords[0] - body_coords[0], heading_coords[1] - body_coords[1])
+                    # Check whether to to an additional process to calculate eye angles.
+                    if extended_eyes_calculation:
+                        # Create an array that acts as a contour for the body and contains the swim bladder coordinates, eye coordinates, and the front of the head.
+                        body_contour = np.array([np.array([swim_bladder_coords[1], swim_bladder_coords[0]]), np.array([first_eye_coords[1], first_eye_coords[0]]), np.array([int(round(heading_coords[1] + (dist_eyes / 2 * np.cos(heading_angle)))), int(round(heading_coords[0] + (dist_eyes / 2 * np.sin(heading_angle))))]), np.array([second_eye_coords[1], second_eye_coords[0]])])
+                        # Check to see if the point that is created by drawing a line from the first eye coordinates with a length equal to half of the distance between the eyes is within the body contour. Occasionally, the angle of the eye is flipped to face towards the body instead of away. This is to check whether or not the eye angle should be flipped.
+                        if cv2.pointPolygonTest(body_contour, (first_eye_coords[1] + (dist_eyes / 2 * np.cos(first_eye_angle)), first_eye_coords[0] + (dist_eyes / 2 * np.sin(first_eye_angle))), False) == 1:
+                            # Flip the first eye angle.
+                            if first_eye_angle > 0:
+                                first_eye_angle -= np.pi
+                            else:
+                                first_eye_angle += np.pi
+                        # Check to see if the point that is created by drawing a line from the second eye coordinates with a length equal to half of the distance between the eyes is within the body contour.
+                        if cv2.pointPolygonTest(body_contour, (second_eye_coords[1] + (dist_eyes / 2 * np.cos(second_eye_angle)), second_eye_coords[0] + (dist_eyes / 2 * np.sin(second_eye_angle))), False) == 1:
+                            # Flip the second eye angle.
+                            if second_eye_angle > 0:
+                                second_eye_angle -= np.pi
+                            else:
+                                second_eye_angle += np.pi
+                        # Check whether the eye angles could be calculated.
+                        if np.isnan(first_eye_angle) or np.isnan(second_eye_angle):
+                            # Proceed with the eye coordinates of the normal eye tracking.
+                            first_eye_coords = find_first_eye_coords(eyes_frame, 'brightest' if tracking_method == 'free_swimming' else initial_pixel_search, tracking_mask)
+                            second_eye_coords = calculate_next_coords(first_eye_coords, dist_eyes, eyes_frame, method = 'brightest' if tracking_method == 'free_swimming' else initial_pixel_search, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False, tracking_mask = tracking_mask, outside_value = eyes_outside_value)
+                            first_eye_angle, second_eye_angle = [np.nan, np.nan]
+                # Calculate the initial tail angle as the angle opposite to the heading angle.
+                if heading_angle > 0:
+                    tail_angle = heading_angle - np.pi
+                else:
+                    tail_angle = heading_angle + np.pi
+                # Iterate through the number of tail points.
+                for m in range(n_tail_points):
+                    # Check if this is the first tail point.
+                    if m == 0:
+                        # Calculate the first tail point using the swim bladder as the first set of coordinates.
+                        tail_point_coords[m] = calculate_next_coords(swim_bladder_coords, dist_tail_points, frame, angle = tail_angle, range_angles = range_angles, tracking_mask = tracking_mask)
+                    else:
+                        # Check if this is the second tail point.
+                        if m == 1:
+                            # Calculate the next tail angle as the angle between the first tail point and the swim bladder.
+                            tail_angle = np.arctan2(tail_point_coords[m - 1][0] - swim_bladder_coords[0], tail_point_coords[m - 1][1] - swim_bladder_coords[1])
+                        # Check if the number of tail points calculated is greater than 2.
+                        else:
+                            # Calculate the next tail angle as the angle between the last two tail points.
+                            tail_angle = np.arctan2(tail_point_coords[m - 1][0] - tail_point_coords[m - 2][0], tail_point_coords[m - 1][1] - tail_point_coords[m - 2][1])
+                        # Calculate the next set of tail coordinates.
+                        tail_point_coords[m] = calculate_next_coords(tail_point_coords[m - 1], dist_tail_points, frame, angle = tail_angle, range_angles = range_angles, tracking_mask = tracking_mask)
+                # Add the swim bladder to a list that will contain all of the tail points, including the swim bladder.
+                tail_points = [swim_bladder_coords] + tail_point_coords
+                # Set the previous frame to the current frame.
+                tracking_state['prev_frame'] = frame
+                tracking_state['prev_frame_number'] = frame_number
+                tracking_state['prev_frame_region'] = frame_region
+                # Check whether the eye angle was calculated in this frame.
+                if eye_angle is not None:
+                    # Set the previous eye angle to the current eye angle.
+                    tracking_state['prev_eye_angle'] = eye_angle
+            success = True
+    except:
+        # Handles any errors that occur throughout tracking.
+        return get_failed_tracking_results(n_tail_points), False
+    return [first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle, heading_coords, body_coords, heading_angle, tail_points], success
+
+def get_failed_tracking_results(n_tail_points):
+    '''
+    Function that returns the tracking results used for frames that could not be tracked.
+
+    Required Arguments:
+        n_tail_points (int) - Number of tail points.
+
+    Returns:
+        results (list) - Results in the same format as track_frame where every value is NaN.
+    '''
+    return [[np.nan, np.nan], [np.nan, np.nan], np.nan, np.nan, [np.nan, np.nan], [np.nan, np.nan], np.nan, [[np.nan, np.nan] for m in range(n_tail_points + 1)]]
+
+def can_track_frames_in_batches(tracking_parameters):
+    '''
+    Function that checks whether the frames of a video can be tracked in batches using track_tail_in_frames, which gives the same results as tracking each frame using track_frame.
+
+    Required Arguments:
+        tracking_parameters (dict) - Keyword arguments passed to track_frame.
+
+    Returns:
+        batches (bool) - Whether the results of each frame only depend on the previous frames through the frame change threshold.
+            ** The frame change threshold must be given.
+            ** The mask, the adaptive crop, and the extended eyes calculation, which keeps the order of the eyes from the previous frame, must not be used.
+            ** The head fixed tracking methods must recalculate the eye coordinates every frame.
+    '''
+    tracking_method = tracking_parameters.get('tracking_method', 'free_swimming')
+    if tracking_method not in ['free_swimming', 'head_fixed', 'head_fixed_1', 'head_fixed_2']:
+        return False
+    if tracking_parameters.get('frame_change_threshold', 10) is None:
+        return False
+    if tracking_parameters.get('mask') or tracking_parameters.get('adaptive_crop', False) or tracking_parameters.get('extended_eyes_calculation', False):
+        return False
+    return tracking_method == 'free_swimming' or tracking_parameters.get('recalculate_eye_coords_every_frame', True)
+
+def track_frames_from_reader(reader, background, tracking_state, tracking_parameters, frame_batch_size = 50):
+    '''
+    Function that tracks the frames returned by a prefetching frame reader in order.
+
+    Steps:
+        When can_track_frames_in_batches returns True, collects batches of frames.
+            ** Checks which frames of the batch pass the pixel threshold and have changed compared to the last frame in which new coordinates were calculated, the same as track_frame.
+            ** Tracks every frame of the batch that has changed at once using track_tail_in_frames.
+            ** The frames that have not changed use the results of the previous frame.
+            ** When a frame that has changed could not be tracked, the frames that follow it are checked again, since they were compared to that frame.
+        Otherwise, tracks each frame using track_frame.
+
+    Required Arguments:
+        reader (frame_sources.PrefetchingFrameReader) - Reader returned by get_prefetching_frame_reader using the same tracking parameters.
+        background (frame height, frame width) - Background of the video.
+        tracking_state (dict) - Same as in track_frame.
+            ** The tracking state is updated in the same way as track_frame before each frame is returned.
+            ** The caller must pass the results of each frame to update_tracking_state before the next frame is returned, the same as when using track_frame.
+        tracking_parameters (dict) - Keyword arguments passed to track_frame.
+
+    Optional Arguments:
+        frame_batch_size (int) - Number of frames in each batch. Default = 50.
+
+    Returns:
+        tracked_frames (generator) - Generator that returns the frame number, success, original frame, results, and tracking success of each frame, the same as track_frame.
+            ** The results and tracking success are None for frames that could not be loaded.
+    '''
+    if not can_track_frames_in_batches(tracking_parameters):
+        for frame_number, success, original_frame, frame in reader:
+            results, tracking_success = None, None
+            # Checks if the frame was loaded successfully.
+            if success:
+                # Track the frame.
+                results, tracking_success = track_frame(original_frame, background, tracking_state, frame_number = frame_number, frame = frame, **tracking_parameters)
+            yield frame_number, success, original_frame, results, tracking_success
+        return
+    n_tail_points = tracking_parameters['n_tail_points']
+    tracking_method = tracking_parameters['tracking_method']
+    pixel_threshold = tracking_parameters['pixel_threshold']
+    frame_change_threshold = tracking_parameters['frame_change_threshold']
+    median_blur = tracking_parameters['median_blur']
+    batch_parameters = [tracking_parameters[key] for key in ['n_tail_points', 'dist_tail_points', 'dist_eyes', 'dist_swim_bladder', 'pixel_threshold', 'extended_eyes_calculation', 'eyes_threshold', 'median_blur', 'tracking_method', 'initial_pixel_search', 'invert_threshold', 'range_angles']]
+    frame_batch = []
+    # None marks the end of the frames so that the last batch is tracked.
+    for frame_data in itertools.chain(reader, [None]):
+        if frame_data is not None:
+            frame_batch.append(frame_data)
+            if len(frame_batch) < frame_batch_size:
+                continue
+        while len(frame_batch) > 0:
+            # The last frame in which new coordinates were calculated. Frames of a different region of the frame are always tracked.
+            prev_frame = tracking_state['prev_frame'] if tracking_state['prev_frame_region'] is None else None
+            # Whether each frame has changed. None for the frames that are not tracked.
+            frame_changes = []
+            changed_frames = []
+            changed_prev_frames = []
+            for frame_number, success, original_frame, frame in frame_batch:
+                frame_change = None
+                # Check whether the frame passes the pixel threshold.
+                if success and ((tracking_method == 'free_swimming' and np.max(frame) > pixel_threshold) or (tracking_method != 'free_swimming' and np.min(frame) < pixel_threshold)):
+                    frame_change = prev_frame is None or frame_has_changed(frame, prev_frame, frame_change_threshold)
+                    if frame_change:
+                        changed_frames.append(frame)
+                        # The head fixed tracking methods keep the background subtracted frame used to find the tail, the same as track_frame.
+                        prev_frame = frame if tracking_method == 'free_swimming' else subtract_background_from_tracking_frame(frame, background, median_blur)
+                        changed_prev_frames.append(prev_frame)
+                frame_changes.append(frame_change)
+            if len(changed_frames) > 0:
+                # Track every frame that has changed at once.
+                batch_results = track_tail_in_frames(np.array(changed_frames), background, np.ones(len(changed_frames), dtype = bool), *batch_parameters, preprocessed = True)
+            index = 0
+            n_returned_frames = 0
+            for (frame_number, success, original_frame, frame), frame_change in zip(frame_batch, frame_changes):
+                results, tracking_success = None, None
+                n_returned_frames += 1
+                if frame_change is None and success:
+                    results, tracking_success = get_failed_tracking_results(n_tail_points), False
+                elif frame_change is False:
+                    # Use the results of the previous frame, which were kept by the caller.
+                    results, tracking_success = list(tracking_state['prev_results']), True
+                elif frame_change:
+                    frame_results = batch_results[index]
+                    prev_frame = changed_prev_frames[index]
+                    index += 1
+                    tracking_success = bool(frame_results['tracked'])
+                    if tracking_success:
+                        # Convert the results into the same format as the results returned by track_frame.
+                        results = [frame_results['first_eye_coords'].astype(int).tolist(), frame_results['second_eye_coords'].astype(int).tolist(), frame_results['first_eye_angle'], frame_results['second_eye_angle'], frame_results['heading_coords'].tolist(), frame_results['body_coords'].astype(int).tolist(), frame_results['heading_angle'], frame_results['tail_point_coords'].astype(int).tolist()]
+                        # Set the previous frame to the current frame.
+                        tracking_state['prev_frame'] = prev_frame
+                        tracking_state['prev_frame_number'] = frame_number
+                        tracking_state['prev_frame_region'] = None
+                    else:
+                        results = get_failed_tracking_results(n_tail_points)
+                yield frame_number, success, original_frame, results, tracking_success
+                if frame_change and not tracking_success:
+                    # The frames that follow were compared to a frame that could not be tracked, so they are checked again.
+                    break
+            frame_batch = frame_batch[n_returned_frames:]
+
+def annotate_tracking_results_onto_original_frame(original_frame, results, colours, line_length, eyes_line_length, extended_eyes_calculation):
+    '''
+    Function that draws the tracking results of track_frame onto the original frame that is written to the tracked video.
+
+    Required Arguments:
+        original_frame (frame height, frame width, 3) - Frame loaded from the video.
+            ** The frame is annotated in place. Frames that were decoded directly to grayscale must first be converted using convert_frame_to_colour.
+        results (list) - Results returned by track_frame.
+        colours (list([B, G, R])) - List of colours used for annotating the tracking results.
+        line_length (int) - The length of the line used for drawing the heading angle.
+        eyes_line_length (int) - The length of the lines used for drawing the eye angles.
+        extended_eyes_calculation (bool) - Whether the eye angles were calculated.
+
+    Returns:
+        original_frame (frame height, frame width, 3) - Annotated frame.
+    '''
+    first_eye_coords, second_eye_coords, first_eye_angle, second_eye_angle, heading_coords, body_coords, heading_angle, tail_points = results
+    # Check whether to to an additional process to calculate eye angles.
+    if extended_eyes_calculation:
+        # Draw a circle arround the first eye coordinates.
+        original_frame = cv2.circle(original_frame, (first_eye_coords[1], first_eye_coords[0]), 1, colours[-3], -1)
+        # Draw a line representing the first eye angle.
+        original_frame = cv2.line(original_frame, (first_eye_coords[1], first_eye_coords[0]), (int(round(first_eye_coords[1] + (eyes_line_length * np.cos(first_eye_angle)))), int(round(first_eye_coords[0] + (eyes_line_length * np.sin(first_eye_angle))))), colours[-3], 1)
+        # Draw a circle around the second eye coordinates.
+        original_frame = cv2.circle(original_frame, (second_eye_coords[1], second_eye_coords[0]), 1, colours[-2], - 1)
+        # Draw a line representing the second eye angle.
+        original_frame = cv2.line(original_frame, (second_eye_coords[1], second_eye_coords[0]), (int(round(second_eye_coords[1] + (eyes_line_length * np.cos(second_eye_angle)))), int(round(second_eye_coords[0] + (eyes_line_length * np.sin(second_eye_angle))))), colours[-2], 1)
+    else:
+        # Draw a circle arround the first eye coordinates.
+        original_frame = cv2.circle(original_frame, (first_eye_coords[1], first_eye_coords[0]), 1, colours[-3], -1)
+        # Draw a circle arround the second eye coordinates.
+        original_frame = cv2.circle(original_frame, (second_eye_coords[1], second_eye_coords[0]), 1, colours[-2], - 1)
+    # Iterate through each set of tail points.
+    for m in range(1, len(tail_points)):
+        # Draw around the midpoint of the line that connects the previous tail point (or the swim bladder) to the current tail point.
+        original_frame = cv2.circle(original_frame, (int(round((tail_points[m - 1][1] + tail_points[m][1]) / 2)), int(round((tail_points[m - 1][0] + tail_points[m][0]) / 2))), 1, colours[m - 1], -1)
+    # Draw an arrow for the heading angle.
+    original_frame = cv2.arrowedLine(original_frame, (int(round(heading_coords[1] - (line_length / 2 * np.cos(heading_angle)))), int(round(heading_coords[0] - (line_length / 2 * np.sin(heading_angle))))), (int(round(heading_coords[1] + (line_length * np.cos(heading_angle)))), int(round(heading_coords[0] + (line_length * np.sin(heading_angle))))), colours[-1], 1, tipLength = 0.2)
+    return original_frame
+
+def tracking_results_are_equal(results, other_results):
+    '''
+    Function that checks whether two sets of results returned by track_frame are identical, treating NaN values as equal.
+    '''
+    results = np.hstack([np.ravel(np.array(value, dtype = float)) for value in results])
+    other_results = np.hstack([np.ravel(np.array(value, dtype = float)) for value in other_results])
+    return np.array_equal(results, other_results) or (results.shape == other_results.shape and np.all((results == other_results) | (np.isnan(results) & np.isnan(other_results))))
+
+def track_video_frame_range(video_path, background, starting_frame, n_frames, tracking_parameters, video_backend = 'opencv'):
+    '''
+    Tracks a contiguous range of frames in a video. Used by the worker processes of track_video.
+
+    Steps:
+        Opens the video and decodes the frames in a background thread, starting from the starting frame.
+        Tracks each frame using a new tracking state, as if the range was the start of the video, using track_frames_from_reader.
+        Records the tracking state after each frame so that the results can be merged with the results of the previous range.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+        background (frame height, frame width) - Background of the video.
+        starting_frame (int) - Frame number of the first frame in the range.
+        n_frames (int) - Number of frames in the range.
+        tracking_parameters (dict) - Keyword arguments passed to track_frame.
 
-    print('Total processing time: {0} seconds.'.format(time.time() - t0))
+    Optional Arguments:
+        video_backend (str) - Same as in open_video_for_tracking. Default = opencv.
+
+    Returns:
+        frame_results (list) - List containing the frame number, results, success, and the tracking state (prev_frame_number, prev_eye_angle, prev_frame_region) after each frame that was loaded successfully.
+        tracking_state (dict) - Tracking state after the last frame in the range.
+    '''
+    tracking_state = initialize_tracking_state()
+    frame_results = []
+    # Iterate through each frame, decoded and preprocessed ahead of the tracking.
+    with get_prefetching_frame_reader(video_path, background, starting_frame, n_frames, tracking_parameters, video_backend = video_backend) as reader:
+        for frame_number, success, original_frame, results, tracking_success in track_frames_from_reader(reader, background, tracking_state, tracking_parameters):
+            # Checks if the frame was loaded successfully.
+            if success:
+                update_tracking_state(tracking_state, results)
+                frame_results.append([frame_number, results, tracking_success, (tracking_state['prev_frame_number'], tracking_state['prev_eye_angle'], tracking_state['prev_frame_region'])])
+    return frame_results, tracking_state
+
+def merge_tracked_frame_ranges(video_path, background, frame_range_results, tracking_parameters, print_progress = True, video_backend = 'opencv', max_retracked_frames = 1000):
+    '''
+    Merges the results of contiguous frame ranges that were tracked separately so that they are identical to tracking all frames in order.
+
+    Steps:
+        Iterates through each frame range in order, keeping the tracking state of all of the frames that have already been merged.
+        The results of the first frames of each range, which were tracked without knowing the previous frames, are recalculated using the merged tracking state.
+        Once the recalculated results and tracking state match the results and tracking state of the range, the remaining results of the range are identical and used as they are.
+        When they still do not match after max_retracked_frames frames, such as when the fish stays still for longer than that, the remaining results of the range are used as they are and a warning is printed.
 
-    return results
+    Required Arguments:
+        video_path (str) - Path to the video.
+        background (frame height, frame width) - Background of the video.
+        frame_range_results (iterable) - Results returned by track_video_frame_range for each frame range, in order.
+        tracking_parameters (dict) - Keyword arguments passed to track_frame.
+
+    Optional Arguments:
+        print_progress (bool) - Print the progress of merging the frame ranges. Default = True.
+        video_backend (str) - Same as in open_video_for_tracking. Default = opencv.
+        max_retracked_frames (int) - Maximum number of frames of each range whose results are recalculated. Default = 1000.
+            ** The frames are decoded and tracked again in the main process, so recalculating every frame of a range would be slower than tracking with a single process.
+            ** When the limit is reached, the results of the remaining frames of the range may differ from tracking all frames in order until new coordinates are calculated in the same frame.
+
+    Returns:
+        frame_results (list) - List containing the frame number, results, success, and the frame number of the last frame in which new coordinates were calculated for each frame that was loaded successfully.
+    '''
+    merged_frame_results = []
+    tracking_state = None
+    n_retracked_frames = 0
+    for range_number, (frame_results, range_tracking_state) in enumerate(frame_range_results):
+        if print_progress:
+            print('Tracking video. Processed frame range: {0}.'.format(range_number + 1), end = '\r')
+        if tracking_state is None:
+            # The first range was tracked from the start.
+            merged_frame_results += [frame_result[:3] + [frame_result[3][0]] for frame_result in frame_results]
+            tracking_state = range_tracking_state
+            continue
+        capture = None
+        for i, (frame_number, range_results, range_success, range_signature) in enumerate(frame_results):
+            if capture is None:
+                # Open the video path and set the frame position to the first frame of the range.
+                capture = open_video_for_tracking(video_path, video_backend)
+                capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            else:
+                # Skip over the frames that could not be loaded successfully.
+                while int(capture.get(cv2.CAP_PROP_POS_FRAMES)) < frame_number:
+                    capture.grab()
+            success, original_frame = capture.read()
+            # Recalculate the results of the frame using the merged tracking state.
+            results, tracking_success = track_frame(original_frame, background, tracking_state, frame_number = frame_number, **tracking_parameters)
+            update_tracking_state(tracking_state, results)
+            merged_frame_results.append([frame_number, results, tracking_success, tracking_state['prev_frame_number']])
+            n_retracked_frames += 1
+            # Check whether the merged tracking state has caught up with the tracking state of the range.
+            caught_up = (tracking_state['prev_frame_number'], tracking_state['prev_eye_angle'], tracking_state['prev_frame_region']) == range_signature and tracking_success == range_success and tracking_results_are_equal(results, range_results)
+            if caught_up or (i + 1 == max_retracked_frames and i + 1 < len(frame_results)):
+                if not caught_up:
+                    print('Warning! The results of frame range {0} did not match the results of the previous frames after recalculating {1} frames. Using the results of the range for the remaining frames.'.format(range_number + 1, max_retracked_frames))
+                merged_frame_results += [frame_result[:3] + [frame_result[3][0]] for frame_result in frame_results[i + 1:]]
+                tracking_state = range_tracking_state
+                break
+        if capture is not None:
+            # Unload the video from memory.
+            capture.release()
+    if print_progress:
+        print('Tracking video. Processed frame range: {0}.'.format(range_number + 1))
+        print('Recalculated the results of {0} frames to merge the frame ranges.'.format(n_retracked_frames))
+    return merged_frame_results
 
 def track_video(video_path, colours, n_tail_points, dist_tail_points, dist_eyes, dist_swim_bladder,
                 background_calculation_method = 'brightest', background_calculation_frames_to_skip = 10,
@@ -1032,7 +2341,8 @@ def track_video(video_path, colours, n_tail_points, dist_tail_points, dist_eyes,
                 eyes_threshold = None, line_length = 0, video_fps = None,
                 pixel_threshold = 100, frame_change_threshold = 10, convert_colours_from_RGB_to_BGR = False,
                 range_angles = 120, median_blur = 3, initial_pixel_search = 'brightest',
-                invert_threshold = False, eyes_line_length = 0, print_progress = True):
+                invert_threshold = False, eyes_line_length = 0, print_progress = True, n_processes = 1, checkpoint_frames = 1000,
+                mask = None, recalculate_eye_coords_every_frame = True, adaptive_crop = False, video_backend = 'opencv', progress_callback = None):
     '''
     Tracks a video.
 
@@ -1071,14 +2381,38 @@ def track_video(video_path, colours, n_tail_points, dist_tail_points, dist_eyes,
             ** Used to determined whether or not the previous data points should be used or whether new points should be calculated.
             ** The larger the frame_change_threshold, the less likely it is that new data points are going to be calculated.
             ** Useful for reducing frame to frame noise in position of coordinates.
+            ** When the frame_change_threshold is 0 or less, new points are calculated in every frame.
+            ** The frames that have changed are tracked in batches, unless the mask, the adaptive crop, or the extended eyes calculation is used.
+            ** The number of frames that used the previous results is printed and saved into the metadata as n_skipped_frames.
+        tracking_method (str) - Same as in track_frame. Default = free_swimming.
+        initial_pixel_search (str) - Same as in track_frame. Default = brightest.
+        mask (list) - Same as in track_frame. Default = None.
+        recalculate_eye_coords_every_frame (bool) - Same as in track_frame. Default = True.
+        adaptive_crop (bool) - Same as in track_frame. Default = False.
+            ** Only used by the free swimming tracking method when mask is None.
+        video_backend (str) - Backend used to decode the frames of the video. Can be opencv, ffmpeg, or pyav. Default = opencv.
+            ** opencv - Decodes colour frames using cv2.VideoCapture and converts them to grayscale.
+            ** ffmpeg - Decodes the frames directly to grayscale in an ffmpeg subprocess using multi-threaded decoding. Requires ffmpeg to be installed.
+            ** pyav - Decodes the frames directly to grayscale using PyAV with multi-threaded decoding. Requires PyAV to be installed.
+            ** The grayscale frames decoded by the ffmpeg and pyav backends may differ by 1 from the frames converted by OpenCV, so the results may differ slightly between backends.
+        n_processes (int) - Number of processes used to track the video. Default = 1.
+            ** When n_processes is greater than 1, the video is split into contiguous ranges of frames that are tracked in parallel and then merged in order. The results are identical to tracking with a single process, unless the results of a range still differ from the results of the previous frames after recalculating 1000 frames, as described in merge_tracked_frame_ranges.
+            ** On Windows, the calling script must be protected by if __name__ == '__main__'.
+        checkpoint_frames (int) - Number of frames in each block of frames that is committed to the results folder while tracking. Default = 1000.
+            ** The results are written into the results folder as they are tracked, along with a progress marker. If tracking is interrupted, tracking the same video with the same parameters resumes from the last committed block of frames.
+            ** When checkpoint_frames is 0 or None, or when n_processes is greater than 1, the results are only written once tracking is complete.
+            ** When resuming and save_video is True, the frames tracked before the checkpoint are annotated using the saved results. Since the angles are saved with float32 precision, the annotations of these frames may differ by a pixel from the annotations of an uninterrupted run.
+        progress_callback (function) - Function that is called with the number of frames that have been processed after each frame. Default = None.
+            ** Used by the tracking threads of the GUI to update the progress bars.
+            ** When n_processes is greater than 1, the function is called as each range of frames is tracked.
 
     Returns:
         tracked_video - Saved in the path location given by the video path.
             ** Saved in a raw video format.
             ** Points of interest (i.e. tail points, heading angle, and eye coordinates) are annotated on the video.
         data_file - Saved in the path location given by the video path.
-            ** Saved as a npz file.
-            ** Saved as a dictionary containing arrays of the eye coordinates, heading angle, eye angles, and tail points.
+            ** Saved as a folder containing a .npy file for each array and a metadata.json file.
+            ** Contains arrays of the eye coordinates, heading angle, eye angles, and tail points.
     '''
 
     if print_progress:
@@ -1099,25 +2433,32 @@ def track_video(video_path, colours, n_tail_points, dist_tail_points, dist_eyes,
     if save_path == None:
         save_path = os.path.dirname(video_path)
 
+    if video_backend not in fs.VIDEO_BACKENDS:
+        print('Error: video_backend must be formatted as a string and must be one of the following: {0}.'.format(', '.join(fs.VIDEO_BACKENDS)))
+        return
+
     if background is None:
         # Create or load background image.
         if background_path is None:
             background = calculate_background(video_path, method = background_calculation_method, chunk_size = [background_calculation_frame_chunk_width, background_calculation_frame_chunk_height],
-                                                frames_to_skip = background_calculation_frames_to_skip, save_path = save_path, save_background = save_background, print_progress = print_progress)
+                                                frames_to_skip = background_calculation_frames_to_skip, save_path = save_path, save_background = save_background, print_progress = print_progress, video_backend = video_backend)
         else:
             background = cv2.imread(background_path, cv2.IMREAD_GRAYSCALE).astype(np.uint8)
 
     video_n_frames = get_total_frame_number_from_video(video_path)
     frame_size = get_frame_size_from_video(video_path)
 
-    if background.shape != frame_size:
+    if background.shape != frame_size[::-1]:
         print('Warning! Background shape does not match frame shape. Recalculating background.')
         background = calculate_background(video_path, method = background_calculation_method, chunk_size = [background_calculation_frame_chunk_width, background_calculation_frame_chunk_height],
-                                            frames_to_skip = background_calculation_frames_to_skip, save_path = save_path, save_background = save_background, print_progress = print_progress)
+                                            frames_to_skip = background_calculation_frames_to_skip, save_path = save_path, save_background = save_background, print_progress = print_progress, video_backend = video_backend)
 
     # Get the fps.
     if video_fps is None:
         video_fps = get_fps_from_video(video_path)
+    elif not video_fps > 0:
+        print('Warning! The fps must be greater than 0. Using {0} fps.'.format(fs.DEFAULT_FPS))
+        video_fps = fs.DEFAULT_FPS
 
     # Get the total number of frames.
     if n_frames is None:
@@ -1136,420 +2477,188 @@ def track_video(video_path, colours, n_tail_points, dist_tail_points, dist_eyes,
         print('Warning! The number of frames requested to track plus the number of initial frames to offset exceeds the total number of frames in the video. Keeping the initial frames to offset and tracking the remaining frames.')
         n_frames = video_n_frames - starting_frame
 
-    # Open the video path.
-    capture = cv2.VideoCapture(video_path)
-
-    # Set the frame position to start.
-    capture.set(cv2.CAP_PROP_POS_FRAMES, starting_frame)
+    # Create a dictionary that contains all of the parameters used to track each frame.
+    tracking_parameters = { 'n_tail_points' : n_tail_points,
+                            'dist_tail_points' : dist_tail_points,
+                            'dist_eyes' : dist_eyes,
+                            'dist_swim_bladder' : dist_swim_bladder,
+                            'tracking_method' : tracking_method,
+                            'extended_eyes_calculation' : extended_eyes_calculation,
+                            'eyes_threshold' : eyes_threshold,
+                            'pixel_threshold' : pixel_threshold,
+                            'frame_change_threshold' : frame_change_threshold,
+                            'range_angles' : range_angles,
+                            'median_blur' : median_blur,
+                            'initial_pixel_search' : initial_pixel_search,
+                            'invert_threshold' : invert_threshold,
+                            'mask' : mask,
+                            'recalculate_eye_coords_every_frame' : recalculate_eye_coords_every_frame,
+                            'adaptive_crop' : adaptive_crop
+                        }
+
+    if n_processes > 1 and tracking_method != 'free_swimming' and not recalculate_eye_coords_every_frame:
+        # Every frame depends on the coordinates of the first frame, so the frames cannot be split into ranges that are tracked separately.
+        print('Warning! Frame ranges cannot be tracked in parallel when the eye coordinates are not recalculated every frame. Tracking with a single process.')
+        n_processes = 1
+
+    if tracking_method == 'head_fixed':
+        # The head fixed tracking method draws the eye angles using the same line length as the heading angle.
+        eyes_line_length = line_length
 
     if save_video:
         # Create a path for the video once it is tracked.
-        save_video_path = "{0}\\{1}_tracked.avi".format(save_path, os.path.basename(video_path)[:-4])
+        save_video_path = os.path.join(save_path, "{0}_tracked.avi".format(os.path.basename(video_path)[:-4]))
 
         # Create video writer.
         writer = cv2.VideoWriter(save_video_path, 0, video_fps, frame_size)
 
-    # Initialize variables for data.
-    eye_coord_array = []
-    eye_angle_array = []
-    tail_coord_array = []
-    body_coord_array = []
-    heading_angle_array = []
-    prev_frame = None
-    prev_eye_angle = None
-
-    range_angles = np.radians(range_angles)
+    # Create a path to the folder that will contain all of the results from tracking.
+    data_path = os.path.join(save_path, "{0}_results".format(os.path.basename(video_path)[:-4]))
 
-    if tracking_method == 'free_swimming':
-        # Iterate through each frame.
-        for n in range(n_frames):
+    tracking_state = initialize_tracking_state()
+    resume_frame = starting_frame
+    if n_processes > 1 or not checkpoint_frames:
+        # Allocate the arrays that will contain the results of each frame.
+        tracking_results = tr.TrackingResults(n_frames, n_tail_points)
+    else:
+        # Parameters that must be the same to resume tracking from a checkpoint.
+        checkpoint_parameters = {   'video_path' : video_path,
+                                    'starting_frame' : starting_frame,
+                                    'n_frames' : n_frames,
+                                    'tracking_parameters' : tracking_parameters,
+                                    'video_backend' : video_backend,
+                                    'background' : hashlib.md5(np.ascontiguousarray(background).tobytes()).hexdigest()
+                                }
+        # Check whether tracking was interrupted and can be resumed from a checkpoint.
+        tracking_results, resumed_tracking_state, next_frame_number = tr.resume_tracking_results(data_path, checkpoint_parameters, checkpoint_frames = checkpoint_frames)
+        if tracking_results is None:
+            # Allocate the arrays that will contain the results of each frame in the results folder.
+            tracking_results = tr.TrackingResults(n_frames, n_tail_points, results_path = data_path, checkpoint_frames = checkpoint_frames, checkpoint_parameters = checkpoint_parameters)
+        else:
+            tracking_state = resumed_tracking_state
+            resume_frame = next_frame_number
             if print_progress:
-                print('Tracking video. Processing frame number: {0} / {1}.'.format(n + 1, n_frames), end = '\r')
-            # Load a frame into memory.
-            success, original_frame = capture.read()
-            # Checks if the frame was loaded successfully.
-            if success:
-                # Initialize variables for each frame.
-                first_eye_coords = [np.nan, np.nan]
-                second_eye_coords = [np.nan, np.nan]
-                first_eye_angle = np.nan
-                second_eye_angle = np.nan
-                body_coords = [np.nan, np.nan]
-                heading_angle = np.nan
-                swim_bladder_coords = [np.nan, np.nan]
-                tail_point_coords = [[np.nan, np.nan] for m in range(n_tail_points)]
-                tail_points = [[np.nan, np.nan] for m in range(n_tail_points + 1)]
-                # Convert the original frame to grayscale.
-                frame = cv2.cvtColor(original_frame, cv2.COLOR_BGR2GRAY).astype(np.uint8)
-                # Convert the frame into the absolute difference between the frame and the background.
-                frame = cv2.absdiff(frame, background)
-                # Apply a median blur filter to the frame.
-                frame = cv2.medianBlur(frame, median_blur)
-                try:
-                    # Check to ensure that the maximum pixel value is greater than a certain value. Useful for determining whether or not the at least one of the eyes is present in the frame.
-                    if np.max(frame) > pixel_threshold:
-                        # Check to see if it's not the first frame and check if the sum of the absolute difference between the current frame and the previous frame is greater than a certain threshold. This helps reduce frame to frame noise in the position of the pixels.
-                        if prev_frame is not None and np.sum(np.abs(frame.astype(float) - prev_frame.astype(float)) >= frame_change_threshold) == 0:
-                            # If the difference between the current frame and the previous frame is less than a certain threshold, then use the values that were previously calculated.
-                            first_eye_coords, second_eye_coords = eye_coord_array[len(eye_coord_array) - 1]
-                            first_eye_angle, second_eye_angle = eye_angle_array[len(eye_angle_array) - 1]
-                            body_coords = body_coord_array[len(body_coord_array) - 1]
-                            heading_angle = heading_angle_array[len(heading_angle_array) - 1]
-                            swim_bladder_coords = tail_coord_array[len(tail_coord_array) - 1][0]
-                            tail_point_coords = tail_coord_array[len(tail_coord_array) - 1][1:]
-                        else:
-                            # Return the coordinate of the brightest pixel.
-                            first_eye_coords = [np.where(frame == np.max(frame))[0][0], np.where(frame == np.max(frame))[1][0]]
-                            # Calculate the next brightest pixel that lies on the circle drawn around the first eye coordinates and has a radius equal to the distance between the eyes.
-                            second_eye_coords = calculate_next_coords(first_eye_coords, dist_eyes, frame, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Calculate the angle between the two eyes.
-                                eye_angle = np.arctan2(second_eye_coords[0] - first_eye_coords[0], second_eye_coords[1] - first_eye_coords[1])
-                                # Check if this is the first frame.
-                                if prev_eye_angle is not None:
-                                    # Check if the difference between the current eye angle and previous eye angle is somwehere around pi, meaning the first and second eye coordiantes have reversed. Occasionally, the coordinates of the eyes will switch between one and the other. This method is useful for keeping the positions of the left and right eye the same between frames.
-                                    if eye_angle - prev_eye_angle > np.pi / 2 or eye_angle - prev_eye_angle < -np.pi / 2:
-                                        if eye_angle - prev_eye_angle < np.pi * 3 / 2 and eye_angle - prev_eye_angle > -np.pi * 3 / 2:
-                                            # Switch the first and second eye coordinates.
-                                            coords = first_eye_coords
-                                            first_eye_coords = second_eye_coords
-                                            second_eye_coords = coords
-                                            # Calculate the new eye angle.
-                                            eye_angle = np.arctan2(second_eye_coords[0] - first_eye_coords[0], second_eye_coords[1] - first_eye_coords[1])
-                                # Apply a threshold to the frame.
-                                thresh = apply_threshold_to_frame(frame, eyes_threshold, invert = invert_threshold)
-                                # Find the contours of the binary regions in the thresholded frame.
-                                contours = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)[1]
-                                # Iterate through each contour in the list of contours.
-                                for i in range(len(contours)):
-                                    # Check if the first eye coordinate are within the current contour.
-                                    if cv2.pointPolygonTest(contours[i], (first_eye_coords[1], first_eye_coords[0]), False) == 1:
-                                        # Set the first eye coordinates to the centroid of the binary region and calculate the first eye angle.
-                                        M = cv2.moments(contours[i])
-                                        first_eye_coords = [int(round(M['m01']/M['m00'])), int(round(M['m10']/M['m00']))]
-                                        first_eye_angle = cv2.fitEllipse(contours[i])[2] * np.pi / 180
-                                    # Check if the second eye coordinate are within the current contour.
-                                    if cv2.pointPolygonTest(contours[i], (second_eye_coords[1], second_eye_coords[0]), False) == 1:
-                                        # Set the second eye coordinates to the centroid of the binary region and calculate the second eye angle.
-                                        M = cv2.moments(contours[i])
-                                        second_eye_coords = [int(round(M['m01']/M['m00'])), int(round(M['m10']/M['m00']))]
-                                        second_eye_angle = cv2.fitEllipse(contours[i])[2] * np.pi / 180
-                            # Find the midpoint of the line that connects both eyes.
-                            heading_coords = [(first_eye_coords[0] + second_eye_coords[0]) / 2, (first_eye_coords[1] + second_eye_coords[1]) / 2]
-                            # Find the swim bladder coordinates by finding the next brightest coordinates that lie on a circle around the heading coordinates with a radius equal to the distance between the eyes and the swim bladder.
-                            swim_bladder_coords = calculate_next_coords(heading_coords, dist_swim_bladder, frame, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
-                            # Find the body coordinates by finding the center of the triangle that connects the eyes and swim bladder.
-                            body_coords = [int(round((swim_bladder_coords[0] + first_eye_coords[0] + second_eye_coords[0]) / 3)), int(round((swim_bladder_coords[1] + first_eye_coords[1] + second_eye_coords[1]) / 3))]
-                            # Calculate the heading angle as the angle between the body coordinates and the heading coordinates.
-                            heading_angle = np.arctan2(heading_coords[0] - body_coords[0], heading_coords[1] - body_coords[1])
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Create an array that acts as a contour for the body and contains the swim bladder coordinates and eye coordinates.
-                                body_contour = np.array([np.array([swim_bladder_coords[1], swim_bladder_coords[0]]), np.array([first_eye_coords[1], first_eye_coords[0]]), np.array([second_eye_coords[1], second_eye_coords[0]])])
-                                # Check to see if the point that is created by drawing a line from the first eye coordinates with a length equal to half of the distance between the eyes is within the body contour. Occasionally, the angle of the eye is flipped to face towards the body instead of away. This is to check whether or not the eye angle should be flipped.
-                                if cv2.pointPolygonTest(body_contour, (first_eye_coords[1] + (dist_eyes / 2 * np.cos(first_eye_angle)), first_eye_coords[0] + (dist_eyes / 2 * np.sin(first_eye_angle))), False) == 1:
-                                    # Flip the first eye angle.
-                                    if first_eye_angle > 0:
-                                        first_eye_angle -= np.pi
-                                    else:
-                                        first_eye_angle += np.pi
-                                # Check to see if the point that is created by drawing a line from the first eye coordinates with a length equal to half of the distance between the eyes is within the body contour. Occasionally, the angle of the eye is flipped to face towards the body instead of away. This is to check whether or not the eye angle should be flipped.
-                                if cv2.pointPolygonTest(body_contour, (second_eye_coords[1] + (dist_eyes / 2 * np.cos(second_eye_angle)), second_eye_coords[0] + (dist_eyes / 2 * np.sin(second_eye_angle))), False) == 1:
-                                    # Flip the second eye angle.
-                                    if second_eye_angle > 0:
-                                        second_eye_angle -= np.pi
-                                    else:
-                                        second_eye_angle += np.pi
-                            # Calculate the initial tail angle as the angle opposite to the heading angle.
-                            if heading_angle > 0:
-                                tail_angle = heading_angle - np.pi
-                            else:
-                                tail_angle = heading_angle + np.pi
-                            # Iterate through the number of tail points.
-                            for m in range(n_tail_points):
-                                # Check if this is the first tail point.
-                                if m == 0:
-                                    # Calculate the first tail point using the swim bladder as the first set of coordinates.
-                                    tail_point_coords[m] = calculate_next_coords(swim_bladder_coords, dist_tail_points, frame, angle = tail_angle, range_angles = range_angles)
-                                else:
-                                    # Check if this is the second tail point.
-                                    if m == 1:
-                                        # Calculate the next tail angle as the angle between the first tail point and the swim bladder.
-                                        tail_angle = np.arctan2(tail_point_coords[m - 1][0] - swim_bladder_coords[0], tail_point_coords[m - 1][1] - swim_bladder_coords[1])
-                                    # Check if the number of tail points calculated is greater than 2.
-                                    else:
-                                        # Calculate the next tail angle as the angle between the last two tail points.
-                                        tail_angle = np.arctan2(tail_point_coords[m - 1][0] - tail_point_coords[m - 2][0], tail_point_coords[m - 1][1] - tail_point_coords[m - 2][1])
-                                    # Calculate the next set of tail coordinates.
-                                    tail_point_coords[m] = calculate_next_coords(tail_point_coords[m - 1], dist_tail_points, frame, angle = tail_angle, range_angles = range_angles)
-                            # Set the previous frame to the current frame.
-                            prev_frame = frame
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Set the previous eye angle to the current eye angle.
-                                prev_eye_angle = eye_angle
-
-                        if save_video:
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Draw a circle arround the first eye coordinates.
-                                original_frame = cv2.circle(original_frame, (first_eye_coords[1], first_eye_coords[0]), 1, colours[-3], -1)
-                                # Draw a line representing the first eye angle.
-                                original_frame = cv2.line(original_frame, (first_eye_coords[1], first_eye_coords[0]), (int(round(first_eye_coords[1] + (eyes_line_length * np.cos(first_eye_angle)))), int(round(first_eye_coords[0] + (eyes_line_length * np.sin(first_eye_angle))))), colours[-3], 1)
-                                # Draw a circle around the second eye coordinates.
-                                original_frame = cv2.circle(original_frame, (second_eye_coords[1], second_eye_coords[0]), 1, colours[-2], - 1)
-                                # Draw a line representing the second eye angle.
-                                original_frame = cv2.line(original_frame, (second_eye_coords[1], second_eye_coords[0]), (int(round(second_eye_coords[1] + (eyes_line_length * np.cos(second_eye_angle)))), int(round(second_eye_coords[0] + (eyes_line_length * np.sin(second_eye_angle))))), colours[-2], 1)
-                            else:
-                                # Draw a circle arround the first eye coordinates.
-                                original_frame = cv2.circle(original_frame, (first_eye_coords[1], first_eye_coords[0]), 1, colours[-3], -1)
-                                # Draw a circle arround the second eye coordinates.
-                                original_frame = cv2.circle(original_frame, (second_eye_coords[1], second_eye_coords[0]), 1, colours[-2], - 1)
-                            # Iterate through each set of tail points.
-                            for m in range(n_tail_points):
-                                # Check if this is the first tail point
-                                if m == 0:
-                                    # For the first tail point, draw around the midpoint of the line that connects the swim bladder to the first tail point.
-                                    original_frame = cv2.circle(original_frame, (int(round((swim_bladder_coords[1] + tail_point_coords[m][1]) / 2)), int(round((swim_bladder_coords[0] + tail_point_coords[m][0]) / 2))), 1, colours[m], -1)
-                                else:
-                                    # For all subsequent tail points, draw around the midpoint of the line that connects the previous tail point to the current tail point.
-                                    original_frame = cv2.circle(original_frame, (int(round((tail_point_coords[m - 1][1] + tail_point_coords[m][1]) / 2)), int(round((tail_point_coords[m - 1][0] + tail_point_coords[m][0]) / 2))), 1, colours[m], -1)
-                            # Draw an arrow for the heading angle.
-                            original_frame = cv2.arrowedLine(original_frame, (int(round(heading_coords[1] - (line_length / 2 * np.cos(heading_angle)))), int(round(heading_coords[0] - (line_length / 2 * np.sin(heading_angle))))), (int(round(heading_coords[1] + (line_length * np.cos(heading_angle)))), int(round(heading_coords[0] + (line_length * np.sin(heading_angle))))), colours[-1], 1, tipLength = 0.2)
-                except:
-                    # Handles any errors that occur throughout tracking.
-                    first_eye_coords = [np.nan, np.nan]
-                    second_eye_coords = [np.nan, np.nan]
-                    first_eye_angle = np.nan
-                    second_eye_angle = np.nan
-                    body_coords = [np.nan, np.nan]
-                    heading_angle = np.nan
-                    swim_bladder_coords = [np.nan, np.nan]
-                    tail_point_coords = [[np.nan, np.nan] for m in range(n_tail_points)]
-                    tail_points = [[np.nan, np.nan] for m in range(n_tail_points + 1)]
-                # Iterate through the number of tail points, including the swim bladder coordinates.
-                for m in range(n_tail_points + 1):
-                    # Check if this is the first tail point.
-                    if m == 0:
-                        # Add the swim bladder to a list that will contain all of the tail points, including the swim bladder.
-                        tail_points[m] = swim_bladder_coords
-                    else:
-                        # Add all of the tail points to the list.
-                        tail_points[m] = tail_point_coords[m - 1]
-                # Add all of the important features that were tracked into lists.
-                eye_coord_array.append([first_eye_coords, second_eye_coords])
-                eye_angle_array.append([first_eye_angle, second_eye_angle])
-                tail_coord_array.append(tail_points)
-                body_coord_array.append(body_coords)
-                heading_angle_array.append(heading_angle)
-                if save_video:
-                    # Write the new frame that contains the annotated frame with tracked points to a new video.
+                print('Resuming tracking from frame number: {0}.'.format(resume_frame))
+
+    if n_processes > 1:
+        # Split the frames into one contiguous range of frames for each process.
+        frame_range_size = int(np.ceil(n_frames / n_processes))
+        frame_ranges = [[video_path, background, range_starting_frame, min(frame_range_size, starting_frame + n_frames - range_starting_frame), tracking_parameters, video_backend] for range_starting_frame in range(starting_frame, starting_frame + n_frames, frame_range_size)]
+        if print_progress:
+            print('Tracking video. Processing {0} frame ranges using {1} processes.'.format(len(frame_ranges), n_processes))
+        # Track each range of frames in a separate process.
+        pool = mp.Pool(n_processes)
+        async_results = [pool.apply_async(track_video_frame_range, frame_range) for frame_range in frame_ranges]
+        frame_range_results = []
+        # Collect the results of each range of frames in order, reporting the progress as each range is finished.
+        for range_number, (frame_range, async_result) in enumerate(zip(frame_ranges, async_results)):
+            frame_range_results.append(async_result.get())
+            if print_progress:
+                print('Tracking video. Tracked frame range: {0} / {1}.'.format(range_number + 1, len(frame_ranges)), end = '\r')
+            if progress_callback is not None:
+                progress_callback(frame_range[2] + frame_range[3] - starting_frame)
+        pool.close()
+        pool.join()
+        # Merge the results of each range of frames.
+        frame_results = merge_tracked_frame_ranges(video_path, background, frame_range_results, tracking_parameters, print_progress = print_progress, video_backend = video_backend)
+        if save_video:
+            # Open the video path.
+            capture = open_video_for_tracking(video_path, video_backend)
+            # Set the frame position to start.
+            capture.set(cv2.CAP_PROP_POS_FRAMES, starting_frame)
+            annotation_failed = False
+        for frame_result in frame_results:
+            frame_number, results, tracking_success, prev_frame_number = frame_result
+            if save_video:
+                # When tracking a single process, the results of a frame that could not be annotated are kept for the next frame. Use them if the next frame reuses the previous results.
+                if tracking_success and prev_frame_number != frame_number and annotation_failed:
+                    results = get_failed_tracking_results(n_tail_points)
+                elif tracking_success:
+                    annotation_failed = False
+                # Skip over the frames that could not be loaded successfully.
+                while int(capture.get(cv2.CAP_PROP_POS_FRAMES)) < frame_number:
+                    capture.grab()
+                # Load a frame into memory.
+                success, original_frame = capture.read()
+                original_frame = convert_frame_to_colour(original_frame)
+                if tracking_success:
+                    try:
+                        # Annotate the tracking results onto the frame.
+                        original_frame = annotate_tracking_results_onto_original_frame(original_frame, results, colours, line_length, eyes_line_length, extended_eyes_calculation)
+                    except:
+                        # Handles any errors that occur throughout tracking.
+                        results = get_failed_tracking_results(n_tail_points)
+                        annotation_failed = True
+                # Write the new frame that contains the annotated frame with tracked points to a new video.
+                writer.write(original_frame)
+            # Write all of the important features that were tracked into the results.
+            tracking_results.append(results, frame_number, skipped = tracking_success and prev_frame_number != frame_number)
+        if save_video:
+            # Unload the video from memory.
+            capture.release()
+    else:
+        if save_video and resume_frame > starting_frame:
+            # Annotate the frames that were tracked before the checkpoint using the saved results.
+            capture = open_video_for_tracking(video_path, video_backend)
+            capture.set(cv2.CAP_PROP_POS_FRAMES, starting_frame)
+            index = 0
+            for frame_number in range(starting_frame, resume_frame):
+                success, original_frame = capture.read()
+                if success:
+                    original_frame = convert_frame_to_colour(original_frame)
+                    if index < len(tracking_results) and tracking_results.frame_number_array[index] == frame_number:
+                        try:
+                            original_frame = annotate_tracking_results_onto_original_frame(original_frame, tracking_results.get_frame(index), colours, line_length, eyes_line_length, extended_eyes_calculation)
+                        except:
+                            # Frames that could not be tracked are not annotated.
+                            pass
+                        index += 1
                     writer.write(original_frame)
-    elif tracking_method == 'head_fixed':
-        # Iterate through each frame.
-        for n in range(n_frames):
+            capture.release()
+
+        # Decode and preprocess the frames in a background thread so that decoding overlaps with tracking.
+        reader = get_prefetching_frame_reader(video_path, background, resume_frame, starting_frame + n_frames - resume_frame, tracking_parameters, video_backend = video_backend).start()
+
+        n = resume_frame - starting_frame - 1
+
+        # Iterate through each frame. The frames are tracked in batches when the results of each frame do not depend on the previous frames.
+        for frame_number, success, original_frame, results, tracking_success in track_frames_from_reader(reader, background, tracking_state, tracking_parameters):
+            n = frame_number - starting_frame
             if print_progress:
                 print('Tracking video. Processing frame number: {0} / {1}.'.format(n + 1, n_frames), end = '\r')
-            # Load a frame into memory.
-            success, original_frame = capture.read()
+            if progress_callback is not None:
+                progress_callback(n + 1)
             # Checks if the frame was loaded successfully.
             if success:
-                # Initialize variables for each frame.
-                first_eye_coords = [np.nan, np.nan]
-                second_eye_coords = [np.nan, np.nan]
-                first_eye_angle = np.nan
-                second_eye_angle = np.nan
-                body_coords = [np.nan, np.nan]
-                heading_angle = np.nan
-                swim_bladder_coords = [np.nan, np.nan]
-                tail_point_coords = [[np.nan, np.nan] for m in range(n_tail_points)]
-                tail_points = [[np.nan, np.nan] for m in range(n_tail_points + 1)]
-                # Convert the original frame to grayscale.
-                frame = cv2.cvtColor(original_frame, cv2.COLOR_BGR2GRAY).astype(np.uint8)
-                try:
-                    # Check to ensure that the maximum pixel value is greater than a certain value. Useful for determining whether or not the at least one of the eyes is present in the frame.
-                    if np.min(frame) < pixel_threshold:
-                        # Check to see if it's not the first frame and check if the sum of the absolute difference between the current frame and the previous frame is greater than a certain threshold. This helps reduce frame to frame noise in the position of the pixels.
-                        if prev_frame is not None and np.sum(np.abs(frame.astype(float) - prev_frame.astype(float)) >= frame_change_threshold) == 0:
-                            # If the difference between the current frame and the previous frame is less than a certain threshold, then use the values that were previously calculated.
-                            first_eye_coords, second_eye_coords = eye_coord_array[len(eye_coord_array) - 1]
-                            first_eye_angle, second_eye_angle = eye_angle_array[len(eye_angle_array) - 1]
-                            body_coords = body_coord_array[len(body_coord_array) - 1]
-                            heading_angle = heading_angle_array[len(heading_angle_array) - 1]
-                            swim_bladder_coords = tail_coord_array[len(tail_coord_array) - 1][0]
-                            tail_point_coords = tail_coord_array[len(tail_coord_array) - 1][1:]
-                        else:
-                            if initial_pixel_search == 'darkest':
-                                # Return the coordinate of the brightest pixel.
-                                first_eye_coords = [np.where(frame == np.min(frame))[0][0], np.where(frame == np.min(frame))[1][0]]
-                            elif initial_pixel_search == 'brightest':
-                                first_eye_coords = [np.where(frame == np.max(frame))[0][0], np.where(frame == np.max(frame))[1][0]]
-                            # Calculate the next brightest pixel that lies on the circle drawn around the first eye coordinates and has a radius equal to the distance between the eyes.
-                            second_eye_coords = calculate_next_coords(first_eye_coords, dist_eyes, frame, method = initial_pixel_search, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Calculate the angle between the two eyes.
-                                eye_angle = np.arctan2(second_eye_coords[0] - first_eye_coords[0], second_eye_coords[1] - first_eye_coords[1])
-                                # Check if this is the first frame.
-                                if prev_eye_angle is not None:
-                                    # Check if the difference between the current eye angle and previous eye angle is somwehere around pi, meaning the first and second eye coordiantes have reversed. Occasionally, the coordinates of the eyes will switch between one and the other. This method is useful for keeping the positions of the left and right eye the same between frames.
-                                    if eye_angle - prev_eye_angle > np.pi / 2 or eye_angle - prev_eye_angle < -np.pi / 2:
-                                        if eye_angle - prev_eye_angle < np.pi * 3 / 2 and eye_angle - prev_eye_angle > -np.pi * 3 / 2:
-                                            # Switch the first and second eye coordinates.
-                                            coords = first_eye_coords
-                                            first_eye_coords = second_eye_coords
-                                            second_eye_coords = coords
-                                            # Calculate the new eye angle.
-                                            eye_angle = np.arctan2(second_eye_coords[0] - first_eye_coords[0], second_eye_coords[1] - first_eye_coords[1])
-                                # Apply a threshold to the frame.
-                                thresh = apply_threshold_to_frame(frame, eyes_threshold, invert = invert_threshold)
-                                # Find the contours of the binary regions in the thresholded frame.
-                                contours = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)[1]
-                                # Iterate through each contour in the list of contours.
-                                for i in range(len(contours)):
-                                    # Check if the first eye coordinate are within the current contour.
-                                    if cv2.pointPolygonTest(contours[i], (first_eye_coords[1], first_eye_coords[0]), False) == 1:
-                                        # Set the first eye coordinates to the centroid of the binary region and calculate the first eye angle.
-                                        M = cv2.moments(contours[i])
-                                        first_eye_coords = [int(round(M['m01']/M['m00'])), int(round(M['m10']/M['m00']))]
-                                        first_eye_angle = cv2.fitEllipse(contours[i])[2] * np.pi / 180
-                                    # Check if the second eye coordinate are within the current contour.
-                                    if cv2.pointPolygonTest(contours[i], (second_eye_coords[1], second_eye_coords[0]), False) == 1:
-                                        # Set the second eye coordinates to the centroid of the binary region and calculate the second eye angle.
-                                        M = cv2.moments(contours[i])
-                                        second_eye_coords = [int(round(M['m01']/M['m00'])), int(round(M['m10']/M['m00']))]
-                                        second_eye_angle = cv2.fitEllipse(contours[i])[2] * np.pi / 180
-                            # Find the midpoint of the line that connects both eyes.
-                            heading_coords = [(first_eye_coords[0] + second_eye_coords[0]) / 2, (first_eye_coords[1] + second_eye_coords[1]) / 2]
-                            # Convert the frame into the absolute difference between the frame and the background.
-                            frame = cv2.absdiff(frame, background)
-                            # Apply a median blur filter to the frame.
-                            frame = cv2.medianBlur(frame, median_blur)
-                            # Find the swim bladder coordinates by finding the next brightest coordinates that lie on a circle around the heading coordinates with a radius equal to the distance between the eyes and the swim bladder.
-                            swim_bladder_coords = calculate_next_coords(heading_coords, dist_swim_bladder, frame, n_angles = 100, range_angles = 2 * np.pi, tail_calculation = False)
-                            # Find the body coordinates by finding the center of the triangle that connects the eyes and swim bladder.
-                            body_coords = [int(round((swim_bladder_coords[0] + first_eye_coords[0] + second_eye_coords[0]) / 3)), int(round((swim_bladder_coords[1] + first_eye_coords[1] + second_eye_coords[1]) / 3))]
-                            # Calculate the heading angle as the angle between the body coordinates and the heading coordinates.
-                            heading_angle = np.arctan2(heading_coords[0] - body_coords[0], heading_coords[1] - body_coords[1])
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Create an array that acts as a contour for the body and contains the swim bladder coordinates and eye coordinates.
-                                body_contour = np.array([np.array([swim_bladder_coords[1], swim_bladder_coords[0]]), np.array([first_eye_coords[1], first_eye_coords[0]]), np.array([second_eye_coords[1], second_eye_coords[0]])])
-                                # Check to see if the point that is created by drawing a line from the first eye coordinates with a length equal to half of the distance between the eyes is within the body contour. Occasionally, the angle of the eye is flipped to face towards the body instead of away. This is to check whether or not the eye angle should be flipped.
-                                if cv2.pointPolygonTest(body_contour, (first_eye_coords[1] + (dist_eyes / 2 * np.cos(first_eye_angle)), first_eye_coords[0] + (dist_eyes / 2 * np.sin(first_eye_angle))), False) == 1:
-                                    # Flip the first eye angle.
-                                    if first_eye_angle > 0:
-                                        first_eye_angle -= np.pi
-                                    else:
-                                        first_eye_angle += np.pi
-                                # Check to see if the point that is created by drawing a line from the first eye coordinates with a length equal to half of the distance between the eyes is within the body contour. Occasionally, the angle of the eye is flipped to face towards the body instead of away. This is to check whether or not the eye angle should be flipped.
-                                if cv2.pointPolygonTest(body_contour, (second_eye_coords[1] + (dist_eyes / 2 * np.cos(second_eye_angle)), second_eye_coords[0] + (dist_eyes / 2 * np.sin(second_eye_angle))), False) == 1:
-                                    # Flip the second eye angle.
-                                    if second_eye_angle > 0:
-                                        second_eye_angle -= np.pi
-                                    else:
-                                        second_eye_angle += np.pi
-                            # Calculate the initial tail angle as the angle opposite to the heading angle.
-                            if heading_angle > 0:
-                                tail_angle = heading_angle - np.pi
-                            else:
-                                tail_angle = heading_angle + np.pi
-                            # Iterate through the number of tail points.
-                            for m in range(n_tail_points):
-                                # Check if this is the first tail point.
-                                if m == 0:
-                                    # Calculate the first tail point using the swim bladder as the first set of coordinates.
-                                    tail_point_coords[m] = calculate_next_coords(swim_bladder_coords, dist_tail_points, frame, angle = tail_angle, range_angles = range_angles)
-                                else:
-                                    # Check if this is the second tail point.
-                                    if m == 1:
-                                        # Calculate the next tail angle as the angle between the first tail point and the swim bladder.
-                                        tail_angle = np.arctan2(tail_point_coords[m - 1][0] - swim_bladder_coords[0], tail_point_coords[m - 1][1] - swim_bladder_coords[1])
-                                    # Check if the number of tail points calculated is greater than 2.
-                                    else:
-                                        # Calculate the next tail angle as the angle between the last two tail points.
-                                        tail_angle = np.arctan2(tail_point_coords[m - 1][0] - tail_point_coords[m - 2][0], tail_point_coords[m - 1][1] - tail_point_coords[m - 2][1])
-                                    # Calculate the next set of tail coordinates.
-                                    tail_point_coords[m] = calculate_next_coords(tail_point_coords[m - 1], dist_tail_points, frame, angle = tail_angle, range_angles = range_angles)
-                            # Set the previous frame to the current frame.
-                            prev_frame = frame
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Set the previous eye angle to the current eye angle.
-                                prev_eye_angle = eye_angle
-
-                        if save_video:
-                            # Check whether to to an additional process to calculate eye angles.
-                            if extended_eyes_calculation:
-                                # Draw a circle arround the first eye coordinates.
-                                original_frame = cv2.circle(original_frame, (first_eye_coords[1], first_eye_coords[0]), 1, colours[-3], -1)
-                                # Draw a line representing the first eye angle.
-                                original_frame = cv2.line(original_frame, (first_eye_coords[1], first_eye_coords[0]), (int(round(first_eye_coords[1] + (line_length * np.cos(first_eye_angle)))), int(round(first_eye_coords[0] + (line_length * np.sin(first_eye_angle))))), colours[-3], 1)
-                                # Draw a circle around the second eye coordinates.
-                                original_frame = cv2.circle(original_frame, (second_eye_coords[1], second_eye_coords[0]), 1, colours[-2], - 1)
-                                # Draw a line representing the second eye angle.
-                                original_frame = cv2.line(original_frame, (second_eye_coords[1], second_eye_coords[0]), (int(round(second_eye_coords[1] + (line_length * np.cos(second_eye_angle)))), int(round(second_eye_coords[0] + (line_length * np.sin(second_eye_angle))))), colours[-2], 1)
-                            else:
-                                # Draw a circle arround the first eye coordinates.
-                                original_frame = cv2.circle(original_frame, (first_eye_coords[1], first_eye_coords[0]), 1, colours[-3], -1)
-                                # Draw a circle arround the second eye coordinates.
-                                original_frame = cv2.circle(original_frame, (second_eye_coords[1], second_eye_coords[0]), 1, colours[-2], - 1)
-                            # Iterate through each set of tail points.
-                            for m in range(n_tail_points):
-                                # Check if this is the first tail point
-                                if m == 0:
-                                    # For the first tail point, draw around the midpoint of the line that connects the swim bladder to the first tail point.
-                                    original_frame = cv2.circle(original_frame, (int(round((swim_bladder_coords[1] + tail_point_coords[m][1]) / 2)), int(round((swim_bladder_coords[0] + tail_point_coords[m][0]) / 2))), 1, colours[m], -1)
-                                else:
-                                    # For all subsequent tail points, draw around the midpoint of the line that connects the previous tail point to the current tail point.
-                                    original_frame = cv2.circle(original_frame, (int(round((tail_point_coords[m - 1][1] + tail_point_coords[m][1]) / 2)), int(round((tail_point_coords[m - 1][0] + tail_point_coords[m][0]) / 2))), 1, colours[m], -1)
-                            # Draw an arrow for the heading angle.
-                            original_frame = cv2.arrowedLine(original_frame, (int(round(heading_coords[1] - (line_length / 2 * np.cos(heading_angle)))), int(round(heading_coords[0] - (line_length / 2 * np.sin(heading_angle))))), (int(round(heading_coords[1] + (line_length * np.cos(heading_angle)))), int(round(heading_coords[0] + (line_length * np.sin(heading_angle))))), colours[-1], 1, tipLength = 0.2)
-                except:
-                    # Handles any errors that occur throughout tracking.
-                    first_eye_coords = [np.nan, np.nan]
-                    second_eye_coords = [np.nan, np.nan]
-                    first_eye_angle = np.nan
-                    second_eye_angle = np.nan
-                    body_coords = [np.nan, np.nan]
-                    heading_angle = np.nan
-                    swim_bladder_coords = [np.nan, np.nan]
-                    tail_point_coords = [[np.nan, np.nan] for m in range(n_tail_points)]
-                    tail_points = [[np.nan, np.nan] for m in range(n_tail_points + 1)]
-                # Iterate through the number of tail points, including the swim bladder coordinates.
-                for m in range(n_tail_points + 1):
-                    # Check if this is the first tail point.
-                    if m == 0:
-                        # Add the swim bladder to a list that will contain all of the tail points, including the swim bladder.
-                        tail_points[m] = swim_bladder_coords
-                    else:
-                        # Add all of the tail points to the list.
-                        tail_points[m] = tail_point_coords[m - 1]
-                # Add all of the important features that were tracked into lists.
-                eye_coord_array.append([first_eye_coords, second_eye_coords])
-                eye_angle_array.append([first_eye_angle, second_eye_angle])
-                tail_coord_array.append(tail_points)
-                body_coord_array.append(body_coords)
-                heading_angle_array.append(heading_angle)
                 if save_video:
+                    original_frame = convert_frame_to_colour(original_frame)
+                    if tracking_success:
+                        try:
+                            # Annotate the tracking results onto the frame.
+                            original_frame = annotate_tracking_results_onto_original_frame(original_frame, results, colours, line_length, eyes_line_length, extended_eyes_calculation)
+                        except:
+                            # Handles any errors that occur throughout tracking.
+                            results = get_failed_tracking_results(n_tail_points)
                     # Write the new frame that contains the annotated frame with tracked points to a new video.
                     writer.write(original_frame)
+                # Check whether the previous results were used because the frame has not changed.
+                frame_skipped = tracking_success and tracking_state['prev_frame_number'] != frame_number
+                # Keep the results of the frame for the next frame.
+                update_tracking_state(tracking_state, results)
+                # Write all of the important features that were tracked into the results and commit them at the end of each block of frames.
+                tracking_results.append(results, frame_number, tracking_state, skipped = frame_skipped)
+
+        if print_progress:
+            print('Tracking video. Processing frame number: {0} / {1}.'.format(n + 1, n_frames))
+        # Stop the reader and unload the video from memory.
+        reader.stop()
 
-    if print_progress:
-        print('Tracking video. Processing frame number: {0} / {1}.'.format(n + 1, n_frames))
-    # Unload the video and writer from memory.
-    capture.release()
     if save_video:
+        # Unload the writer from memory.
         writer.release()
 
-    # Create a dictionary that contains all of the results.
-    results =   {   'eye_coord_array' : eye_coord_array,
-                    'eye_angle_array' : eye_angle_array,
-                    'tail_coord_array' : tail_coord_array,
-                    'body_coord_array' : body_coord_array,
-                    'heading_angle_array' : heading_angle_array,
-                    'video_path' : video_path,
+    # Create a dictionary that contains the parameters used to track the video.
+    metadata =  {   'video_path' : video_path,
                     'video_n_frames' : video_n_frames,
                     'video_fps' : video_fps,
                     'dist_tail_points' : dist_tail_points,
@@ -1558,14 +2667,15 @@ def track_video(video_path, colours, n_tail_points, dist_tail_points, dist_eyes,
                     'eyes_threshold' : eyes_threshold,
                     'pixel_threshold' : pixel_threshold,
                     'frame_change_threshold' : frame_change_threshold,
-                    'colours' : colours
+                    'colours' : colours,
+                    'n_skipped_frames' : tracking_results.n_skipped_frames
                 }
 
-    # Create a path that will contain all of the results from tracking.
-    data_path = "{0}\\{1}_results.npy".format(save_path, os.path.basename(video_path)[:-4])
+    if print_progress:
+        print('Frames that used the previous results: {0} / {1}.'.format(tracking_results.n_skipped_frames, len(tracking_results)))
 
-    # Save the results to a npz file.
-    np.save(data_path, results)
+    # Save each array of the results into a separate file and the parameters into a metadata file.
+    tracking_results.save(data_path, metadata)
 
     if print_progress:
         print('Total processing time: {0} seconds.'.format(time.time() - t0))
@@ -0,0 +1,160 @@
+'''Software Written by Nicholas Guilbeault 2018'''
+
+# import python modules
+import time
+import threading
+import cv2
+import frame_sources as fs
+from PyQt5.QtCore import *
+
+class VideoPlaybackThread(QThread):
+    '''
+    Plays back a video by decoding the frames in a background thread and handing the frames that are due to the GUI.
+
+    Steps:
+        The video is opened once and the frames are read in order.
+        The frame that is due is calculated from the time since playback started and the playback rate.
+        When decoding or displaying the frames is slower than the playback rate, the frames that are no longer due are dropped, so that playback keeps to the playback rate.
+            ** Dropped frames are grabbed without being retrieved, unless grabbing them takes longer than seeking to the frame that is due. The time taken to grab a frame, to read a frame, and to seek to a frame are measured while the video is played back.
+        Each frame that is due is processed in the background thread, such as converting the frame into the image that is displayed.
+        The frame_ready_signal is emitted once a frame is ready. The next frame is only read once the ready frame has been taken using get_ready_frame, so that frames do not queue up when the GUI is slower than the playback rate.
+        Playback loops back to the first frame after the last frame.
+
+    Required Arguments:
+        video_path (str) - Path to the video.
+
+    Optional Arguments:
+        frame_number (int) - Frame number of the frame that is displayed when playback starts. Playback starts from the next frame. Default = 0.
+        playback_rate (float) - Number of frames played per second. Default = 10.
+            ** When playback_rate is not greater than 0, frame_sources.DEFAULT_FPS is used.
+        process_frame (function) - Function that is called in the background thread with each frame and returns the frame that is handed to the GUI, such as a QImage. Default = None.
+            ** When process_frame is None, the frame is handed to the GUI as it was read.
+        grayscale (bool) - Same as in frame_sources.open_video. Default = False.
+        backend (str) - Same as in frame_sources.open_video. Default = opencv.
+        max_frames_to_grab (int) - Maximum number of dropped frames to grab instead of seeking, until the time taken to seek has been measured. Default = 25.
+    '''
+    frame_ready_signal = pyqtSignal(int)
+
+    def __init__(self, video_path, frame_number = 0, playback_rate = 10, process_frame = None, grayscale = False, backend = 'opencv', max_frames_to_grab = 25):
+        super(VideoPlaybackThread, self).__init__()
+        self.video_path = video_path
+        self.frame_number = frame_number
+        self.playback_rate = playback_rate if playback_rate > 0 else fs.DEFAULT_FPS
+        self.process_frame = process_frame
+        self.grayscale = grayscale
+        self.backend = backend
+        self.max_frames_to_grab = max_frames_to_grab
+        self.running = True
+        self.n_dropped_frames = 0
+        self.ready_frame = None
+        self.seek_frame_number = None
+        self.lock = threading.Lock()
+        # Set once the ready frame has been taken by the GUI.
+        self.frame_taken = threading.Event()
+        self.frame_taken.set()
+
+    def run(self):
+        capture = None
+        try:
+            # Open the video path.
+            capture = fs.open_video(self.video_path, self.backend, self.grayscale)
+            video_n_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            # Average time taken to grab a frame, to read a frame, and to seek to a frame and read it in this video, starting with the time taken to grab the first frame.
+            start_grab_time = time.perf_counter()
+            capture.grab()
+            grab_time = time.perf_counter() - start_grab_time
+            read_time = None
+            seek_time = None
+            next_frame_number = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+            start_time = time.perf_counter()
+            start_frame_number = self.frame_number
+            while self.running:
+                # Wait until the GUI has taken the ready frame.
+                if not self.frame_taken.wait(0.1):
+                    continue
+                with self.lock:
+                    if self.seek_frame_number is not None:
+                        # Restart the playback clock from the frame that was sought.
+                        start_time = time.perf_counter()
+                        start_frame_number = self.frame_number = self.seek_frame_number
+                        self.seek_frame_number = None
+                # The frame that is due, which is never earlier than the frame after the last frame that was played.
+                frame_number = max(start_frame_number + int((time.perf_counter() - start_time) * self.playback_rate), self.frame_number + 1)
+                if frame_number >= video_n_frames:
+                    # Loop back to the first frame.
+                    start_time = time.perf_counter()
+                    start_frame_number = frame_number = 0
+                # Wait until the frame is due.
+                frame_time = start_time + (frame_number - start_frame_number) / self.playback_rate
+                while self.running and time.perf_counter() < frame_time:
+                    time.sleep(min(max(frame_time - time.perf_counter(), 0), 0.05))
+                if not self.running:
+                    break
+                n_frames_to_grab = frame_number - next_frame_number
+                if seek_time is None:
+                    # Grab a limited number of frames until the time taken to seek has been measured.
+                    grab_frames = 0 <= n_frames_to_grab <= self.max_frames_to_grab
+                else:
+                    # Grab the frames unless grabbing them and reading the frame takes longer than seeking to the frame and reading it.
+                    grab_frames = 0 <= n_frames_to_grab and n_frames_to_grab * grab_time + (grab_time if read_time is None else read_time) <= seek_time
+                start_grab_time = time.perf_counter()
+                if grab_frames:
+                    # Grab the dropped frames without retrieving them.
+                    for i in range(n_frames_to_grab):
+                        capture.grab()
+                    if n_frames_to_grab > 0:
+                        grab_time = (grab_time + (time.perf_counter() - start_grab_time) / n_frames_to_grab) / 2
+                else:
+                    # Seek to the frame.
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                self.n_dropped_frames += max(frame_number - self.frame_number - 1, 0)
+                start_read_time = time.perf_counter()
+                success, frame = capture.read()
+                end_read_time = time.perf_counter()
+                if grab_frames:
+                    read_time = end_read_time - start_read_time if read_time is None else (read_time + end_read_time - start_read_time) / 2
+                else:
+                    # Some videos only seek once the next frame is read, so the time taken to seek includes reading the frame.
+                    seek_time = end_read_time - start_grab_time if seek_time is None else (seek_time + end_read_time - start_grab_time) / 2
+                next_frame_number = frame_number + 1
+                self.frame_number = frame_number
+                if not success:
+                    continue
+                if self.process_frame is not None:
+                    frame = self.process_frame(frame)
+                with self.lock:
+                    # Discard the frame if a different frame was sought while the frame was being read.
+                    if self.seek_frame_number is not None:
+                        continue
+                    self.ready_frame = [frame_number, frame]
+                    self.frame_taken.clear()
+                self.frame_ready_signal.emit(frame_number)
+        except Exception as error:
+            print('Error: Could not play back {0}. {1}'.format(self.video_path, error))
+        finally:
+            # Unload the video from memory.
+            if capture is not None:
+                capture.release()
+
+    def get_ready_frame(self):
+        '''
+        Returns the frame number and the frame that is ready to be displayed, and lets the background thread read the next frame. Returns None if no frame is ready.
+        '''
+        with self.lock:
+            ready_frame = self.ready_frame
+            self.ready_frame = None
+        self.frame_taken.set()
+        return ready_frame
+
+    def seek(self, frame_number):
+        '''
+        Continues playback from the frame after frame_number, such as when a different frame is selected during playback.
+        '''
+        with self.lock:
+            self.seek_frame_number = frame_number
+            self.ready_frame = None
+        self.frame_taken.set()
+
+    def close(self):
+        self.running = False
+        self.frame_taken.set()